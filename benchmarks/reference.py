@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+The original history-by-history transport loop, kept as a fixed yardstick.
+
+This is `run` as it was before the event engine and the counter-based random
+number streams: one history at a time, with a call into NumPy's global random
+state for every sample. The benchmark suite times it alongside the engines and
+reports their speed-up over it, which depends far less on the machine than
+their absolute timings do. It is deliberately not kept in step with mccc.
+
+    python benchmarks/reference.py -g 2 -p 10000
+"""
+import math
+import time
+
+import click
+import numpy as np
+
+from mccc.setup import initialise_tallies
+from mccc.setup import setup_simulation
+
+
+def reference_history(cfg, tallies, current_position):
+    """
+    Function to simulate a single neutron history as the original loop did.
+
+    Parameters:
+    - cfg (Config): Simulation configuration (its homogeneous slab only).
+    - tallies (dict): Tallies, updated in place.
+    - current_position (float): Starting position of the neutron.
+
+    Returns:
+    - list: Start positions of the next generation from this history.
+    """
+
+    tallies["history"] += 1
+    new_positions = []
+
+    while True:
+        # Free flight, resampling u to avoid log(0)
+        direction_cosine = np.random.uniform(-1, 1)
+        u = np.random.random()
+        while u == 0.0:
+            u = np.random.random()
+        current_position += -cfg.mean_free_path * math.log(u) * direction_cosine
+        if cfg.left_boundary_condition == "reflective":
+            inside = abs(current_position) <= cfg.slab_thickness_cm
+            current_position = abs(current_position) if inside else -1
+        else:
+            inside = 0 <= current_position <= cfg.slab_thickness_cm
+            current_position = current_position if inside else -1
+
+        # Leakage
+        if current_position < 0:
+            tallies["leakage"] += 1
+            return new_positions
+
+        # Collisions
+        tallies["collision"] += 1
+        rand_num = np.random.uniform(0, 1)
+        if rand_num < cfg.scatter_prob:
+            interaction_type = "scatter"
+        elif rand_num < cfg.scatter_prob + cfg.fission_prob:
+            interaction_type = "fission"
+        else:
+            interaction_type = "capture"
+        tallies[interaction_type] += 1
+
+        if interaction_type == "capture":
+            return new_positions
+
+        if interaction_type == "fission":
+            num_secondaries = np.random.poisson(cfg.nu)
+            tallies["secondary"] += num_secondaries
+            for _ in range(num_secondaries):
+                new_positions.append(current_position)
+            return new_positions
+
+        tallies["secondary"] += 1
+
+
+def reference_run(cfg, num_generations, num_particles, random_seed=None):
+    """
+    Function to run generations with the original loop.
+
+    Parameters:
+    - cfg (Config): Simulation configuration (its homogeneous slab only).
+    - num_generations (int): Number of generations.
+    - num_particles (int): Number of source neutrons of the first generation.
+    - random_seed (int | None): Seed of NumPy's global random state.
+
+    Returns:
+    - tuple: Lists of the k1 and k2 estimates of each generation.
+    """
+
+    if random_seed is not None:
+        np.random.seed(random_seed)
+    start_positions = [
+        np.random.uniform(0, cfg.slab_thickness_cm) for _ in range(num_particles)
+    ]
+
+    k1 = []
+    k2 = []
+    for _ in range(num_generations):
+        tallies = initialise_tallies()
+        next_start_positions = []
+        for current_position in start_positions:
+            next_start_positions += reference_history(cfg, tallies, current_position)
+
+        k1.append(
+            cfg.nu
+            * tallies["fission"]
+            / (tallies["capture"] + tallies["leakage"] + tallies["fission"])
+        )
+        k2.append(len(next_start_positions) / len(start_positions))
+        start_positions = next_start_positions
+
+    return k1, k2
+
+
+@click.command()
+@click.option("num_generations", "-g", "--generations", type=int, default=2)
+@click.option("num_particles", "-p", "--particles", type=int, default=10000)
+@click.option("random_seed", "--seed", type=int, default=12345)
+def main(num_generations, num_particles, random_seed):
+    start = time.perf_counter()
+    k1, k2 = reference_run(
+        setup_simulation(), num_generations, num_particles, random_seed
+    )
+    seconds = time.perf_counter() - start
+    print(f"k1 = {k1}")
+    print(f"k2 = {k2}")
+    print(f"{num_generations * num_particles / seconds:.4g} source neutrons/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+"""
+Performance benchmark suite, with regression checks against a baseline.
+
+Times single histories, full runs at several particle counts, the sampling
+functions, the random number streams and the neutron position update, and
+reports each as the best time per call and a rate (histories, or samples, per
+second). The original history loop (benchmarks/reference.py) is timed too,
+and each full run's speed-up over it is reported; the largest run falling
+below the minimum speed-up fails the suite. Results can be saved as JSON,
+with metadata on the machine and code they were measured on, and compared
+with a baseline saved earlier: a benchmark more than the threshold slower
+than its baseline fails the comparison. Everything runs offline.
+
+    python benchmarks/suite.py -o benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --threshold 0.1
+"""
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from dataclasses import replace
+
+import click
+import numpy as np
+from reference import reference_run
+from tracking import graded_regions
+
+import mccc
+from mccc import sampling
+from mccc.geometry import update_neutron_position
+from mccc.geometry import update_neutron_position_batch
+from mccc.monte_carlo import run
+from mccc.monte_carlo import simulate
+from mccc.monte_carlo import simulate_single_history
+from mccc.rng import ParticleStreams
+from mccc.setup import initialise_tallies
+from mccc.setup import setup_simulation
+
+# Number of samples per call of the samplers given arrays of random numbers
+BATCH_SIZE = 100000
+
+# Number of histories per call of the single-history benchmark
+NUM_HISTORIES = 1000
+
+# Number of source neutrons of the timed generation of the original history
+# loop (benchmarks/reference.py), which the full runs are measured against
+REFERENCE_PARTICLES = 10000
+REFERENCE_NAME = f"reference_run[{REFERENCE_PARTICLES}]"
+
+# Smallest speed-up over the original history loop that the full run with the
+# most particles must keep. The speed-up, unlike the timings, carries over
+# between machines.
+MIN_SPEEDUP = 20.0
+
+# Smallest duration of each timing, in seconds. Short timings of the smaller
+# runs varied by more than the regression threshold from one suite to the next.
+MIN_TIME_S = 1.0
+
+
+def machine_metadata():
+    """
+    Function to describe the machine, software and code the benchmarks run on.
+    """
+
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu": cpu,
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "mccc": mccc.__version__,
+        "commit": commit,
+    }
+
+
+def define_benchmarks(num_generations, particles_list, random_seed):
+    """
+    Function to set up the benchmarks.
+
+    Returns:
+    - list: (name, function to time, items per call, unit of the items).
+    """
+
+    cfg = replace(setup_simulation(), random_seed=random_seed)
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(random_seed), 0)
+    rng = np.random.default_rng(random_seed)
+    positions = rng.uniform(0.0, cfg.slab_thickness_cm, BATCH_SIZE)
+    mu = rng.uniform(-1.0, 1.0, BATCH_SIZE)
+    distances = rng.exponential(cfg.mean_free_path, BATCH_SIZE)
+    rand_nums = rng.random(BATCH_SIZE)
+    histories = np.arange(BATCH_SIZE)
+    out = np.empty(BATCH_SIZE)
+    int_out = np.empty(BATCH_SIZE, dtype=np.int64)
+    code_out = np.empty(BATCH_SIZE, dtype=np.int8)
+
+    def single_histories():
+        # Fresh streams, so the random number blocks cached by the last call
+        # are not reused
+        history_streams = ParticleStreams(streams.key)
+        tallies = initialise_tallies()
+        for history in range(NUM_HISTORIES):
+            simulate_single_history(cfg, tallies, 0.5, history_streams, history)
+
+    benchmarks = [
+        ("simulate_single_history", single_histories, NUM_HISTORIES, "histories"),
+        (
+            REFERENCE_NAME,
+            lambda: reference_run(cfg, 1, REFERENCE_PARTICLES, random_seed),
+            REFERENCE_PARTICLES,
+            "source neutrons",
+        ),
+    ]
+
+    for num_particles in particles_list:
+        benchmarks.append(
+            (
+                f"run[{num_particles}]",
+                lambda num_particles=num_particles: run(
+                    num_generations, num_particles, plot=False, random_seed=random_seed
+                ),
+                num_generations * num_particles,
+                "source neutrons",
+            )
+        )
+
+    # A layered slab, with each tracking mode (see benchmarks/tracking.py)
+    layered = replace(
+        cfg,
+        num_generations=num_generations,
+        num_particles=particles_list[0],
+        regions=graded_regions(cfg, 10, 0.2),
+    )
+    for tracking in ("surface", "delta"):
+        benchmarks.append(
+            (
+                f"simulate[10 regions, {tracking}]",
+                lambda tracking=tracking: simulate(replace(layered, tracking=tracking)),
+                num_generations * particles_list[0],
+                "source neutrons",
+            )
+        )
+
+    benchmarks += [
+        ("sample_direction_cosine", sampling.sample_direction_cosine, 1, "samples"),
+        (
+            "sample_interaction_type",
+            lambda: sampling.sample_interaction_type(
+                cfg.scatter_prob, cfg.fission_prob
+            ),
+            1,
+            "samples",
+        ),
+        (
+            "sample_neutrons_emitted",
+            lambda: sampling.sample_neutrons_emitted(cfg.nu),
+            1,
+            "samples",
+        ),
+        (
+            "sample_position",
+            lambda: sampling.sample_position(cfg.slab_thickness_cm),
+            1,
+            "samples",
+        ),
+        (
+            "sample_scattering_distance",
+            lambda: sampling.sample_scattering_distance(cfg.mean_free_path),
+            1,
+            "samples",
+        ),
+        ("sample_optical_depth", sampling.sample_optical_depth, 1, "samples"),
+        (
+            "interaction_codes",
+            lambda: sampling.interaction_codes(
+                cfg.scatter_prob, cfg.fission_prob, rand_nums
+            ),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "sample_neutrons_emitted[array]",
+            lambda: sampling.sample_neutrons_emitted(cfg.nu, rand_nums),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "sample_optical_depth[array]",
+            lambda: sampling.sample_optical_depth(rand_nums),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "sample_direction_cosine_batch",
+            lambda: sampling.sample_direction_cosine_batch(BATCH_SIZE, rng, out),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "sample_interaction_type_batch",
+            lambda: sampling.sample_interaction_type_batch(
+                cfg.scatter_prob, cfg.fission_prob, BATCH_SIZE, rng, code_out
+            ),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "sample_neutrons_emitted_batch",
+            lambda: sampling.sample_neutrons_emitted_batch(
+                cfg.nu, BATCH_SIZE, rng, int_out
+            ),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "sample_position_batch",
+            lambda: sampling.sample_position_batch(
+                cfg.slab_thickness_cm, BATCH_SIZE, rng, out
+            ),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "sample_scattering_distance_batch",
+            lambda: sampling.sample_scattering_distance_batch(
+                cfg.mean_free_path, BATCH_SIZE, rng, out
+            ),
+            BATCH_SIZE,
+            "samples",
+        ),
+        (
+            "ParticleStreams.uniforms",
+            lambda: streams.uniforms(histories, 0),
+            BATCH_SIZE,
+            "blocks",
+        ),
+        (
+            "update_neutron_position",
+            lambda: update_neutron_position(
+                0.5, cfg.slab_thickness_cm, -0.3, cfg.left_boundary_condition, 1.0
+            ),
+            1,
+            "updates",
+        ),
+        (
+            "update_neutron_position_batch",
+            lambda: update_neutron_position_batch(
+                positions,
+                cfg.slab_thickness_cm,
+                mu,
+                cfg.left_boundary_condition,
+                distances,
+            ),
+            BATCH_SIZE,
+            "updates",
+        ),
+    ]
+    return benchmarks
+
+
+def time_benchmarks(benchmarks, repeats, min_time=MIN_TIME_S):
+    """
+    Function to time benchmarks, as the best time per call over `repeats`
+    rounds, each of which times every benchmark once, with enough calls to
+    take at least `min_time` seconds. The calls made to find that number also
+    warm up each function. Spreading each benchmark's timings across the
+    whole suite, rather than taking them back to back, keeps a passing slow
+    spell of the machine from spoiling all of them.
+
+    Parameters:
+    - benchmarks (list): (name, function to time, ...) of each benchmark.
+    - repeats (int): Number of rounds.
+    - min_time (float): Smallest duration of each timing, in seconds.
+
+    Returns:
+    - dict: Best time per call in seconds, and the number of calls timed, of
+            each benchmark by name.
+    """
+
+    timers = {}
+    for name, function, *_ in benchmarks:
+        timer = timeit.Timer(function)
+        number, time_taken = timer.autorange()
+        timers[name] = (timer, max(number, math.ceil(number * min_time / time_taken)))
+
+    best = dict.fromkeys(timers, math.inf)
+    for _ in range(repeats):
+        for name, (timer, number) in timers.items():
+            best[name] = min(best[name], timer.timeit(number) / number)
+    return {name: (best[name], timers[name][1]) for name in timers}
+
+
+def speedups(results):
+    """
+    Function to work out the speed-up of each full run over the original
+    history loop.
+
+    Parameters:
+    - results (dict): Benchmark results, by name.
+
+    Returns:
+    - dict: Rate of each full run over that of the original loop, by name; empty
+            if the original loop was not timed.
+    """
+
+    if REFERENCE_NAME not in results:
+        return {}
+    reference_rate = results[REFERENCE_NAME]["rate"]
+    return {
+        name: values["rate"] / reference_rate
+        for name, values in results.items()
+        if name.startswith("run[")
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Function to compare benchmark results with a baseline.
+
+    Parameters:
+    - results (dict): Benchmark results, by name.
+    - baseline (dict): Baseline results, by name.
+    - threshold (float): Largest acceptable fractional slowdown.
+
+    Returns:
+    - list: (name, baseline seconds, seconds, ratio, status) of each
+            benchmark, where the status is 'ok', 'slower', 'faster', 'new'
+            or 'missing'.
+    """
+
+    rows = []
+    for name in list(results) + [name for name in baseline if name not in results]:
+        if name not in baseline:
+            rows.append((name, None, results[name]["seconds"], None, "new"))
+            continue
+        if name not in results:
+            rows.append((name, baseline[name]["seconds"], None, None, "missing"))
+            continue
+        ratio = results[name]["seconds"] / baseline[name]["seconds"]
+        if ratio > 1 + threshold:
+            status = "slower"
+        elif ratio < 1 / (1 + threshold):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append(
+            (name, baseline[name]["seconds"], results[name]["seconds"], ratio, status)
+        )
+    return rows
+
+
+@click.command()
+@click.option("num_generations", "-g", "--generations", type=int, default=10)
+@click.option(
+    "particles_list",
+    "-p",
+    "--particles",
+    type=int,
+    multiple=True,
+    default=(10000, 100000),
+)
+@click.option("random_seed", "--seed", type=int, default=12345)
+@click.option("repeats", "--repeats", type=click.IntRange(min=1), default=5)
+@click.option(
+    "min_time",
+    "--min-time",
+    type=click.FloatRange(min=0),
+    default=MIN_TIME_S,
+    help="Smallest duration of each timing, in seconds.",
+)
+@click.option(
+    "select", "-k", default=None, help="Only run benchmarks whose name contains this."
+)
+@click.option("output", "-o", "--output", default=None, help="Save results as JSON.")
+@click.option(
+    "baseline_file",
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON results to compare with.",
+)
+@click.option(
+    "threshold",
+    "--threshold",
+    type=click.FloatRange(min=0),
+    default=0.1,
+    help="Largest acceptable fractional slowdown against the baseline.",
+)
+@click.option(
+    "min_speedup",
+    "--min-speedup",
+    type=click.FloatRange(min=0),
+    default=MIN_SPEEDUP,
+    help="Smallest acceptable speed-up of the largest run over the original loop.",
+)
+def main(
+    num_generations,
+    particles_list,
+    random_seed,
+    repeats,
+    min_time,
+    select,
+    output,
+    baseline_file,
+    threshold,
+    min_speedup,
+):
+    metadata = machine_metadata()
+    print(
+        f"{metadata['cpu']} ({metadata['cpu_count']} CPUs), "
+        f"Python {metadata['python']}, NumPy {metadata['numpy']}"
+    )
+
+    benchmarks = [
+        benchmark
+        for benchmark in define_benchmarks(num_generations, particles_list, random_seed)
+        if select is None or select in benchmark[0]
+    ]
+    timings = time_benchmarks(benchmarks, repeats, min_time)
+
+    results = {}
+    print(f"{'benchmark':<34} {'time/call (s)':>14} {'rate (/s)':>12} unit")
+    for name, _, items, unit in benchmarks:
+        seconds, number = timings[name]
+        results[name] = {
+            "seconds": seconds,
+            "number": number,
+            "repeats": repeats,
+            "items": items,
+            "unit": unit,
+            "rate": items / seconds,
+        }
+        print(f"{name:<34} {seconds:>14.6g} {items / seconds:>12.4g} {unit}")
+
+    runs = speedups(results)
+    for name, speedup in runs.items():
+        results[name]["speedup"] = speedup
+        print(f"{name} is {speedup:.1f}x as fast as the original loop")
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump({"metadata": metadata, "benchmarks": results}, f, indent=2)
+
+    largest = f"run[{max(particles_list)}]"
+    if runs.get(largest, math.inf) < min_speedup:
+        sys.exit(
+            f"{largest} is only {runs[largest]:.1f}x as fast as the original "
+            f"loop, below {min_speedup:g}x"
+        )
+
+    if baseline_file is None:
+        return
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    baseline_metadata = baseline.get("metadata", {})
+    for key in ("cpu", "python", "numpy"):
+        if baseline_metadata.get(key) != metadata[key]:
+            print(
+                f"Warning: baseline {key} {baseline_metadata.get(key)!r} "
+                f"differs from {metadata[key]!r}"
+            )
+    if select is not None:
+        baseline["benchmarks"] = {
+            name: values
+            for name, values in baseline["benchmarks"].items()
+            if select in name
+        }
+
+    rows = compare(results, baseline["benchmarks"], threshold)
+    print(f"{'benchmark':<34} {'baseline (s)':>12} {'now (s)':>12} {'ratio':>7} status")
+    for name, base_seconds, seconds, ratio, status in rows:
+        print(
+            f"{name:<34} "
+            + (f"{base_seconds:>12.6g} " if base_seconds is not None else f"{'':>12} ")
+            + (f"{seconds:>12.6g} " if seconds is not None else f"{'':>12} ")
+            + (f"{ratio:>7.3f} " if ratio is not None else f"{'':>7} ")
+            + status
+        )
+    slower = [row[0] for row in rows if row[4] == "slower"]
+    if slower:
+        sys.exit(
+            f"{len(slower)} benchmark(s) more than {threshold:.0%} slower than "
+            f"the baseline: {', '.join(slower)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of surface tracking against delta tracking.
+
+The default slab is divided into more and more regions of equal width, with
+a density that rises linearly across the slab, and a run is timed with each
+tracking mode. Surface tracking pays for every boundary a flight crosses,
+and delta tracking for every virtual collision (the more so the further the
+majorant is above the local cross-section), so the faster mode depends on
+the model.
+
+    python benchmarks/tracking.py -p 100000 -r 1 -r 10 -r 100 -r 1000
+"""
+import time
+from dataclasses import replace
+
+import click
+import numpy as np
+
+from mccc.geometry import TRACKING_MODES
+from mccc.monte_carlo import simulate
+from mccc.setup import setup_simulation
+
+
+def graded_regions(cfg, num_regions, density_rise):
+    """
+    Function to divide the slab into regions of equal width whose density
+    rises linearly from 1 to 1 + density_rise across the slab.
+    """
+
+    right_edges = np.linspace(0.0, cfg.slab_thickness_cm, num_regions + 1)[1:]
+    densities = 1.0 + density_rise * (np.arange(num_regions) + 0.5) / num_regions
+    return tuple(
+        (edge, cfg.total_xs * d, cfg.scatter_xs * d, cfg.fission_xs * d)
+        for edge, d in zip(right_edges, densities)
+    )
+
+
+@click.command()
+@click.option("num_generations", "-g", "--generations", type=int, default=4)
+@click.option("num_particles", "-p", "--particles", type=int, default=100000)
+@click.option(
+    "regions_list", "-r", "--regions", type=int, multiple=True, default=(1, 10, 100)
+)
+@click.option("density_rise", "--density-rise", type=float, default=0.2)
+@click.option("random_seed", "--seed", type=int, default=12345)
+def main(num_generations, num_particles, regions_list, density_rise, random_seed):
+    base = replace(
+        setup_simulation(),
+        num_generations=num_generations,
+        num_particles=num_particles,
+        random_seed=random_seed,
+    )
+    print(f"{'regions':>8} {'tracking':>9} {'time (s)':>9} {'histories/s':>12} k1")
+    for num_regions in regions_list:
+        regions = graded_regions(base, num_regions, density_rise)
+        for tracking in TRACKING_MODES:
+            cfg = replace(base, regions=regions, tracking=tracking)
+            start = time.perf_counter()
+            results = simulate(cfg)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{num_regions:>8} {tracking:>9} {elapsed:>9.3f} "
+                f"{results['histories'] / elapsed:>12.0f} {results['k1'][-1]:.5f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
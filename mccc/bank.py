@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# Storage layouts for fission sites. All the sites of a bank are born in the
+# same generation, so the parent generation is kept on the bank, not per site.
+BANK_DTYPES = {
+    "float64": np.dtype([("position", np.float64), ("weight", np.float64)]),
+    "float32": np.dtype([("position", np.float32), ("weight", np.float32)]),
+}
+
+
+class FissionBank:
+    """
+    Compact, growable bank of fission sites backed by a NumPy structured array.
+
+    Sites are stored contiguously with position and weight fields. Storage is
+    preallocated and doubled as needed, so appending whole arrays of sites
+    creates no per-site Python objects.
+
+    Parameters:
+    - capacity (int): Number of sites to preallocate.
+    - precision (str): Storage precision, 'float64' or the compact 'float32'.
+    - generation (int): Parent generation of the sites (-1 for the initial
+                        source).
+    """
+
+    def __init__(self, capacity=0, precision="float64", generation=-1):
+        if precision not in BANK_DTYPES:
+            raise ValueError(f"Unknown bank precision: {precision}")
+        self.precision = precision
+        self.generation = generation
+        self._sites = np.empty(capacity, dtype=BANK_DTYPES[precision])
+        self._size = 0
+
+    @classmethod
+    def from_positions(cls, positions, precision="float64", generation=-1):
+        """
+        Create a bank of unit-weight sites at the given positions.
+
+        Parameters:
+        - positions (array-like): Site positions.
+        - precision (str): Storage precision, 'float64' or 'float32'.
+        - generation (int): Parent generation of the sites.
+
+        Returns:
+        - FissionBank: The new bank.
+        """
+
+        positions = np.asarray(positions)
+        bank = cls(positions.size, precision=precision, generation=generation)
+        bank.append(positions)
+        return bank
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._sites.size
+
+    @property
+    def sites(self):
+        """Structured array view of the stored sites."""
+        return self._sites[: self._size]
+
+    @property
+    def positions(self):
+        """Array view of the site positions."""
+        return self.sites["position"]
+
+    @property
+    def weights(self):
+        """Array view of the site weights."""
+        return self.sites["weight"]
+
+    @property
+    def nbytes(self):
+        """Memory used by the stored sites, in bytes."""
+        return self.sites.nbytes
+
+    def total_weight(self):
+        """Sum of the site weights."""
+        return float(np.sum(self.weights, dtype=np.float64))
+
+    def reserve(self, capacity):
+        """
+        Grow the storage to hold at least `capacity` sites.
+
+        Parameters:
+        - capacity (int): Required number of sites.
+        """
+
+        if capacity <= self.capacity:
+            return
+        sites = np.empty(max(capacity, 2 * self.capacity), dtype=self._sites.dtype)
+        sites[: self._size] = self.sites
+        self._sites = sites
+
+    def append(self, positions, weights=1.0):
+        """
+        Append sites to the bank.
+
+        Parameters:
+        - positions (array-like): Site positions.
+        - weights (array-like | float): Site weights.
+        """
+
+        positions = np.asarray(positions)
+        num_sites = positions.size
+        if num_sites == 0:
+            return
+        self.reserve(self._size + num_sites)
+        new_sites = self._sites[self._size : self._size + num_sites]
+        new_sites["position"] = positions
+        new_sites["weight"] = weights
+        self._size += num_sites
+
+    def extend(self, sites):
+        """
+        Append sites from a structured array with the bank's fields.
+
+        Parameters:
+        - sites (np.ndarray): Structured array of sites.
+        """
+
+        if sites.size == 0:
+            return
+        self.reserve(self._size + sites.size)
+        self._sites[self._size : self._size + sites.size] = sites
+        self._size += sites.size
+
+    def clear(self):
+        """Remove all sites, keeping the storage for reuse."""
+        self._size = 0
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import functools
+import hashlib
+import json
+import os
+import time
+from dataclasses import fields
+from pathlib import Path
+
+import numpy as np
+
+import mccc
+from mccc.results import to_builtin
+
+# Default size limit of the cache directory, in bytes
+CACHE_MAX_BYTES = 256 * 1024**2
+
+# Config fields that do not change the results of a run
+UNKEYED_FIELDS = (
+    "workers",
+    "results_file",
+    "results_format",
+    "checkpoint_dir",
+    "checkpoint_interval",
+    "profile",
+    "profile_file",
+    "progress",
+    "metrics_file",
+    "metrics_format",
+)
+
+# Per-generation estimates of a run, stored as arrays
+CACHED_SERIES = ("k1", "k2", "k_collision", "k_track_length")
+
+
+def default_cache_dir():
+    """
+    Function to get the default cache directory, under $XDG_CACHE_HOME (or
+    ~/.cache).
+    """
+
+    root = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(root) / "mccc"
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """
+    Function to get the version of the code, as the package version and a
+    digest of its source files, so a change to the code invalidates the
+    cache even without a new release.
+    """
+
+    digest = hashlib.sha256()
+    for path in sorted(Path(mccc.__file__).parent.glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return f"{mccc.__version__}+{digest.hexdigest()[:16]}"
+
+
+def _touch(path):
+    # Mark an entry as used now, to the nanosecond, for the LRU order
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of the results of seeded runs.
+
+    Each entry is a `.npz` file named by a hash of the configuration of the
+    run (including its seed), the code version, the study and the labels of
+    the run's results records. The per-generation estimates are stored as
+    arrays; the number of histories, the active tallies and the records as
+    JSON. Reading an entry marks it as recently used, and writing one evicts
+    the least recently used entries until the directory is within
+    `max_bytes`.
+
+    Parameters:
+    - directory (str | Path): Cache directory, created if needed.
+    - study (str): Name of the study the runs are for.
+    - max_bytes (int): Size limit of the cache directory.
+    """
+
+    def __init__(self, directory, study, max_bytes=CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.study = study
+        self.max_bytes = max_bytes
+
+    def key(self, cfg, labels):
+        """
+        Get the key of a run.
+
+        Parameters:
+        - cfg (Config): Configuration of the run.
+        - labels (dict): Extra values added to the run's results records.
+
+        Returns:
+        - str: Hex digest identifying the run.
+        """
+
+        contents = {
+            "config": {
+                f.name: getattr(cfg, f.name)
+                for f in fields(cfg)
+                if f.init and f.name not in UNKEYED_FIELDS
+            },
+            "version": code_version(),
+            "study": self.study,
+            "labels": labels,
+        }
+        text = json.dumps(contents, sort_keys=True, default=to_builtin)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _path(self, cfg, labels):
+        return self.directory / f"{self.key(cfg, labels)}.npz"
+
+    def get(self, cfg, labels):
+        """
+        Get the cached results of a run.
+
+        Parameters:
+        - cfg (Config): Configuration of the run.
+        - labels (dict): Extra values added to the run's results records.
+
+        Returns:
+        - tuple | None: The run's results (CACHED_SERIES, `histories` and
+                        `active_tallies`) and its results records; or None
+                        if the run is not in the cache.
+        """
+
+        if cfg.random_seed is None:
+            return None
+        path = self._path(cfg, labels)
+        try:
+            with np.load(path) as entry:
+                results = {name: entry[name].tolist() for name in CACHED_SERIES}
+                extra = json.loads(str(entry["extra"]))
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        _touch(path)
+        results["histories"] = extra["histories"]
+        results["active_tallies"] = extra["active_tallies"]
+        return results, extra["records"]
+
+    def put(self, cfg, labels, results, records):
+        """
+        Add the results of a run to the cache. Unseeded runs are not cached,
+        as they cannot be reproduced.
+
+        Parameters:
+        - cfg (Config): Configuration of the run.
+        - labels (dict): Extra values added to the run's results records.
+        - results (dict): The run's results, as returned by `get`.
+        - records (list): The run's per-generation results records.
+        """
+
+        if cfg.random_seed is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(cfg, labels)
+        extra = {
+            "histories": results["histories"],
+            "active_tallies": results["active_tallies"],
+            "records": records,
+        }
+        # Written under a temporary name and renamed, so a reader never sees
+        # a partial entry
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                **{name: np.asarray(results[name]) for name in CACHED_SERIES},
+                extra=np.array(json.dumps(extra, default=to_builtin)),
+            )
+        os.replace(f"{path}.tmp", path)
+        _touch(path)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is within its
+        size limit, keeping at least the most recent entry.
+        """
+
+        entries = sorted(
+            (path.stat().st_mtime_ns, path.stat().st_size, path)
+            for path in self.directory.glob("*.npz")
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
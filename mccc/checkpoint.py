@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from dataclasses import fields
+from pathlib import Path
+
+import numpy as np
+
+from mccc.bank import FissionBank
+from mccc.results import to_builtin
+from mccc.setup import Config
+
+# File holding everything but the bank. It is replaced last, so it always
+# refers to a complete bank file.
+STATE_FILE = "state.json"
+
+
+def _bank_file(generation):
+    return f"bank_{generation:06d}.npy"
+
+
+def write_checkpoint(checkpoint_dir, cfg, seed_sequence, bank, state):
+    """
+    Function to write a checkpoint at the end of a generation.
+
+    The fission bank is written as a `.npy` file, and the configuration, the
+    root entropy of the random number streams and the run state as JSON. As
+    the streams are counter-based, the root entropy and the next generation
+    number are the whole random number state. Files are written under
+    temporary names and renamed, so an interrupted write leaves the previous
+    checkpoint intact.
+
+    Parameters:
+    - checkpoint_dir (str | Path): Directory to write the checkpoint to.
+    - cfg (Config): Simulation configuration.
+    - seed_sequence (np.random.SeedSequence): Root seed sequence of the run.
+    - bank (FissionBank): Fission bank of the next generation.
+    - state (dict): Run state; the next `generation` and the results so far.
+    """
+
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    bank_file = _bank_file(state["generation"])
+    sites = np.lib.format.open_memmap(
+        checkpoint_dir / f"{bank_file}.tmp",
+        mode="w+",
+        dtype=bank.sites.dtype,
+        shape=bank.sites.shape,
+    )
+    sites[:] = bank.sites
+    sites.flush()
+    del sites
+    os.replace(checkpoint_dir / f"{bank_file}.tmp", checkpoint_dir / bank_file)
+
+    contents = {
+        "config": {f.name: getattr(cfg, f.name) for f in fields(cfg) if f.init},
+        "entropy": seed_sequence.entropy,
+        "bank_file": bank_file,
+        "bank_generation": bank.generation,
+        "state": state,
+    }
+    with open(checkpoint_dir / f"{STATE_FILE}.tmp", "w") as f:
+        json.dump(contents, f, default=to_builtin)
+    os.replace(checkpoint_dir / f"{STATE_FILE}.tmp", checkpoint_dir / STATE_FILE)
+
+    # Banks of earlier checkpoints are no longer referred to
+    for path in checkpoint_dir.glob("bank_*.npy"):
+        if path.name != bank_file:
+            path.unlink()
+
+
+def read_checkpoint(checkpoint_dir):
+    """
+    Function to read a checkpoint.
+
+    The bank file is memory-mapped and copied into a new bank.
+
+    Parameters:
+    - checkpoint_dir (str | Path): Directory holding the checkpoint.
+
+    Returns:
+    - tuple: Configuration, root seed sequence, fission bank of the next
+             generation, and run state.
+    """
+
+    checkpoint_dir = Path(checkpoint_dir)
+    with open(checkpoint_dir / STATE_FILE) as f:
+        contents = json.load(f)
+
+    cfg = Config(**contents["config"])
+    seed_sequence = np.random.SeedSequence(contents["entropy"])
+
+    sites = np.load(checkpoint_dir / contents["bank_file"], mmap_mode="r")
+    bank = FissionBank(
+        sites.size,
+        precision=cfg.bank_precision,
+        generation=contents["bank_generation"],
+    )
+    bank.extend(sites)
+    del sites
+
+    return cfg, seed_sequence, bank, contents["state"]
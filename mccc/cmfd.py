@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# Quantities accumulated over generations for the CMFD solve
+CMFD_SCORES = ("track_length", "collisions", "absorptions", "fissions", "currents")
+
+
+def solve_cmfd(
+    edges,
+    track_length,
+    collisions,
+    absorptions,
+    nu_fissions,
+    currents,
+    left_boundary_condition,
+):
+    """
+    Function to solve the coarse-mesh finite-difference (CMFD) eigenproblem.
+
+    The cell-average flux phi_i, and the total, absorption and nu-fission
+    cross-sections of each cell, are taken from the Monte Carlo reaction
+    rates. The net current through each surface between cells i-1 and i is
+    written J = -D~ (phi_i - phi_i-1) - D^ (phi_i + phi_i-1), where D~ is the
+    finite-difference diffusion coupling of the two cells (D = 1 / (3 total_xs))
+    and the correction D^ is chosen so J equals the Monte Carlo current. On
+    a vacuum boundary the leakage is written J = (D~ + D^) phi, which with
+    the correction is just the Monte Carlo leakage over the flux. The
+    low-order balance in each cell,
+
+        J_i+1 - J_i + absorption_xs phi h = (1 / k) nu_fission_xs phi h,
+
+    is then a small generalised eigenproblem, solved densely with NumPy for
+    its largest eigenvalue.
+
+    Parameters:
+    - edges (np.ndarray): Cell edges in cm.
+    - track_length (np.ndarray): Track length (flux times width) in each cell.
+    - collisions (np.ndarray): Collision rate in each cell.
+    - absorptions (np.ndarray): Absorption rate in each cell.
+    - nu_fissions (np.ndarray): Fission neutron production rate in each cell.
+    - currents (np.ndarray): Net current to the right through each surface.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+
+    Returns:
+    - tuple: CMFD k_eff, and the fission source fraction in each cell; or
+             None if a cell has no flux to estimate its cross-sections from.
+    """
+
+    if np.any(track_length <= 0) or np.any(collisions <= 0):
+        return None
+
+    widths = np.diff(edges)
+    flux = track_length / widths
+    diffusion = track_length / (3 * collisions)
+    absorption_xs = absorptions / track_length
+    nu_fission_xs = nu_fissions / track_length
+
+    # Interior surfaces: finite-difference coupling and its correction
+    left, right = diffusion[:-1], diffusion[1:]
+    coupling = 2 * left * right / (widths[:-1] * right + widths[1:] * left)
+    correction = -(currents[1:-1] + coupling * (flux[1:] - flux[:-1])) / (
+        flux[1:] + flux[:-1]
+    )
+
+    num_cells = widths.size
+    cells = np.arange(num_cells)
+    loss = np.zeros((num_cells, num_cells))
+    loss[cells, cells] = absorption_xs * widths
+    # Current out through the right-hand surface of cell i (into cell i+1)
+    loss[cells[:-1], cells[:-1]] += coupling - correction
+    loss[cells[:-1], cells[1:]] += -coupling - correction
+    # Current in through the left-hand surface of cell i (from cell i-1)
+    loss[cells[1:], cells[1:]] += coupling + correction
+    loss[cells[1:], cells[:-1]] += -coupling + correction
+
+    # Leakage through vacuum boundaries
+    loss[-1, -1] += currents[-1] / flux[-1]
+    if left_boundary_condition == "transmissive":
+        loss[0, 0] -= currents[0] / flux[0]
+
+    production = np.diag(nu_fission_xs * widths)
+    eigenvalues, eigenvectors = np.linalg.eig(np.linalg.solve(loss, production))
+    fundamental = np.argmax(eigenvalues.real)
+    flux = np.abs(eigenvectors[:, fundamental].real)
+    source = nu_fission_xs * flux * widths
+    return float(eigenvalues[fundamental].real), source / source.sum()
+
+
+class CMFDTally:
+    """
+    Coarse-mesh tally for CMFD acceleration, accumulated over the generations
+    so far.
+
+    Parameters:
+    - edges (np.ndarray): Cell edges in cm.
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.sums = {
+            name: np.zeros(edges.size if name == "currents" else edges.size - 1)
+            for name in CMFD_SCORES
+        }
+
+    def add_batch(self, scores, source_weight):
+        """
+        Add the scores of one generation, normalised per source neutron.
+
+        Parameters:
+        - scores (CMFDScores): Scores of the generation.
+        - source_weight (float): Total weight of the generation's source.
+        """
+
+        self.sums["track_length"] += scores.track_length / source_weight
+        self.sums["collisions"] += scores.collisions / source_weight
+        self.sums["absorptions"] += scores.absorptions / source_weight
+        self.sums["fissions"] += scores.fissions / source_weight
+        self.sums["currents"] += scores.currents / source_weight
+
+    def solve(self, cfg):
+        """
+        Solve the CMFD eigenproblem on the scores so far.
+
+        Parameters:
+        - cfg (Config): Simulation configuration.
+
+        Returns:
+        - tuple | None: As `solve_cmfd`.
+        """
+
+        return solve_cmfd(
+            self.edges,
+            self.sums["track_length"],
+            self.sums["collisions"],
+            self.sums["absorptions"],
+            cfg.nu * self.sums["fissions"],
+            self.sums["currents"],
+            cfg.left_boundary_condition,
+        )
+
+    def to_dict(self):
+        """
+        Get the accumulated state, as plain lists, e.g. for a checkpoint.
+        """
+
+        return {name: values.tolist() for name, values in self.sums.items()}
+
+    def update_from_dict(self, state):
+        """
+        Restore the accumulated state given by `to_dict`.
+        """
+
+        for name in CMFD_SCORES:
+            self.sums[name] = np.array(state[name])
+
+
+def reweight_bank(bank, edges, source):
+    """
+    Function to reweight a fission bank toward the CMFD fission source.
+
+    The weights of the sites in each cell are scaled by the ratio of the
+    CMFD source fraction of the cell to the bank's, and then renormalised to
+    the bank's total weight. Cells without sites cannot be reweighted.
+    Population control then combs or resamples the bank back to equal
+    weights, moving sites toward the CMFD source.
+
+    Parameters:
+    - bank (FissionBank): Fission bank, reweighted in place.
+    - edges (np.ndarray): Cell edges in cm.
+    - source (np.ndarray): CMFD fission source fraction in each cell.
+    """
+
+    if len(bank) == 0:
+        return
+    num_cells = edges.size - 1
+    cells = np.clip(
+        np.searchsorted(edges, bank.positions, side="right") - 1, 0, num_cells - 1
+    )
+    total_weight = bank.total_weight()
+    bank_source = np.bincount(cells, weights=bank.weights, minlength=num_cells)
+    factors = np.divide(
+        source * total_weight,
+        bank_source,
+        out=np.zeros(num_cells),
+        where=bank_source > 0,
+    )
+    bank.weights[:] *= factors[cells]
+    bank.weights[:] *= total_weight / bank.total_weight()
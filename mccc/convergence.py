@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+def source_fractions(bank, slab_thickness_cm, num_bins):
+    """
+    Function to bin a fission source on a uniform spatial mesh over the slab.
+
+    The bin of each site is found directly from its position, and the
+    weights are summed with `np.bincount`, so binning is a single pass over
+    the bank arrays.
+
+    Parameters:
+    - bank (FissionBank): Fission source.
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - num_bins (int): Number of mesh bins over the slab.
+
+    Returns:
+    - np.ndarray: Fraction of the source weight in each bin (all zero for an
+                  empty source).
+    """
+
+    bins = np.clip(
+        (bank.positions * (num_bins / slab_thickness_cm)).astype(np.intp),
+        0,
+        num_bins - 1,
+    )
+    hist = np.bincount(bins, weights=bank.weights, minlength=num_bins)
+    total = hist.sum()
+    if total <= 0:
+        return np.zeros(num_bins)
+    return hist / total
+
+
+def entropy_of_fractions(fractions):
+    """
+    Function to compute the Shannon entropy H = -sum_i p_i log2 p_i of a
+    binned source, in bits.
+    """
+
+    fractions = fractions[fractions > 0]
+    return float(-np.sum(fractions * np.log2(fractions)))
+
+
+def shannon_entropy(bank, slab_thickness_cm, num_bins):
+    """
+    Function to compute the Shannon entropy of a fission source.
+
+    The source is binned on a uniform spatial mesh over the slab, and the
+    entropy of the resulting weight fractions p_i is H = -sum_i p_i log2 p_i.
+    A source spread evenly over all bins has the maximum entropy log2(num_bins).
+
+    Parameters:
+    - bank (FissionBank): Fission source.
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - num_bins (int): Number of mesh bins over the slab.
+
+    Returns:
+    - float: Shannon entropy of the source, in bits.
+    """
+
+    return entropy_of_fractions(source_fractions(bank, slab_thickness_cm, num_bins))
+
+
+class SourceHistogram:
+    """
+    Fixed-bin histogram of the fission source of each generation of a run.
+
+    The run adds each generation's source as it goes, and the same binned
+    source gives the Shannon entropy, so keeping the histogram costs no extra
+    pass over the bank. It is rendered once the run is over
+    (`plotting.plot_source_histogram`).
+
+    Parameters:
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - num_bins (int): Number of mesh bins over the slab.
+    """
+
+    def __init__(self, slab_thickness_cm, num_bins):
+        self.slab_thickness_cm = slab_thickness_cm
+        self.num_bins = num_bins
+        self.edges = np.linspace(0.0, slab_thickness_cm, num_bins + 1)
+        self.fractions = []
+
+    def add(self, bank):
+        """
+        Add the source of the next generation.
+
+        Parameters:
+        - bank (FissionBank): Fission source of the generation.
+
+        Returns:
+        - np.ndarray: Fraction of the source weight in each bin.
+        """
+
+        fractions = source_fractions(bank, self.slab_thickness_cm, self.num_bins)
+        self.fractions.append(fractions)
+        return fractions
+
+    def to_dict(self):
+        """
+        Get the fractions so far, as plain lists, e.g. for a checkpoint.
+        """
+
+        return [fractions.tolist() for fractions in self.fractions]
+
+    def update_from_dict(self, state):
+        """
+        Restore the fractions given by `to_dict`.
+        """
+
+        self.fractions = [np.array(fractions) for fractions in state]
+
+
+def entropy_converged(entropies, window, tolerance):
+    """
+    Function to decide whether the source entropy has stabilised.
+
+    The entropy is taken to have stabilised once the last `window` values all
+    lie within `tolerance` of each other.
+
+    Parameters:
+    - entropies (list): Source entropy of each generation so far.
+    - window (int): Number of generations to compare.
+    - tolerance (float): Largest allowed spread of the entropies, in bits.
+
+    Returns:
+    - bool: True if the entropy has stabilised.
+    """
+
+    if len(entropies) < window:
+        return False
+    recent = entropies[-window:]
+    return max(recent) - min(recent) <= tolerance
+
+
+def active_statistics(values):
+    """
+    Function to compute the mean of per-generation estimates over the active
+    generations, and the standard error of that mean.
+
+    Parameters:
+    - values (list): Estimates from each active generation.
+
+    Returns:
+    - tuple: Mean and standard error (NaN if not enough generations).
+    """
+
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return float("nan"), float("nan")
+    if values.size == 1:
+        return float(values[0]), float("nan")
+    return float(values.mean()), float(values.std(ddof=1) / np.sqrt(values.size))
+
+
+def combined_estimate(estimates):
+    """
+    Function to combine several estimators of the same quantity into a single
+    minimum-variance estimate.
+
+    The estimators' means are weighted by the inverse of the sample covariance
+    of the means, w = S^-1 1 / (1^T S^-1 1), as in the combined
+    collision/absorption/track-length k_eff estimate of Urbatsch et al.
+    (LA-12658, 1995). The weights sum to one but need not be positive, as they
+    exploit the correlations between the estimators.
+
+    The inverse of a sample covariance from n values of k estimators is
+    biased high by a factor (n - 1) / (n - k - 2), so 1 / (1^T S^-1 1) alone
+    underestimates the variance badly for small n; the variance is scaled up
+    by that factor, and left unknown (NaN) with n <= k + 2.
+
+    Parameters:
+    - estimates (sequence): Values of each estimator from each generation (or
+                            replica), of shape (estimators, generations).
+
+    Returns:
+    - tuple: Combined mean, its standard error (NaN with no more than two
+             generations more than estimators), and the weights of the
+             estimators.
+    """
+
+    values = np.asarray(estimates, dtype=float)
+    num_estimators, num_values = values.shape
+    means = values.mean(axis=1)
+    equal_weights = np.full(num_estimators, 1.0 / num_estimators)
+    if num_values <= num_estimators:
+        return float(equal_weights @ means), float("nan"), equal_weights
+
+    inverse = np.linalg.pinv(np.cov(values) / num_values)
+    ones = np.ones(num_estimators)
+    precision = ones @ inverse @ ones
+    if precision <= 0:
+        # No spread at all between generations
+        return float(equal_weights @ means), 0.0, equal_weights
+    weights = inverse @ ones / precision
+    if num_values <= num_estimators + 2:
+        return float(weights @ means), float("nan"), weights
+    correction = (num_values - 1) / (num_values - num_estimators - 2)
+    return float(weights @ means), float(np.sqrt(correction / precision)), weights
+
+
+def figure_of_merit(mean, std_err, time_s):
+    """
+    Function to compute the figure of merit of an estimate, FOM = 1 / (R^2 T),
+    where R is its relative standard error and T the computing time.
+
+    As R^2 falls as 1/T for a given method, the FOM measures the efficiency of
+    the method, independent of the length of the run: variance reduction that
+    pays for its extra work per history gives a larger FOM.
+
+    Parameters:
+    - mean (float): Estimate.
+    - std_err (float): Standard error of the estimate.
+    - time_s (float): Computing time in seconds.
+
+    Returns:
+    - float: Figure of merit in 1/s (NaN if the standard error is not known,
+             and infinite if it is zero).
+    """
+
+    if not np.isfinite(std_err) or time_s <= 0:
+        return float("nan")
+    if std_err == 0:
+        return float("inf")
+    return float(1.0 / ((std_err / mean) ** 2 * time_s))
@@ -1,4 +1,14 @@
 # -*- coding: utf-8 -*-
+import bisect
+import itertools
+
+import numpy as np
+
+from mccc.sampling import sample_optical_depth
+
+# Ways of moving neutrons to their next collision: surface tracking, region
+# by region, or delta (Woodcock) tracking with the majorant cross-section
+TRACKING_MODES = ("surface", "delta")
 
 
 def handle_boundary_conditions(new_position, slab_thickness_cm, boundary_condition):
@@ -59,3 +69,735 @@ def update_neutron_position(
     return handle_boundary_conditions(
         new_position, slab_thickness_cm, left_boundary_condition
     )
+
+
+def handle_boundary_conditions_batch(
+    new_positions, slab_thickness_cm, boundary_condition
+):
+    """
+    Batched version of `handle_boundary_conditions` for arrays of positions.
+
+    Parameters:
+    - new_positions (np.ndarray): Updated neutron positions.
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - boundary_condition (str): Boundary condition for the left-hand side of the slab
+                                ('reflective' or 'transmissive').
+
+    Returns:
+    - np.ndarray: Updated neutron positions, with -1 flagging leaked neutrons.
+    """
+
+    if boundary_condition == "reflective":
+        positions = np.abs(new_positions)
+    elif boundary_condition == "transmissive":
+        positions = np.where(new_positions < 0, -1.0, new_positions)
+    else:
+        raise ValueError(f"Unknown boundary condition: {boundary_condition}")
+
+    return np.where(positions <= slab_thickness_cm, positions, -1.0)
+
+
+def update_neutron_position_batch(
+    current_positions,
+    slab_thickness_cm,
+    mu,
+    left_boundary_condition,
+    scatter_distances,
+):
+    """
+    Batched version of `update_neutron_position` for arrays of neutrons.
+
+    Parameters:
+    - current_positions (np.ndarray): Current neutron positions in the slab.
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - mu (np.ndarray): Direction cosines in x-direction.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+    - scatter_distances (np.ndarray): Free-flight distances.
+
+    Returns:
+    - np.ndarray: Updated neutron positions, with -1 flagging leaked neutrons.
+    """
+
+    new_positions = current_positions + scatter_distances * mu
+
+    return handle_boundary_conditions_batch(
+        new_positions, slab_thickness_cm, left_boundary_condition
+    )
+
+
+def distance_to_leakage(
+    current_position, slab_thickness_cm, mu, left_boundary_condition
+):
+    """
+    Function to find the distance a neutron can fly before it leaks.
+
+    With a reflective left boundary, a neutron flying left is reflected at
+    x = 0 and can only leak through the right-hand side.
+
+    Parameters:
+    - current_position (float): Current neutron position in the slab.
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - mu (float): Direction cosine in x-direction.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+
+    Returns:
+    - float: Distance along the flight path to leakage.
+    """
+
+    if mu > 0:
+        return (slab_thickness_cm - current_position) / mu
+    if left_boundary_condition == "reflective":
+        return (slab_thickness_cm + current_position) / -mu
+    elif left_boundary_condition == "transmissive":
+        return current_position / -mu
+    else:
+        raise ValueError(f"Unknown boundary condition: {left_boundary_condition}")
+
+
+def distance_to_leakage_batch(
+    current_positions, slab_thickness_cm, mu, left_boundary_condition
+):
+    """
+    Batched version of `distance_to_leakage` for arrays of neutrons.
+
+    Parameters:
+    - current_positions (np.ndarray): Current neutron positions in the slab.
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - mu (np.ndarray): Direction cosines in x-direction.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+
+    Returns:
+    - np.ndarray: Distances along the flight paths to leakage.
+    """
+
+    if left_boundary_condition == "reflective":
+        left_distances = slab_thickness_cm + current_positions
+    elif left_boundary_condition == "transmissive":
+        left_distances = current_positions
+    else:
+        raise ValueError(f"Unknown boundary condition: {left_boundary_condition}")
+
+    return np.where(
+        mu > 0, slab_thickness_cm - current_positions, left_distances
+    ) / np.abs(mu)
+
+
+class SlabRegions:
+    """
+    Layered slab of regions, each of one material, for surface or delta
+    tracking.
+
+    The region boundaries and the cross-sections of each region's material
+    are held in flat arrays, indexed by region number, so a batch of neutrons
+    looks up its cross-sections with one fancy-indexing operation. Region 0
+    starts at x = 0 and the last region ends at the right-hand side of the
+    slab.
+
+    Parameters:
+    - edges (array-like): Increasing region boundaries in cm, from 0 to the
+                          slab thickness.
+    - total_xs (array-like): Total macroscopic cross-section of each region.
+    - scatter_xs (array-like): Scattering macroscopic cross-section of each region.
+    - fission_xs (array-like): Fission macroscopic cross-section of each region.
+    """
+
+    def __init__(self, edges, total_xs, scatter_xs, fission_xs):
+        self.edges = np.asarray(edges, dtype=float)
+        self.total_xs = np.asarray(total_xs, dtype=float)
+        self.scatter_xs = np.asarray(scatter_xs, dtype=float)
+        self.fission_xs = np.asarray(fission_xs, dtype=float)
+
+        if (
+            self.edges.size < 2
+            or self.edges[0] != 0.0
+            or np.any(np.diff(self.edges) <= 0)
+        ):
+            raise ValueError(
+                f"Region boundaries must increase from zero: {self.edges.tolist()}"
+            )
+        if not (
+            self.total_xs.size
+            == self.scatter_xs.size
+            == self.fission_xs.size
+            == self.edges.size - 1
+        ):
+            raise ValueError("Need one set of cross-sections per region")
+        if np.any(self.total_xs <= 0) or np.any(
+            self.scatter_xs + self.fission_xs > self.total_xs
+        ):
+            raise ValueError(
+                "Cross-sections must be positive, with scatter + fission <= total"
+            )
+
+        self.mean_free_path = 1 / self.total_xs
+        self.scatter_prob = self.scatter_xs / self.total_xs
+        self.fission_prob = self.fission_xs / self.total_xs
+        # For delta tracking: the largest total cross-section, and the
+        # probability that a tentative collision in each region is real
+        self.majorant_xs = float(self.total_xs.max())
+        self.real_collision_prob = self.total_xs / self.majorant_xs
+        # The same values as lists of floats, for the code that moves one
+        # neutron at a time, where indexing arrays and computing with NumPy
+        # scalars costs several times as much
+        self.floats = {
+            name: getattr(self, name).tolist()
+            for name in (
+                "edges",
+                "total_xs",
+                "fission_xs",
+                "mean_free_path",
+                "scatter_prob",
+                "fission_prob",
+            )
+        }
+
+    @classmethod
+    def from_config(cls, cfg):
+        """
+        Create the regions of a configuration: `cfg.regions` if given, or else
+        a single region of the configuration's material.
+
+        Parameters:
+        - cfg (Config): Simulation configuration.
+
+        Returns:
+        - SlabRegions: The regions of the slab.
+        """
+
+        if cfg.regions is None:
+            return cls(
+                [0.0, cfg.slab_thickness_cm],
+                [cfg.total_xs],
+                [cfg.scatter_xs],
+                [cfg.fission_xs],
+            )
+        right_edges, total_xs, scatter_xs, fission_xs = zip(*cfg.regions)
+        return cls((0.0,) + right_edges, total_xs, scatter_xs, fission_xs)
+
+    @property
+    def num_regions(self):
+        return self.edges.size - 1
+
+    @property
+    def slab_thickness_cm(self):
+        return float(self.edges[-1])
+
+    def lookup(self, values, region_indices):
+        """
+        Gather a per-region array for each of a batch of neutrons.
+
+        With a single region this is a zero-copy broadcast of its one value,
+        so a homogeneous slab pays nothing for the lookup.
+
+        Parameters:
+        - values (np.ndarray): Values per region, e.g. `self.total_xs`.
+        - region_indices (np.ndarray): Region of each neutron.
+
+        Returns:
+        - np.ndarray: Value for each neutron.
+        """
+
+        if self.num_regions == 1:
+            return np.broadcast_to(values[0], np.shape(region_indices))
+        return values[region_indices]
+
+    def locate(self, positions):
+        """
+        Find the region holding each position.
+
+        Parameters:
+        - positions (float | np.ndarray): Positions in the slab.
+
+        Returns:
+        - int | np.ndarray: Region number of each position.
+        """
+
+        if isinstance(positions, (int, float)):
+            edges = self.floats["edges"]
+            if len(edges) == 2:
+                return 0
+            region = bisect.bisect_right(edges, positions) - 1
+            return min(max(region, 0), len(edges) - 2)
+        if self.num_regions == 1:
+            return np.zeros(np.shape(positions), dtype=np.int64)
+        regions = np.searchsorted(self.edges, positions, side="right") - 1
+        return np.clip(regions, 0, self.num_regions - 1)
+
+
+def track_to_collision(
+    regions,
+    region,
+    current_position,
+    mu,
+    optical_depth,
+    left_boundary_condition,
+    weight=1.0,
+    mesh=None,
+):
+    """
+    Function to fly a neutron to its next collision through a layered slab.
+
+    The flight is traced surface by surface: in each region the distance to
+    the collision (the remaining optical depth over the region's total
+    cross-section) is compared with the distance to the region boundary, and
+    on crossing a boundary the optical depth used up is subtracted. With a
+    reflective left boundary, region 0 is extended by its mirror image, so a
+    reflection at x = 0 is not a boundary crossing: the flight is folded back
+    into the slab as in `handle_boundary_conditions`, and a neutron only
+    leaves region 0 through its right-hand side.
+
+    Parameters:
+    - regions (SlabRegions): Regions of the slab.
+    - region (int): Region the neutron starts in.
+    - current_position (float): Current neutron position in the slab.
+    - mu (float): Direction cosine in x-direction.
+    - optical_depth (float): Sampled optical depth to the collision.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+    - weight (float): Neutron weight, for mesh scores.
+    - mesh (MeshScores | None): Mesh scores to add the track to.
+
+    Returns:
+    - tuple: Collision position (-1 if the neutron leaked), its region, the
+             track length flown inside the slab, and the fission cross-section
+             integrated along the track.
+    """
+
+    if left_boundary_condition not in ("reflective", "transmissive"):
+        raise ValueError(f"Unknown boundary condition: {left_boundary_condition}")
+    reflective = left_boundary_condition == "reflective"
+    edges = regions.floats["edges"]
+    mean_free_path = regions.floats["mean_free_path"]
+    fission_xs = regions.floats["fission_xs"]
+
+    track_length = 0.0
+    fission_track = 0.0
+    while True:
+        to_collision = optical_depth * mean_free_path[region]
+        if mu > 0:
+            boundary = edges[region + 1]
+        elif reflective and region == 0:
+            boundary = -edges[1]
+        else:
+            boundary = edges[region]
+        to_boundary = (boundary - current_position) / mu
+        collides = to_collision <= to_boundary
+        flight = to_collision if collides else to_boundary
+        end = current_position + mu * flight if collides else boundary
+
+        track_length += flight
+        fission_track += fission_xs[region] * flight
+        if mesh is not None:
+            mesh.score_tracks(
+                np.array([current_position]),
+                np.array([end]),
+                np.array([mu]),
+                regions.slab_thickness_cm,
+                reflective,
+                np.array([weight]),
+            )
+        current_position = abs(end) if reflective else end
+        if collides:
+            return current_position, region, track_length, fission_track
+
+        # Cross into the next region, or leave the slab
+        optical_depth = optical_depth - flight * regions.floats["total_xs"][region]
+        region = region + 1 if mu > 0 else region - 1
+        if region < 0 and reflective:
+            # Through the mirror image of region 0, and back into the slab
+            # at its right-hand side
+            mu = -mu
+            region = 1
+        if region < 0 or region == len(edges) - 1:
+            return -1.0, region, track_length, fission_track
+
+
+def track_to_collision_batch(
+    regions,
+    region_indices,
+    current_positions,
+    mu,
+    optical_depths,
+    left_boundary_condition,
+    weights=None,
+    mesh=None,
+):
+    """
+    Batched version of `track_to_collision` for arrays of neutrons.
+
+    Each pass moves every neutron still in flight to its collision or to the
+    next boundary, so the number of passes is set by the most boundaries any
+    neutron crosses. In a single-region slab, neutrons only reach a boundary
+    when they leak, so there is a single pass.
+
+    Parameters:
+    - regions (SlabRegions): Regions of the slab.
+    - region_indices (np.ndarray): Region each neutron starts in.
+    - current_positions (np.ndarray): Current neutron positions in the slab.
+    - mu (np.ndarray): Direction cosines in x-direction.
+    - optical_depths (np.ndarray): Sampled optical depths to the collisions.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+    - weights (np.ndarray | None): Neutron weights, for mesh scores.
+    - mesh (MeshScores | None): Mesh scores to add the tracks to.
+
+    Returns:
+    - tuple: Arrays of collision positions (-1 for leaked neutrons), their
+             regions, the track lengths flown inside the slab, and the fission
+             cross-sections integrated along the tracks.
+    """
+
+    if left_boundary_condition not in ("reflective", "transmissive"):
+        raise ValueError(f"Unknown boundary condition: {left_boundary_condition}")
+    reflective = left_boundary_condition == "reflective"
+    # Left-hand boundary of region 0: its mirror image's if reflective
+    left_edge = -regions.edges[1] if reflective else 0.0
+
+    region_indices = np.array(region_indices)
+    track_lengths = None
+    fission_tracks = None
+
+    # Neutrons still in flight (all of them on the first pass), and their state
+    moving = None
+    region = region_indices
+    x = np.asarray(current_positions, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    optical_depth = np.asarray(optical_depths, dtype=float)
+    while True:
+        to_collision = optical_depth * regions.lookup(regions.mean_free_path, region)
+        if regions.num_regions == 1:
+            # The slab, with its mirror image if reflective, spans
+            # [-thickness, thickness] or [0, thickness]
+            if reflective:
+                boundary = np.copysign(regions.edges[1], mu)
+            else:
+                boundary = regions.edges[1] * (mu > 0)
+        else:
+            boundary = regions.edges[region + (mu > 0)]
+            boundary = np.where((region == 0) & (mu < 0), left_edge, boundary)
+        to_boundary = (boundary - x) / mu
+        flight = np.minimum(to_collision, to_boundary)
+        # Index the neutrons reaching a boundary once, and gather each of their
+        # arrays with it, rather than masking every array
+        crossed = np.flatnonzero(to_collision > to_boundary)
+        end = mu * flight
+        end += x
+        end[crossed] = boundary[crossed]
+        fission_track = regions.lookup(regions.fission_xs, region) * flight
+
+        if mesh is not None:
+            mesh.score_tracks(
+                x,
+                end,
+                mu,
+                regions.slab_thickness_cm,
+                reflective,
+                weights if weights is None or moving is None else weights[moving],
+            )
+        if reflective:
+            np.abs(end, out=end)
+        if moving is None:
+            track_lengths = flight
+            fission_tracks = fission_track
+            positions = end
+            moving = crossed
+        else:
+            track_lengths[moving] += flight
+            fission_tracks[moving] += fission_track
+            positions[moving] = end
+            region_indices[moving] = region
+            moving = moving[crossed]
+        if moving.size == 0:
+            break
+        if regions.num_regions == 1:
+            # Every boundary of a single region (or of its mirror image) is
+            # the way out of the slab
+            positions[moving] = -1.0
+            break
+
+        # Cross into the next region, or leave the slab
+        region = region[crossed]
+        mu = mu[crossed]
+        optical_depth = optical_depth[crossed] - flight[crossed] * regions.lookup(
+            regions.total_xs, region
+        )
+        region += np.where(mu > 0, 1, -1)
+        if reflective:
+            # Through the mirror image of region 0, and back into the slab at
+            # its right-hand side
+            mirrored = np.flatnonzero(region < 0)
+            mu[mirrored] = -mu[mirrored]
+            region[mirrored] = 1
+        leaked = (region < 0) | (region == regions.num_regions)
+        positions[moving[leaked]] = -1.0
+        kept = np.flatnonzero(~leaked)
+        moving = moving[kept]
+        if moving.size == 0:
+            break
+        region = region[kept]
+        mu = mu[kept]
+        optical_depth = optical_depth[kept]
+        x = positions[moving]
+
+    return positions, region_indices, track_lengths, fission_tracks
+
+
+def delta_track_to_collision(
+    regions,
+    current_position,
+    mu,
+    optical_depth,
+    left_boundary_condition,
+    streams,
+    history,
+    stream,
+    draw,
+    weight=1.0,
+    mesh=None,
+):
+    """
+    Function to fly a neutron to its next collision by delta (Woodcock)
+    tracking.
+
+    Flights are sampled with the majorant cross-section, the largest total
+    cross-section of any region, so region boundaries are never looked for.
+    A tentative collision in a region is real with probability
+    total_xs / majorant_xs; otherwise it is virtual, and the neutron flies on
+    in the same direction over a fresh optical depth. The cost is set by the
+    number of tentative collisions rather than the number of boundaries
+    crossed. Tentative collisions draw their random numbers, two per
+    collision, from a sub-stream of the flight (`ParticleStreams.delta_streams`);
+    none are needed in regions of the majorant material. The fission
+    cross-section integrated along the track is estimated by
+    fission_xs / majorant_xs at each tentative collision.
+
+    Parameters:
+    - regions (SlabRegions): Regions of the slab.
+    - current_position (float): Current neutron position in the slab.
+    - mu (float): Direction cosine in x-direction.
+    - optical_depth (float): Sampled optical depth, in majorant mean free
+                             paths, to the first tentative collision.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+    - streams (ParticleStreams): Random number streams of the generation.
+    - history (int): Index of the neutron's history within the generation.
+    - stream (int): Sub-stream the flight was sampled from.
+    - draw (int): Block number the flight was sampled from.
+    - weight (float): Neutron weight, for mesh scores.
+    - mesh (MeshScores | None): Mesh scores to add the track to.
+
+    Returns:
+    - tuple: Collision position (-1 if the neutron leaked), its region (-1 if
+             leaked), the track length flown inside the slab, and the estimate
+             of the fission cross-section integrated along the track.
+    """
+
+    if left_boundary_condition not in ("reflective", "transmissive"):
+        raise ValueError(f"Unknown boundary condition: {left_boundary_condition}")
+    reflective = left_boundary_condition == "reflective"
+    thickness = regions.slab_thickness_cm
+    majorant = regions.majorant_xs
+
+    flight = optical_depth / majorant
+    track_length = 0.0
+    fission_track = 0.0
+    delta_stream = None
+    for tentative in itertools.count():
+        end = current_position + mu * flight
+        leaked = abs(end) > thickness if reflective else not 0.0 <= end <= thickness
+        if leaked:
+            flight = distance_to_leakage(
+                current_position, thickness, mu, left_boundary_condition
+            )
+        track_length += flight
+        if mesh is not None:
+            # The track of a leaking neutron ends exactly on the boundary
+            if not leaked:
+                track_end = end
+            elif mu > 0:
+                track_end = thickness
+            else:
+                track_end = -thickness if reflective else 0.0
+            mesh.score_tracks(
+                np.array([current_position]),
+                np.array([track_end]),
+                np.array([mu]),
+                thickness,
+                reflective,
+                np.array([weight]),
+            )
+        if leaked:
+            return -1.0, -1, track_length, fission_track
+
+        if reflective and end < 0:
+            end = -end
+            mu = -mu
+        current_position = end
+        region = int(regions.locate(current_position))
+        fission_track += regions.fission_xs[region] / majorant
+        real_collision_prob = regions.real_collision_prob[region]
+        if real_collision_prob == 1.0:
+            return current_position, region, track_length, fission_track
+
+        # Each block of random numbers serves two tentative collisions
+        if tentative % 2 == 0:
+            if delta_stream is None:
+                delta_stream = int(
+                    streams.delta_streams(
+                        np.array([history], dtype=np.uint64), draw, stream
+                    )[0]
+                )
+            rand_nums = streams.uniform_block(history, tentative // 2, delta_stream)
+        rand_num, depth_rand_num = rand_nums[2 * (tentative % 2) :][:2]
+        if rand_num < real_collision_prob:
+            return current_position, region, track_length, fission_track
+        flight = sample_optical_depth(depth_rand_num) / majorant
+
+
+def delta_track_to_collision_batch(
+    regions,
+    current_positions,
+    mu,
+    optical_depths,
+    left_boundary_condition,
+    streams,
+    histories,
+    stream_ids,
+    draws,
+    weights=None,
+    mesh=None,
+):
+    """
+    Batched version of `delta_track_to_collision` for arrays of neutrons.
+
+    Each pass moves every neutron still in flight to its next tentative
+    collision, so the number of passes is set by the most tentative
+    collisions any neutron needs, whatever the number of regions.
+
+    Parameters:
+    - regions (SlabRegions): Regions of the slab.
+    - current_positions (np.ndarray): Current neutron positions in the slab.
+    - mu (np.ndarray): Direction cosines in x-direction.
+    - optical_depths (np.ndarray): Sampled optical depths, in majorant mean
+                                   free paths, to the first tentative collisions.
+    - left_boundary_condition (str): Boundary condition for the left-hand side of the
+                                     slab ('reflective' or 'transmissive').
+    - streams (ParticleStreams): Random number streams of the generation.
+    - histories (np.ndarray): Index of each neutron's history.
+    - stream_ids (int | np.ndarray): Sub-stream each flight was sampled from.
+    - draws (int | np.ndarray): Block number each flight was sampled from.
+    - weights (np.ndarray | None): Neutron weights, for mesh scores.
+    - mesh (MeshScores | None): Mesh scores to add the tracks to.
+
+    Returns:
+    - tuple: Arrays of collision positions (-1 for leaked neutrons), their
+             regions (-1 for leaked neutrons), the track lengths flown inside
+             the slab, and the estimates of the fission cross-sections
+             integrated along the tracks.
+    """
+
+    if left_boundary_condition not in ("reflective", "transmissive"):
+        raise ValueError(f"Unknown boundary condition: {left_boundary_condition}")
+    reflective = left_boundary_condition == "reflective"
+    thickness = regions.slab_thickness_cm
+    majorant = regions.majorant_xs
+
+    x = np.asarray(current_positions, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    histories = np.broadcast_to(np.asarray(histories, dtype=np.uint64), x.shape)
+    stream_ids = np.broadcast_to(np.asarray(stream_ids, dtype=np.uint64), x.shape)
+    draws = np.broadcast_to(np.asarray(draws, dtype=np.uint64), x.shape)
+
+    positions = np.full(x.size, -1.0)
+    region_indices = np.full(x.size, -1, dtype=np.int64)
+    track_lengths = np.zeros(x.size)
+    fission_tracks = np.zeros(x.size)
+
+    # Neutrons still in flight, and the sub-streams and current block of random
+    # numbers of those that have had a virtual collision
+    moving = np.arange(x.size)
+    flight = np.asarray(optical_depths, dtype=float) / majorant
+    delta_stream_ids = None
+    rand_nums = None
+    for tentative in itertools.count():
+        end = x + mu * flight
+        if reflective:
+            leaked = np.abs(end) > thickness
+        else:
+            leaked = (end < 0.0) | (end > thickness)
+        flight = np.where(
+            leaked,
+            distance_to_leakage_batch(x, thickness, mu, left_boundary_condition),
+            flight,
+        )
+        track_lengths[moving] += flight
+        if mesh is not None:
+            # The tracks of leaking neutrons end exactly on the boundary
+            leak_ends = np.where(mu > 0, thickness, -thickness if reflective else 0.0)
+            mesh.score_tracks(
+                x,
+                np.where(leaked, leak_ends, end),
+                mu,
+                thickness,
+                reflective,
+                None if weights is None else weights[moving],
+            )
+
+        # Tentative collisions inside the slab
+        inside = ~leaked
+        moving = moving[inside]
+        end = end[inside]
+        mu = mu[inside]
+        if delta_stream_ids is not None:
+            delta_stream_ids = delta_stream_ids[inside]
+            rand_nums = rand_nums[:, inside]
+        if reflective:
+            mu = np.where(end < 0.0, -mu, mu)
+            end = np.abs(end)
+        region = regions.locate(end)
+        fission_tracks[moving] += regions.lookup(regions.fission_xs, region) / majorant
+        real_collision_prob = regions.lookup(regions.real_collision_prob, region)
+
+        # Collisions in regions of the majorant material are real, and need
+        # no random numbers
+        tested = real_collision_prob < 1.0
+        if not tested.any():
+            positions[moving] = end
+            region_indices[moving] = region
+            break
+        if delta_stream_ids is not None:
+            delta_stream_ids = delta_stream_ids[tested]
+            rand_nums = rand_nums[:, tested]
+        if tentative % 2 == 0:
+            # Each block of random numbers serves two tentative collisions
+            tested_moving = moving[tested]
+            if delta_stream_ids is None:
+                delta_stream_ids = streams.delta_streams(
+                    histories[tested_moving],
+                    draws[tested_moving],
+                    stream_ids[tested_moving],
+                )
+            rand_nums = streams.uniforms(
+                histories[tested_moving], tentative // 2, delta_stream_ids
+            )
+        rand_num, depth_rand_num = rand_nums[2 * (tentative % 2) :][:2]
+        real = ~tested
+        real[tested] = rand_num < real_collision_prob[tested]
+        positions[moving[real]] = end[real]
+        region_indices[moving[real]] = region[real]
+
+        # Virtual collisions fly on
+        virtual = ~real[tested]
+        moving = moving[~real]
+        if moving.size == 0:
+            break
+        x = end[~real]
+        mu = mu[~real]
+        flight = sample_optical_depth(depth_rand_num[virtual]) / majorant
+        delta_stream_ids = delta_stream_ids[virtual]
+        rand_nums = rand_nums[:, virtual]
+
+    return positions, region_indices, track_lengths, fission_tracks
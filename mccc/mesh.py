@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from mccc.sampling import FISSION
+from mccc.sampling import SCATTER
+
+# Quantities tallied on the mesh, per source neutron and per cm
+MESH_SCORES = ("collision_flux", "track_length_flux", "fission_rate", "absorption_rate")
+
+
+def mesh_edges(cfg):
+    """
+    Function to get the bin edges of the spatial mesh of a run.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+
+    Returns:
+    - np.ndarray | None: Increasing bin edges in cm, or None if no mesh tally
+                         is requested.
+    """
+
+    if cfg.mesh_edges is not None:
+        edges = np.asarray(cfg.mesh_edges, dtype=float)
+        if edges.size < 2 or np.any(np.diff(edges) <= 0):
+            raise ValueError(f"Mesh edges must be increasing: {cfg.mesh_edges}")
+        return edges
+    if cfg.mesh_bins is not None:
+        return np.linspace(0.0, cfg.slab_thickness_cm, cfg.mesh_bins + 1)
+    return None
+
+
+def cmfd_edges(cfg):
+    """
+    Function to get the cell edges of the coarse CMFD mesh of a run.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+
+    Returns:
+    - np.ndarray | None: Edges of equal cells over the slab, or None if CMFD
+                         is not requested.
+    """
+
+    if cfg.cmfd_bins is None:
+        return None
+    return np.linspace(0.0, cfg.slab_thickness_cm, cfg.cmfd_bins + 1)
+
+
+def _cumulative_lengths(edges, x, weights):
+    """
+    Function to sum, for each bin, the weighted lengths of the intervals
+    [edges[0], x] that lie in the bin.
+
+    The work is O(len(x) + number of bins): each interval covers whole bins up
+    to the one holding its end point, which it covers in part.
+    """
+
+    num_bins = edges.size - 1
+    x = np.clip(x, edges[0], edges[-1])
+    bins = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, num_bins - 1)
+    partial = np.bincount(bins, weights=weights * (x - edges[bins]), minlength=num_bins)
+    ending = np.bincount(bins, weights=weights, minlength=num_bins)
+    # Total weight of the intervals that end beyond each bin
+    beyond = ending.sum() - np.cumsum(ending)
+    return beyond * np.diff(edges) + partial
+
+
+class MeshScores:
+    """
+    Raw mesh scores of one generation (or part of one).
+
+    Scores are accumulated a batch of particles at a time with `np.bincount`,
+    so the memory used depends only on the number of bins.
+
+    Parameters:
+    - edges (np.ndarray): Increasing bin edges in cm.
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        num_bins = edges.size - 1
+        self.collisions = np.zeros(num_bins)
+        self.collision_flux = np.zeros(num_bins)
+        self.track_length = np.zeros(num_bins)
+        self.fissions = np.zeros(num_bins)
+        self.absorptions = np.zeros(num_bins)
+
+    def _bins(self, positions):
+        """Bin of each position, and a mask of the positions on the mesh."""
+        bins = np.searchsorted(self.edges, positions, side="right") - 1
+        on_mesh = (bins >= 0) & (bins < self.edges.size - 1)
+        return bins[on_mesh], on_mesh
+
+    def score_collisions(self, positions, codes, total_xs, weights=None):
+        """
+        Score a batch of collisions.
+
+        Parameters:
+        - positions (np.ndarray): Collision positions.
+        - codes (np.ndarray): Interaction codes (SCATTER, FISSION or CAPTURE).
+        - total_xs (float | np.ndarray): Total cross-section at each collision,
+                                         for the collision estimate of the flux.
+        - weights (np.ndarray | None): Particle weights, or None for unit weights.
+        """
+
+        num_bins = self.edges.size - 1
+        bins, on_mesh = self._bins(positions)
+        codes = codes[on_mesh]
+        weights = np.ones(bins.size) if weights is None else weights[on_mesh]
+        total_xs = np.broadcast_to(total_xs, on_mesh.shape)[on_mesh]
+        fissioned = codes == FISSION
+        absorbed = codes != SCATTER
+        self.collisions += np.bincount(bins, weights=weights, minlength=num_bins)
+        self.collision_flux += np.bincount(
+            bins, weights=weights / total_xs, minlength=num_bins
+        )
+        self.fissions += np.bincount(
+            bins[fissioned], weights=weights[fissioned], minlength=num_bins
+        )
+        self.absorptions += np.bincount(
+            bins[absorbed], weights=weights[absorbed], minlength=num_bins
+        )
+
+    def score_implicit_collisions(
+        self, positions, weights, total_xs, fission_prob, absorption_prob
+    ):
+        """
+        Score a batch of collisions under implicit capture, where every
+        collision scores its expected fission and absorption weight.
+
+        Parameters:
+        - positions (np.ndarray): Collision positions.
+        - weights (np.ndarray): Particle weights before the collisions.
+        - total_xs (float | np.ndarray): Total cross-section at each collision.
+        - fission_prob (float | np.ndarray): Fission probability per collision.
+        - absorption_prob (float | np.ndarray): Absorption probability per
+                                                collision.
+        """
+
+        num_bins = self.edges.size - 1
+        bins, on_mesh = self._bins(positions)
+        weights = weights[on_mesh]
+
+        def per_collision(values):
+            return np.broadcast_to(values, on_mesh.shape)[on_mesh]
+
+        self.collisions += np.bincount(bins, weights=weights, minlength=num_bins)
+        self.collision_flux += np.bincount(
+            bins, weights=weights / per_collision(total_xs), minlength=num_bins
+        )
+        self.fissions += np.bincount(
+            bins, weights=weights * per_collision(fission_prob), minlength=num_bins
+        )
+        self.absorptions += np.bincount(
+            bins, weights=weights * per_collision(absorption_prob), minlength=num_bins
+        )
+
+    def score_tracks(
+        self, starts, ends, mu, slab_thickness_cm, reflective, weights=None
+    ):
+        """
+        Score a batch of flights by the track length in each bin.
+
+        Each flight is given unfolded, from its start to start + mu * distance;
+        the part of it left of x = 0 is folded back into the slab if the left
+        boundary is reflective, and the parts outside the slab (where the
+        neutron has leaked) are dropped.
+
+        Parameters:
+        - starts (np.ndarray): Start positions of the flights.
+        - ends (np.ndarray): Unfolded end positions of the flights.
+        - mu (np.ndarray): Direction cosines of the flights.
+        - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+        - reflective (bool): Whether the left boundary is reflective.
+        - weights (np.ndarray | None): Particle weights, or None for unit weights.
+        """
+
+        low = np.minimum(starts, ends)
+        high = np.maximum(starts, ends)
+        # Weighted track length per unit distance along x
+        if weights is None:
+            weights = 1.0 / np.abs(mu)
+        else:
+            weights = weights / np.abs(mu)
+
+        segments = [
+            (np.clip(high, 0.0, slab_thickness_cm), weights),
+            (np.clip(low, 0.0, slab_thickness_cm), -weights),
+        ]
+        if reflective:
+            # Only flights which cross x = 0 have a part to fold back
+            crossing = low < 0.0
+            segments += [
+                (np.clip(-low[crossing], 0.0, slab_thickness_cm), weights[crossing]),
+                (np.clip(-high[crossing], 0.0, slab_thickness_cm), -weights[crossing]),
+            ]
+        self.track_length += _cumulative_lengths(
+            self.edges,
+            np.concatenate([x for x, _ in segments]),
+            np.concatenate([w for _, w in segments]),
+        )
+
+    def add(self, other):
+        """
+        Add the scores of another part of the generation.
+
+        Parameters:
+        - other (MeshScores): Scores to add.
+        """
+
+        self.collisions += other.collisions
+        self.collision_flux += other.collision_flux
+        self.track_length += other.track_length
+        self.fissions += other.fissions
+        self.absorptions += other.absorptions
+
+
+class CMFDScores(MeshScores):
+    """
+    Coarse-mesh scores of one generation for CMFD: the mesh scores, plus the
+    net current through each cell surface.
+
+    Parameters:
+    - edges (np.ndarray): Increasing cell edges in cm, from 0 to the slab
+                          thickness.
+    """
+
+    def __init__(self, edges):
+        super().__init__(edges)
+        self.currents = np.zeros(edges.size)
+
+    def score_tracks(
+        self, starts, ends, mu, slab_thickness_cm, reflective, weights=None
+    ):
+        """
+        Score a batch of flights by the track length in each cell, and by
+        the surfaces they cross.
+
+        A flight to the right crosses the surfaces s with start < s <= end,
+        and a flight to the left those with end <= s < start, so a flight
+        stopped on a surface crosses it, and one starting from a surface
+        does not. Numbering the surfaces, the net current gains +w on
+        surfaces c(start) to c(end) - 1 for a flight to the right, and -w on
+        surfaces c(end) to c(start) - 1 for a flight to the left, where c(x)
+        counts the surfaces before x in the flight's direction. Both are
+        given by adding w at c(start) and -w at c(end), and summing
+        cumulatively. The part of a flight folded back at a reflective
+        x = 0 starts from just left of x = 0, so the reflection nets no
+        current there.
+
+        Parameters:
+        - starts (np.ndarray): Start positions of the flights.
+        - ends (np.ndarray): Unfolded end positions of the flights.
+        - mu (np.ndarray): Direction cosines of the flights.
+        - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+        - reflective (bool): Whether the left boundary is reflective.
+        - weights (np.ndarray | None): Particle weights, or None for unit weights.
+        """
+
+        super().score_tracks(starts, ends, mu, slab_thickness_cm, reflective, weights)
+
+        if weights is None:
+            weights = np.ones(np.shape(starts))
+        rightward = mu > 0
+
+        def surfaces_before(x):
+            return np.where(
+                rightward,
+                np.searchsorted(self.edges, x, side="right"),
+                np.searchsorted(self.edges, x, side="left"),
+            )
+
+        start_surfaces = surfaces_before(starts)
+        end_surfaces = surfaces_before(ends)
+        if reflective:
+            # The parts of the flights folded back into the slab at x = 0
+            folded = ends < 0.0
+            start_surfaces = np.concatenate(
+                [start_surfaces, np.zeros(np.count_nonzero(folded), dtype=np.int64)]
+            )
+            end_surfaces = np.concatenate(
+                [
+                    end_surfaces,
+                    np.searchsorted(self.edges, -ends[folded], side="right"),
+                ]
+            )
+            weights = np.concatenate([weights, weights[folded]])
+
+        num_surfaces = self.edges.size
+        differences = np.bincount(
+            start_surfaces, weights=weights, minlength=num_surfaces + 1
+        ) - np.bincount(end_surfaces, weights=weights, minlength=num_surfaces + 1)
+        self.currents += np.cumsum(differences)[:num_surfaces]
+
+    def add(self, other):
+        """
+        Add the scores of another part of the generation.
+
+        Parameters:
+        - other (CMFDScores): Scores to add.
+        """
+
+        super().add(other)
+        self.currents += other.currents
+
+
+class GenerationScores:
+    """
+    Mesh scores of one generation, for the mesh tally and for CMFD. The
+    transport engines score into it as into a single MeshScores.
+
+    Parameters:
+    - mesh (MeshScores | None): Scores for the mesh tally.
+    - cmfd (CMFDScores | None): Scores for CMFD.
+    """
+
+    def __init__(self, mesh=None, cmfd=None):
+        self.mesh = mesh
+        self.cmfd = cmfd
+        self._parts = [scores for scores in (mesh, cmfd) if scores is not None]
+
+    def score_collisions(self, *args):
+        for scores in self._parts:
+            scores.score_collisions(*args)
+
+    def score_implicit_collisions(self, *args):
+        for scores in self._parts:
+            scores.score_implicit_collisions(*args)
+
+    def score_tracks(self, *args):
+        for scores in self._parts:
+            scores.score_tracks(*args)
+
+    def add(self, other):
+        for scores, other_scores in zip(self._parts, other._parts):
+            scores.add(other_scores)
+
+
+def generation_scores(cfg):
+    """
+    Function to create the mesh scores for one generation of a run.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+
+    Returns:
+    - GenerationScores | None: Empty scores, or None if neither a mesh tally
+                               nor CMFD is requested.
+    """
+
+    edges = mesh_edges(cfg)
+    coarse_edges = cmfd_edges(cfg)
+    if edges is None and coarse_edges is None:
+        return None
+    return GenerationScores(
+        None if edges is None else MeshScores(edges),
+        None if coarse_edges is None else CMFDScores(coarse_edges),
+    )
+
+
+class MeshTally:
+    """
+    Mesh tally over the active generations, with per-bin batch statistics.
+
+    Each generation is one batch: its scores are normalised per source neutron
+    and per cm, and the running sums and sums of squares of the normalised
+    values are kept for each bin.
+
+    Parameters:
+    - edges (np.ndarray): Increasing bin edges in cm.
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.num_batches = 0
+        self.sums = {name: np.zeros(edges.size - 1) for name in MESH_SCORES}
+        self.sums_sq = {name: np.zeros(edges.size - 1) for name in MESH_SCORES}
+
+    def add_batch(self, scores, source_weight):
+        """
+        Add the scores of one generation.
+
+        Parameters:
+        - scores (MeshScores): Scores of the generation.
+        - source_weight (float): Total weight of the generation's source.
+        """
+
+        norm = 1.0 / (source_weight * np.diff(self.edges))
+        batch = {
+            "collision_flux": scores.collision_flux * norm,
+            "track_length_flux": scores.track_length * norm,
+            "fission_rate": scores.fissions * norm,
+            "absorption_rate": scores.absorptions * norm,
+        }
+        for name, values in batch.items():
+            self.sums[name] += values
+            self.sums_sq[name] += values**2
+        self.num_batches += 1
+
+    def mean(self, name):
+        """Mean over the batches of a score, per bin."""
+        return self.sums[name] / self.num_batches
+
+    def std_err(self, name):
+        """Standard error of the mean of a score, per bin."""
+        n = self.num_batches
+        if n < 2:
+            return np.full(self.edges.size - 1, np.nan)
+        variance = (self.sums_sq[name] - self.sums[name] ** 2 / n) / (n - 1)
+        return np.sqrt(np.maximum(variance, 0.0) / n)
+
+    def to_dict(self):
+        """
+        Get the accumulated state, as plain lists, e.g. for a checkpoint.
+        """
+
+        return {
+            "num_batches": self.num_batches,
+            "sums": {name: values.tolist() for name, values in self.sums.items()},
+            "sums_sq": {name: values.tolist() for name, values in self.sums_sq.items()},
+        }
+
+    def update_from_dict(self, state):
+        """
+        Restore the accumulated state given by `to_dict`.
+        """
+
+        self.num_batches = state["num_batches"]
+        for name in MESH_SCORES:
+            self.sums[name] = np.array(state["sums"][name])
+            self.sums_sq[name] = np.array(state["sums_sq"][name])
@@ -1,52 +1,150 @@
 # -*- coding: utf-8 -*-
+import itertools
 import sys
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from dataclasses import replace
 
 import click
 import numpy as np
-import pandas as pd
 
-from mccc.geometry import update_neutron_position
+from mccc.bank import FissionBank
+from mccc.cache import default_cache_dir
+from mccc.cache import ResultCache
+from mccc.checkpoint import read_checkpoint
+from mccc.checkpoint import write_checkpoint
+from mccc.cmfd import CMFDTally
+from mccc.cmfd import reweight_bank
+from mccc.convergence import active_statistics
+from mccc.convergence import combined_estimate
+from mccc.convergence import entropy_converged
+from mccc.convergence import entropy_of_fractions
+from mccc.convergence import figure_of_merit
+from mccc.convergence import SourceHistogram
+from mccc.geometry import delta_track_to_collision
+from mccc.geometry import delta_track_to_collision_batch
+from mccc.geometry import track_to_collision
+from mccc.geometry import track_to_collision_batch
+from mccc.geometry import TRACKING_MODES
+from mccc.mesh import cmfd_edges
+from mccc.mesh import generation_scores
+from mccc.mesh import mesh_edges
+from mccc.mesh import MESH_SCORES
+from mccc.mesh import MeshTally
+from mccc.parallel import create_executor
+from mccc.parallel import run_jobs
+from mccc.parallel import simulate_generation_parallel
 from mccc.plotting import plot_generations
 from mccc.plotting import plot_particle_convergence
-from mccc.plotting import plot_starting_positions
+from mccc.plotting import plot_source_histogram
+from mccc.population import control_population
+from mccc.profiling import RunProfile
+from mccc.progress import progress_reporter
+from mccc.results import RecordBuffer
+from mccc.results import results_sink
+from mccc.rng import COLLISION_STREAM
+from mccc.rng import ParticleStreams
+from mccc.rng import SOURCE_STREAM
+from mccc.sampling import FISSION
+from mccc.sampling import interaction_codes
+from mccc.sampling import INTERACTION_TYPES
 from mccc.sampling import sample_direction_cosine
 from mccc.sampling import sample_interaction_type
 from mccc.sampling import sample_neutrons_emitted
+from mccc.sampling import sample_optical_depth
 from mccc.sampling import sample_position
-from mccc.sampling import sample_scattering_distance
+from mccc.sampling import SCATTER
+from mccc.search import estimate_root
+from mccc.search import next_iterate
+from mccc.search import rescale_bank
+from mccc.search import SEARCH_PARAMS
+from mccc.search import with_parameter
+from mccc.setup import accumulate_tallies
+from mccc.setup import configure
 from mccc.setup import initialise_tallies
-from mccc.setup import setup_simulation
 from mccc.setup import update_user_input
+from mccc.variance_reduction import is_non_analog
+from mccc.variance_reduction import WEIGHTED_ENGINES
 
 
 def simulate_single_history(
     cfg,
     tallies,
     current_position,
+    streams=None,
+    history=0,
+    mesh=None,
 ):
     """
     Function to simulate a single neutron history in a 1D slab.
 
     Parameters:
+    - cfg (Config): Simulation configuration.
+    - tallies (dict): Tallies for this generation, updated in place.
+    - current_position (float): Starting position of the neutron.
+    - streams (ParticleStreams | None): Random number streams of the generation;
+                                        if None, streams are created from
+                                        `cfg.random_seed`.
+    - history (int): Index of this history within the generation, which selects
+                     its random number stream.
+    - mesh (MeshScores | None): Mesh scores to add this history's tracks and
+                                collisions to.
 
     Returns:
+    - tuple: Updated tallies and the list of fission-neutron start positions.
     """
 
+    if streams is None:
+        streams = ParticleStreams.for_generation(
+            np.random.SeedSequence(cfg.random_seed), 0
+        )
+
     tallies["history"] += 1
 
     new_positions = []
+    regions = cfg.slab_regions
+    region = int(regions.locate(current_position))
+    scatter_probs = regions.floats["scatter_prob"]
+    fission_probs = regions.floats["fission_prob"]
+    delta_tracking = cfg.tracking == "delta"
+
+    for draw in itertools.count():
+        # One block of random numbers per collision
+        rand_nums = streams.uniform_block(history, draw)
 
-    while True:
         # Free flight to next reaction/collision
-        direction_cosine = sample_direction_cosine()
-        scatter_distance = sample_scattering_distance(cfg.mean_free_path)
-        current_position = update_neutron_position(
-            current_position,
-            cfg.slab_thickness_cm,
-            direction_cosine,
-            cfg.left_boundary_condition,
-            scatter_distance,
-        )
+        direction_cosine = sample_direction_cosine(rand_nums[0])
+        if delta_tracking:
+            (
+                current_position,
+                region,
+                track_length,
+                fission_track,
+            ) = delta_track_to_collision(
+                regions,
+                current_position,
+                direction_cosine,
+                sample_optical_depth(rand_nums[1]),
+                cfg.left_boundary_condition,
+                streams,
+                history,
+                COLLISION_STREAM,
+                draw,
+                mesh=mesh,
+            )
+        else:
+            current_position, region, track_length, fission_track = track_to_collision(
+                regions,
+                region,
+                current_position,
+                direction_cosine,
+                sample_optical_depth(rand_nums[1]),
+                cfg.left_boundary_condition,
+                mesh=mesh,
+            )
+        tallies["track_length"] += track_length
+        tallies["track_fission"] += fission_track
 
         # Leakage
         if current_position < 0:
@@ -54,11 +152,21 @@ def simulate_single_history(
             return tallies, new_positions
 
         # Collisions
+        fission_prob = fission_probs[region]
         tallies["collision"] += 1
+        tallies["collision_fission"] += fission_prob
 
-        interaction_type = sample_interaction_type(cfg.scatter_prob, cfg.fission_prob)
+        interaction_type = sample_interaction_type(
+            scatter_probs[region], fission_prob, rand_nums[2]
+        )
 
         tallies[interaction_type] += 1
+        if mesh is not None:
+            mesh.score_collisions(
+                np.array([current_position]),
+                np.array([INTERACTION_TYPES.index(interaction_type)]),
+                regions.total_xs[region],
+            )
 
         # Capture
         if interaction_type == "capture":
@@ -66,7 +174,7 @@ def simulate_single_history(
 
         # Fission
         if interaction_type == "fission":
-            num_secondaries = sample_neutrons_emitted(cfg.nu)
+            num_secondaries = sample_neutrons_emitted(cfg.nu, rand_nums[3])
             tallies["secondary"] += num_secondaries
             for fission_neutron in range(num_secondaries):
                 new_positions.append(current_position)
@@ -76,70 +184,638 @@ def simulate_single_history(
         tallies["secondary"] += 1
 
 
-def run(num_generations, num_particles, plot=True, random_seed=None):
+def simulate_generation_history(
+    cfg, tallies, start_positions, streams, next_bank=None, first_history=0, mesh=None
+):
+    """
+    Function to simulate one generation history-by-history.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - tallies (dict): Tallies for this generation, updated in place.
+    - start_positions (sequence): Starting positions of this generation's neutrons.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - next_bank (FissionBank | None): Bank to add the fission sites to; a new bank
+                                      is created if None.
+    - first_history (int): Index within the generation of the first history.
+    - mesh (MeshScores | None): Mesh scores to add the tracks and collisions to.
+
+    Returns:
+    - tuple: Updated tallies and the bank of next-generation start positions.
+    """
+
+    if next_bank is None:
+        next_bank = FissionBank(precision=cfg.bank_precision)
+
+    # Start positions for the next generation, banked together at the end
+    next_start_positions = []
+
+    # Main loop over particles in this generation
+    for history, current_position in enumerate(
+        np.asarray(start_positions, dtype=float).tolist(), first_history
+    ):
+        # Particle history
+        tallies, new_start_positions = simulate_single_history(
+            cfg,
+            tallies,
+            current_position,
+            streams,
+            history,
+            mesh,
+        )
+        next_start_positions += new_start_positions
+
+    next_bank.append(next_start_positions)
+    return tallies, next_bank
+
+
+def simulate_generation_event(
+    cfg, tallies, start_positions, streams, next_bank=None, first_history=0, mesh=None
+):
+    """
+    Function to simulate one generation with the event-based engine.
+
+    All live neutrons of the generation are moved together through the flight,
+    boundary and collision stages as NumPy arrays; neutrons that leak, are
+    captured or cause fission are masked out after each stage. Each history
+    draws from its own random number stream, so the results are identical to
+    those of the history-based engine.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - tallies (dict): Tallies for this generation, updated in place.
+    - start_positions (sequence): Starting positions of this generation's neutrons.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - next_bank (FissionBank | None): Bank to add the fission sites to; a new bank
+                                      is created if None.
+    - first_history (int): Index within the generation of the first history.
+    - mesh (MeshScores | None): Mesh scores to add the tracks and collisions to.
+
+    Returns:
+    - tuple: Updated tallies and the bank of next-generation start positions.
+    """
+
+    if next_bank is None:
+        next_bank = FissionBank(precision=cfg.bank_precision)
+
+    positions = np.asarray(start_positions, dtype=float)
+    num_histories = positions.size
+    tallies["history"] += num_histories
+    regions = cfg.slab_regions
+    region_indices = regions.locate(positions)
+
+    # Every history ends at most once in fission, so its fission sites can be
+    # stored against the history and expanded in history order at the end
+    histories = np.arange(num_histories)
+    site_positions = np.zeros(num_histories)
+    num_sites = np.zeros(num_histories, dtype=np.int64)
+
+    # Every live neutron has had the same number of collisions, so they are all
+    # on the same block of their random number streams
+    draw = 0
+    while positions.size > 0:
+        rand_nums = streams.uniforms(histories + first_history, draw)
+
+        # Free flight to next reaction/collision
+        direction_cosines = sample_direction_cosine(rand_nums[0])
+        if cfg.tracking == "delta":
+            (
+                positions,
+                region_indices,
+                track_lengths,
+                fission_tracks,
+            ) = delta_track_to_collision_batch(
+                regions,
+                positions,
+                direction_cosines,
+                sample_optical_depth(rand_nums[1]),
+                cfg.left_boundary_condition,
+                streams,
+                histories + first_history,
+                COLLISION_STREAM,
+                draw,
+                mesh=mesh,
+            )
+        else:
+            (
+                positions,
+                region_indices,
+                track_lengths,
+                fission_tracks,
+            ) = track_to_collision_batch(
+                regions,
+                region_indices,
+                positions,
+                direction_cosines,
+                sample_optical_depth(rand_nums[1]),
+                cfg.left_boundary_condition,
+                mesh=mesh,
+            )
+        tallies["track_length"] += float(track_lengths.sum())
+        tallies["track_fission"] += float(fission_tracks.sum())
+
+        # Leakage. Each mask below is turned into indices once, and the arrays
+        # are gathered with them, which is cheaper than masking each array.
+        inside = np.flatnonzero(positions >= 0)
+        tallies["leakage"] += positions.size - inside.size
+        positions = positions[inside]
+        region_indices = region_indices[inside]
+        histories = histories[inside]
+        rand_nums = rand_nums[2:].take(inside, axis=1)
+
+        # Collisions
+        tallies["collision"] += positions.size
+        tallies["collision_fission"] += float(
+            regions.lookup(regions.fission_prob, region_indices).sum()
+        )
+
+        codes = interaction_codes(
+            regions.lookup(regions.scatter_prob, region_indices),
+            regions.lookup(regions.fission_prob, region_indices),
+            rand_nums[0],
+        )
+        scattered = np.flatnonzero(codes == SCATTER)
+        fissioned = np.flatnonzero(codes == FISSION)
+        num_scatter = scattered.size
+        num_fission = fissioned.size
+        tallies["scatter"] += num_scatter
+        tallies["fission"] += num_fission
+        tallies["capture"] += positions.size - num_scatter - num_fission
+        if mesh is not None:
+            mesh.score_collisions(positions, codes, regions.total_xs[region_indices])
+
+        # Fission
+        num_secondaries = sample_neutrons_emitted(cfg.nu, rand_nums[1][fissioned])
+        site_positions[histories[fissioned]] = positions[fissioned]
+        num_sites[histories[fissioned]] = num_secondaries
+        tallies["secondary"] += int(num_secondaries.sum())
+
+        # Scattering
+        tallies["secondary"] += num_scatter
+        positions = positions[scattered]
+        region_indices = region_indices[scattered]
+        histories = histories[scattered]
+        draw += 1
+
+    next_bank.append(np.repeat(site_positions, num_sites))
+    return tallies, next_bank
+
+
+# Smallest number of active generations of a run, or of replicas of a trial,
+# before its combined standard error is trusted to stop it. Well above the
+# number of combined estimators, as the error of a few samples is itself
+# uncertain, and stopping on the first low value of it biases the error low.
+MIN_ACTIVE_SAMPLES = 20
+
+# Number of replicas of a trial without a target standard error
+NUM_REPLICAS = 10
+
+# Results of each replica a trial keeps
+REPLICA_RESULTS = (
+    "k1",
+    "k2",
+    "k_collision",
+    "k_track_length",
+    "histories",
+    "active_tallies",
+)
+
+# Config fields a restart can change, as they do not change the results; the
+# parameters of `restart` that main passes on
+RESTART_OPTIONS = (
+    "num_generations",
+    "workers",
+    "profile",
+    "profile_file",
+    "progress",
+    "metrics_file",
+    "metrics_format",
+)
+
+# Config fields the command line applies to single runs only, not to the
+# replicas of a study or the iterates of a search
+SINGLE_RUN_OPTIONS = (
+    "checkpoint_dir",
+    "checkpoint_interval",
+    "mesh_bins",
+    "mesh_edges",
+    "profile",
+    "profile_file",
+)
+
+ENGINES = {
+    "history": simulate_generation_history,
+    "event": simulate_generation_event,
+}
+
+
+def run(num_generations, num_particles, plot=True, verbose=False, **options):
     """
     A single independent run with a fixed number of generations and particles.
+    The other keyword arguments set the Config fields of the same name; those
+    that are None keep their defaults.
+
+    The first generations are inactive: they only converge the fission source.
+    Active tallies and k_eff statistics are accumulated over the remaining
+    generations. With `auto_inactive`, the source is declared converged (and
+    the active generations start) once its Shannon entropy has stabilised.
+    With `target_std`, the run stops as soon as the standard error of the
+    combined k_eff estimate over the active generations is below the target,
+    after at least MIN_ACTIVE_SAMPLES active generations.
+    With `results_file`, the results of each generation are streamed to disk
+    as they are produced. With `checkpoint_dir`, a checkpoint to restart from
+    is written every `checkpoint_interval` generations. With `mesh_bins` or
+    `mesh_edges`, fluxes and reaction rates are tallied on a spatial mesh over
+    the active generations, and reported in verbose mode. With
+    `implicit_capture`, `weight_cutoff` or `weight_windows`, neutrons carry
+    weights and the variance reduction games are played; compare the figure
+    of merit reported in verbose mode with that of the analog run. With
+    `regions`, the slab is made of layers of different materials, each given
+    by its right-hand boundary and its total, scatter and fission
+    cross-sections; with `tracking="delta"`, neutrons are moved by delta
+    tracking rather than region by region. With `cmfd_bins`, the fission
+    source of the inactive generations is accelerated by coarse-mesh finite
+    difference (CMFD); this needs population control and inactive
+    generations. With `profile`, the
+    wall time of each phase of each generation is reported at the end of the
+    run; with `profile_file`, cProfile statistics of the transport are also
+    written to that file. With `progress`, a progress line with an ETA is
+    printed every few seconds; with `metrics_file`, the progress metrics are
+    rewritten to that file every few seconds.
     """
 
-    # Sensible defaults
-    defaults = setup_simulation()
+    cfg = configure(
+        num_generations=num_generations, num_particles=num_particles, **options
+    )
 
-    # Over-ride with any user input
-    # Create a dictionary from provided arguments that correspond to fields in
-    # the `defaults` object
-    user_input = {
-        k: v
-        for k, v in locals().items()
-        if k in defaults.__annotations__ and v is not None
-    }
+    results = Simulation(cfg, plot=plot, verbose=verbose).run()
+    if not verbose:
+        print_run_length(cfg, results)
+    return results["k1"], results["k2"]
 
-    # Replace defaults with user input
-    cfg = update_user_input(defaults, user_input)
-    if cfg.random_seed is not None:
-        np.random.seed(cfg.random_seed)
 
-    # Get a uniformly distributed set of starting positions for the initial
-    # generation of particles
-    start_positions = [
-        sample_position(cfg.slab_thickness_cm) for _ in range(cfg.num_particles)
-    ]
+def print_run_length(cfg, results):
+    """
+    Print the number of histories and generations of a run whose length is
+    not known in advance, as it stops on a target standard error or a
+    history budget. Verbose runs print it in their summary.
+    """
 
-    # Lists for storing the estimates of k_effective across generations
-    # k1 and k2 are two different estimators for k_effective
-    k1 = []
-    k2 = []
+    if cfg.target_std is not None or cfg.max_histories is not None:
+        print(f"Histories: {results['histories']} in {len(results['k1'])} generations")
 
-    for gen in range(cfg.num_generations):
-        num_particles_in_generation = len(start_positions)
-        if num_particles_in_generation == 0:
-            sys.exit("Zero particles")
 
-        if plot:
-            plot_starting_positions(cfg.num_generations, gen, start_positions)
+class SimulationError(RuntimeError):
+    """
+    Error raised when a run cannot go on, e.g. when a generation has no
+    particles or no collisions.
+    """
+
 
-        # Reset all the tallies to zero for this generation
-        tallies = initialise_tallies()
+@dataclass
+class GenerationResult:
+    """
+    Results of one generation of a run.
 
-        # Initialise a list for the start positions of the next generation,
-        # arising from fission in this generation
-        next_start_positions = []
+    Parameters:
+    - generation (int): Generation number.
+    - active (bool): Whether the generation is active.
+    - tallies (dict): Tallies of the generation.
+    - k1 (float): Absorption estimate of k_eff.
+    - k2 (float): Ratio of the weights of the next and this generation's banks.
+    - k_collision (float): Collision estimate of k_eff.
+    - k_track_length (float): Track-length estimate of k_eff.
+    - k_cmfd (float | None): CMFD estimate of k_eff, or None without CMFD.
+    - entropy (float): Shannon entropy of the generation's source.
+    - bank (FissionBank): Source bank of the next generation.
+    - time_s (float): Wall time of the generation in seconds.
+    """
 
-        # Main loop over particles in this generation
-        for current_position in start_positions:
-            # Particle history
-            tallies, new_start_positions = simulate_single_history(
-                cfg,
-                tallies,
-                current_position,
+    generation: int
+    active: bool
+    tallies: dict
+    k1: float
+    k2: float
+    k_collision: float
+    k_track_length: float
+    k_cmfd: float | None
+    entropy: float
+    bank: FissionBank
+    time_s: float
+
+
+class Simulation:
+    """
+    A run of a configuration, generation by generation.
+
+    Iterating over a Simulation runs its generations one at a time, yielding
+    a GenerationResult after each, so a caller can stop early, check its own
+    convergence criteria or hand each bank on to another stage. The
+    iteration ends after `cfg.num_generations` generations, or earlier once
+    `cfg.target_std` or `cfg.max_histories` is met; iterating again after
+    leaving a loop early carries on from the next generation. `results()`
+    gives the results of the generations run so far, and `run()` runs the
+    remaining generations and returns them.
+
+    The worker pool, results file and progress reporter are open only while
+    iterating. They are closed when the iteration ends, including when a
+    loop over the Simulation is left early. Failures raise exceptions:
+    ValueError for an invalid configuration and SimulationError for a run
+    that cannot go on.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - bank (FissionBank | None): Source of the first generation, e.g. the
+                                 converged source of an earlier run, or None
+                                 for a uniform source.
+    - sink (object | None): Sink for per-generation results (any object with a
+                            `write(record)` method), or None to open one for
+                            `cfg.results_file`.
+    - labels (dict | None): Extra values to add to every results record.
+    - reporter (ProgressReporter | None): Reporter of an enclosing study to
+                                          report progress to, or None to
+                                          create one for `cfg.progress` or
+                                          `cfg.metrics_file`.
+    - plot (bool): Whether to plot the source distribution of each generation
+                   once the run is over.
+    - verbose (bool): Whether to print per-generation and summary information.
+    - seed_sequence (np.random.SeedSequence | None): Root seed sequence of the
+                                                     run, or None to create
+                                                     one from the seed.
+    - state (dict | None): Run state to carry on from, as saved in a
+                           checkpoint.
+    """
+
+    def __init__(
+        self,
+        cfg,
+        bank=None,
+        sink=None,
+        labels=None,
+        reporter=None,
+        plot=False,
+        verbose=False,
+        seed_sequence=None,
+        state=None,
+    ):
+        if cfg.engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {cfg.engine}")
+        if cfg.tracking not in TRACKING_MODES:
+            raise ValueError(f"Unknown tracking mode: {cfg.tracking}")
+        if cfg.cmfd_bins is not None and cfg.population_control == "none":
+            # The CMFD feedback only changes the bank weights
+            raise ValueError("CMFD needs population control ('comb' or 'resample')")
+        if cfg.cmfd_bins is not None and not (cfg.num_inactive or cfg.auto_inactive):
+            # The CMFD feedback only acts in inactive generations
+            raise ValueError(
+                "CMFD needs inactive generations (num_inactive or auto_inactive)"
+            )
+        # Non-analog transport carries particle weights
+        engines = WEIGHTED_ENGINES if is_non_analog(cfg) else ENGINES
+        self.simulate_generation = engines[cfg.engine]
+
+        self.cfg = cfg
+        self.sink = sink
+        self.labels = labels or {}
+        self.reporter = reporter
+        self.plot = plot
+        self.verbose = verbose
+
+        # Each generation keys its own set of per-history random number
+        # streams on this seed sequence (fresh entropy if no seed is given)
+        if seed_sequence is None:
+            seed_sequence = np.random.SeedSequence(cfg.random_seed)
+        self.seed_sequence = seed_sequence
+
+        # Get a uniformly distributed set of starting positions for the
+        # initial generation of particles
+        if bank is None:
+            source_streams = ParticleStreams.for_generation(seed_sequence, 0)
+            bank = FissionBank.from_positions(
+                sample_position(
+                    cfg.slab_thickness_cm,
+                    rand_num=source_streams.uniforms(
+                        np.arange(cfg.num_particles), 0, stream=SOURCE_STREAM
+                    )[0],
+                ),
+                precision=cfg.bank_precision,
+            )
+        self.bank = bank
+
+        # Lists for storing the estimates of k_effective across generations
+        # k1 and k2 are two different estimators for k_effective; the
+        # collision and track-length estimators are combined with k1 (the
+        # absorption estimator) into a minimum-variance estimate
+        self.k1 = []
+        self.k2 = []
+        self.k_collision = []
+        self.k_track_length = []
+
+        # Source convergence: the binned source and its Shannon entropy in
+        # each generation, and the first active generation (not yet known in
+        # automatic mode)
+        self.source_histogram = SourceHistogram(cfg.slab_thickness_cm, cfg.entropy_bins)
+        self.entropy = []
+        self.first_active = None if cfg.auto_inactive else cfg.num_inactive
+        self.active_tallies = initialise_tallies()
+        self.histories = 0
+        self.generation = 0
+        self.start_time = time.perf_counter()
+
+        # Per-phase timings, only when profiling (None otherwise, so the
+        # generations cost nothing extra)
+        self.profiler = None
+        if cfg.profile or cfg.profile_file is not None:
+            self.profiler = RunProfile(cfg.profile_file)
+
+        # Spatial mesh tally over the active generations
+        edges = mesh_edges(cfg)
+        self.mesh_tally = None if edges is None else MeshTally(edges)
+
+        # Coarse-mesh tally for CMFD over all the generations, and the CMFD
+        # estimate of k_eff from each generation on
+        self.coarse_edges = cmfd_edges(cfg)
+        self.cmfd_tally = (
+            None if self.coarse_edges is None else CMFDTally(self.coarse_edges)
+        )
+        self.k_cmfd = []
+
+        # Carry on from a checkpoint
+        self.results_offset = None
+        if state is not None:
+            self.generation = state["generation"]
+            self.k1 = state["k1"]
+            self.k2 = state["k2"]
+            self.k_collision = state["k_collision"]
+            self.k_track_length = state["k_track_length"]
+            self.entropy = state["entropy"]
+            self.source_histogram.update_from_dict(state["source_histogram"])
+            self.first_active = state["first_active"]
+            self.active_tallies = state["active_tallies"]
+            self.histories = state["histories"]
+            self.results_offset = state["results_offset"]
+            if self.mesh_tally is not None:
+                self.mesh_tally.update_from_dict(state["mesh"])
+            if self.cmfd_tally is not None:
+                self.cmfd_tally.update_from_dict(state["cmfd"])
+                self.k_cmfd = state["k_cmfd"]
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint_dir, verbose=False, **overrides):
+        """
+        Create a Simulation that carries on from a checkpoint.
+
+        Parameters:
+        - checkpoint_dir (str | Path): Directory holding the checkpoint.
+        - verbose (bool): Whether to print per-generation and summary
+                          information.
+        - overrides: Config fields to change, which should not change the
+                     results (e.g. num_generations or workers).
+
+        Returns:
+        - Simulation: The run, at the checkpointed generation. Further
+                      checkpoints are written to the same directory.
+        """
+
+        cfg, seed_sequence, bank, state = read_checkpoint(checkpoint_dir)
+        cfg = update_user_input(
+            cfg, {**overrides, "checkpoint_dir": str(checkpoint_dir)}
+        )
+        return cls(cfg, bank, verbose=verbose, seed_sequence=seed_sequence, state=state)
+
+    def finished(self):
+        """
+        Whether the run is over: all the generations are run, the combined
+        estimate is precise enough, or the history budget is spent.
+        """
+
+        cfg = self.cfg
+        if self.generation >= cfg.num_generations:
+            return True
+        if (
+            cfg.target_std is not None
+            and self.first_active is not None
+            and self.generation - self.first_active >= MIN_ACTIVE_SAMPLES
+        ):
+            _, std_err, _ = combined_estimate(
+                [
+                    k[self.first_active :]
+                    for k in (self.k1, self.k_collision, self.k_track_length)
+                ]
             )
+            if std_err < cfg.target_std:
+                return True
+        return cfg.max_histories is not None and self.histories >= cfg.max_histories
+
+    def __iter__(self):
+        cfg = self.cfg
+        if self.finished():
+            return
+        executor = None if cfg.workers is None else create_executor(cfg.workers)
+        total = (cfg.num_generations - self.generation) * cfg.num_particles
+
+        with (
+            executor or nullcontext(),
+            results_sink(
+                cfg.results_file, cfg.results_format, self.sink, self.results_offset
+            ) as sink,
+            progress_reporter(cfg, total, self.reporter) as reporter,
+        ):
+            try:
+                while not self.finished():
+                    yield self._run_generation(executor, sink, reporter)
+            finally:
+                # Where a results file opened here is to be continued from
+                if sink is not self.sink:
+                    self.results_offset = getattr(sink, "tell", lambda: None)()
 
-            # Add the new start positions from this history to the global list
-            # of start positions for the next generation
-            next_start_positions += new_start_positions
+        if self.plot:
+            plot_source_histogram(self.source_histogram)
+            if self.profiler is not None:
+                self.profiler.lap("plotting")
+        if self.profiler is not None:
+            self.profiler.finish()
+        if self.verbose:
+            self.print_summary()
+        if self.profiler is not None:
+            self.profiler.report()
+
+    def run(self):
+        """
+        Run the remaining generations.
+
+        Returns:
+        - dict: The results of the run, as from `results()`.
+        """
+
+        for _ in self:
+            pass
+        return self.results()
+
+    def _run_generation(self, executor, sink, reporter):
+        """
+        Run the next generation.
+        """
+
+        cfg = self.cfg
+        gen = self.generation
+        bank = self.bank
+        profiler = self.profiler
+        k1 = self.k1
+        k2 = self.k2
+        k_collision = self.k_collision
+        k_track_length = self.k_track_length
+        k_cmfd = self.k_cmfd
+        entropy = self.entropy
+
+        generation_start_time = time.perf_counter()
+        if profiler is not None:
+            profiler.start_generation()
+        num_particles_in_generation = len(bank)
+        if num_particles_in_generation == 0:
+            raise SimulationError(f"Zero particles in generation {gen}")
+
+        entropy.append(entropy_of_fractions(self.source_histogram.add(bank)))
+        if (
+            self.first_active is None
+            and gen >= cfg.num_inactive
+            and entropy_converged(entropy, cfg.entropy_window, cfg.entropy_tolerance)
+        ):
+            self.first_active = gen
+        active = self.first_active is not None and gen >= self.first_active
+        if profiler is not None:
+            profiler.lap("source")
+
+        # Reset all the tallies to zero for this generation
+        tallies = initialise_tallies()
+        mesh_scores = generation_scores(cfg)
+        streams = ParticleStreams.for_generation(self.seed_sequence, gen)
+
+        # Transport all particles in this generation, collecting the start
+        # positions of the next generation in a bank sized for k ~ 1
+        next_bank = FissionBank(len(bank), precision=cfg.bank_precision, generation=gen)
+        with nullcontext() if profiler is None else profiler.transport():
+            if cfg.workers is None:
+                tallies, next_bank = self.simulate_generation(
+                    cfg, tallies, bank.positions, streams, next_bank, mesh=mesh_scores
+                )
+            else:
+                tallies, next_bank = simulate_generation_parallel(
+                    self.simulate_generation,
+                    cfg,
+                    tallies,
+                    bank,
+                    streams,
+                    next_bank,
+                    executor,
+                    mesh_scores,
+                )
+        if profiler is not None:
+            profiler.lap("transport")
 
         # Can happen for small numbers of starting particles
         if tallies["collision"] == 0:
-            sys.exit("Zero collisions")
+            raise SimulationError(f"Zero collisions in generation {gen}")
 
         # Estimate k_eff
         k1.append(
@@ -147,11 +823,40 @@ def run(num_generations, num_particles, plot=True, random_seed=None):
             * tallies["fission"]
             / (tallies["capture"] + tallies["leakage"] + tallies["fission"])
         )
-        k2.append(len(next_start_positions) / num_particles_in_generation)
+        k2.append(next_bank.total_weight() / bank.total_weight())
+        k_collision.append(cfg.nu * tallies["collision_fission"] / tallies["history"])
+        k_track_length.append(cfg.nu * tallies["track_fission"] / tallies["history"])
         c = tallies["secondary"] / tallies["collision"]
 
-        verbose = False
-        if verbose:
+        self.histories += tallies["history"]
+        if active:
+            accumulate_tallies(self.active_tallies, tallies)
+            if self.mesh_tally is not None:
+                self.mesh_tally.add_batch(mesh_scores.mesh, bank.total_weight())
+        if profiler is not None:
+            profiler.lap("tallies")
+
+        # CMFD: solve the low-order eigenproblem on the coarse-mesh scores so
+        # far, and while the source is still converging, move the next
+        # generation's source toward the CMFD fission source
+        if self.cmfd_tally is not None:
+            self.cmfd_tally.add_batch(mesh_scores.cmfd, bank.total_weight())
+            solution = self.cmfd_tally.solve(cfg)
+            k_cmfd.append(float("nan") if solution is None else solution[0])
+            if solution is not None and not active:
+                reweight_bank(next_bank, self.coarse_edges, solution[1])
+            if profiler is not None:
+                profiler.lap("cmfd")
+
+        if self.verbose:
+            print(
+                f"Generation {gen}: k1 = {k1[-1]:.6f}, k2 = {k2[-1]:.6f}, "
+                f"k_collision = {k_collision[-1]:.6f}, "
+                f"k_track_length = {k_track_length[-1]:.6f}, "
+                + (f"k_cmfd = {k_cmfd[-1]:.6f}, " if k_cmfd else "")
+                + f"entropy = {entropy[-1]:.6f}, "
+                f"{'active' if active else 'inactive'}"
+            )
             print(tallies)
             print(
                 "Fission", tallies["fission"] / tallies["collision"], cfg.fission_prob
@@ -168,79 +873,667 @@ def run(num_generations, num_particles, plot=True, random_seed=None):
             )
             print("c", c)
             print(cfg.nu * cfg.fission_prob / (c - cfg.scatter_prob))
-            print(f"k1 = {k1}")
-            print(f"k2 = {k2}")
 
-            # Sanity checks
+            # Sanity checks (in the analog game, where tallies are counts)
             assert tallies["history"] == num_particles_in_generation
-            assert (
-                tallies["capture"] + tallies["leakage"] + tallies["fission"]
-                == num_particles_in_generation
+            if not is_non_analog(cfg):
+                assert (
+                    tallies["capture"] + tallies["leakage"] + tallies["fission"]
+                    == num_particles_in_generation
+                )
+                assert (
+                    tallies["scatter"] + tallies["fission"] + tallies["capture"]
+                    == tallies["collision"]
+                )
+
+        # Comb or resample the bank back to the requested population
+        if profiler is not None:
+            profiler.lap("output")
+        bank = control_population(cfg, next_bank, streams)
+        self.bank = bank
+        self.generation = gen + 1
+        if profiler is not None:
+            profiler.lap("population")
+
+        end_time = time.perf_counter()
+        if sink is not None:
+            sink.write(
+                {
+                    **self.labels,
+                    "num_particles": cfg.num_particles,
+                    "generation": gen,
+                    "active": active,
+                    "k1": k1[-1],
+                    "k2": k2[-1],
+                    "k_collision": k_collision[-1],
+                    "k_track_length": k_track_length[-1],
+                    **({"k_cmfd": k_cmfd[-1]} if k_cmfd else {}),
+                    "entropy": entropy[-1],
+                    **tallies,
+                    "bank_size": len(bank),
+                    "time_s": end_time - generation_start_time,
+                    "elapsed_s": end_time - self.start_time,
+                }
+            )
+
+        if cfg.checkpoint_dir is not None and (gen + 1) % cfg.checkpoint_interval == 0:
+            write_checkpoint(
+                cfg.checkpoint_dir,
+                cfg,
+                self.seed_sequence,
+                bank,
+                {
+                    "generation": gen + 1,
+                    "k1": k1,
+                    "k2": k2,
+                    "k_collision": k_collision,
+                    "k_track_length": k_track_length,
+                    "entropy": entropy,
+                    "source_histogram": self.source_histogram.to_dict(),
+                    "first_active": self.first_active,
+                    "active_tallies": self.active_tallies,
+                    "histories": self.histories,
+                    "mesh": (
+                        None if self.mesh_tally is None else self.mesh_tally.to_dict()
+                    ),
+                    "k_cmfd": k_cmfd,
+                    "cmfd": (
+                        None if self.cmfd_tally is None else self.cmfd_tally.to_dict()
+                    ),
+                    "results_offset": getattr(sink, "tell", lambda: None)(),
+                },
             )
-            assert (
-                tallies["scatter"] + tallies["fission"] + tallies["capture"]
-                == tallies["collision"]
+        if reporter is not None:
+            reporter.update(
+                tallies["history"],
+                work=cfg.num_particles,
+                generation=gen,
+                k1=k1[-1],
+                k2=k2[-1],
+                bank_size=len(bank),
             )
+        if profiler is not None:
+            profiler.lap("output")
+            profiler.end_generation(gen, tallies, len(bank))
 
-        start_positions = next_start_positions
+        return GenerationResult(
+            generation=gen,
+            active=active,
+            tallies=tallies,
+            k1=k1[-1],
+            k2=k2[-1],
+            k_collision=k_collision[-1],
+            k_track_length=k_track_length[-1],
+            k_cmfd=k_cmfd[-1] if k_cmfd else None,
+            entropy=entropy[-1],
+            bank=bank,
+            time_s=end_time - generation_start_time,
+        )
 
-    if plot:
-        plot_starting_positions(cfg.num_generations, gen)
+    def results(self):
+        """
+        Get the results of the generations run so far.
 
-    return k1, k2
+        Returns:
+        - dict: Per-generation `k1`, `k2` and source `entropy` lists, the
+                binned source of each generation (`source_histogram`), the
+                `first_active` generation (None if never reached), the
+                `active_tallies`, the total number of `histories` run, the
+                active-generation `mesh` tally (a MeshTally, or None), the
+                combined k_eff `k_combined` and its figure of merit `fom`
+                (None without active generations), the per-generation CMFD
+                estimates `k_cmfd` (empty without CMFD), the source `bank`
+                for a next generation, and the `profile` of the run (a
+                RunProfile, or None when not profiling).
+        """
+
+        first_active = self.first_active
+        if first_active is not None and first_active < len(self.k1):
+            k_combined = combined_estimate(
+                [
+                    k[first_active:]
+                    for k in (self.k1, self.k_collision, self.k_track_length)
+                ]
+            )
+            run_time = time.perf_counter() - self.start_time
+            fom = figure_of_merit(k_combined[0], k_combined[1], run_time)
+        else:
+            first_active = None
+            k_combined = None
+            fom = None
+
+        return {
+            "k1": self.k1,
+            "k2": self.k2,
+            "k_collision": self.k_collision,
+            "k_track_length": self.k_track_length,
+            "k_combined": k_combined,
+            "entropy": self.entropy,
+            "source_histogram": self.source_histogram,
+            "first_active": first_active,
+            "active_tallies": self.active_tallies,
+            "histories": self.histories,
+            "mesh": self.mesh_tally,
+            "fom": fom,
+            "k_cmfd": self.k_cmfd,
+            "bank": self.bank,
+            "profile": self.profiler,
+        }
+
+    def print_summary(self):
+        """
+        Print the number of histories run and the active-generation estimates.
+        """
+
+        results = self.results()
+        first_active = results["first_active"]
+        print(f"Histories: {self.histories} in {len(self.k1)} generations")
+        if first_active is None:
+            print("No active generations: the source has not converged")
+            return
+        print(f"Active generations: {first_active} to {len(self.k1) - 1}")
+        print(f"Active tallies: {self.active_tallies}")
+        for name in ("k1", "k2", "k_collision", "k_track_length"):
+            mean, std_err = active_statistics(results[name][first_active:])
+            print(f"{name} = {mean:.6f} +/- {std_err:.6f}")
+        mean, std_err, weights = results["k_combined"]
+        print(
+            f"k = {mean:.6f} +/- {std_err:.6f} (weights: k1 {weights[0]:.3f}, "
+            f"k_collision {weights[1]:.3f}, k_track_length {weights[2]:.3f})"
+        )
+        run_time = time.perf_counter() - self.start_time
+        print(f"FOM = 1/(R^2 T) = {results['fom']:.6g} /s (T = {run_time:.3f} s)")
+        if self.mesh_tally is not None and self.mesh_tally.num_batches > 0:
+            print_mesh_tally(self.mesh_tally)
 
 
-def trial(num_generations, num_particles, random_seed=None):
+def simulate(
+    cfg, plot=False, verbose=False, sink=None, labels=None, bank=None, reporter=None
+):
     """
-    Run a trial; a set of n independent but identical runs, averaged over.
+    Function to perform a run for a complete configuration.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - plot (bool): Whether to plot the source distribution of each generation
+                   once the run is over.
+    - verbose (bool): Whether to print per-generation and summary information.
+    - sink (object | None): Sink for per-generation results, or None to open
+                            one for `cfg.results_file`.
+    - labels (dict | None): Extra values to add to every results record.
+    - bank (FissionBank | None): Source of the first generation, or None for a
+                                 uniform source.
+    - reporter (ProgressReporter | None): Reporter of an enclosing study, or
+                                          None.
+
+    Returns:
+    - dict: The results of the run, as from `Simulation.results()`.
     """
-    n = 10
-    seeds = [None] * n
-    if random_seed is not None:
-        seeds = [random_seed + i for i in range(n)]
-    k1, k2 = zip(
-        *[
-            run(
-                num_generations,
-                num_particles,
-                random_seed=seed,
-            )
-            for seed in seeds
+
+    return Simulation(
+        cfg,
+        bank=bank,
+        sink=sink,
+        labels=labels,
+        reporter=reporter,
+        plot=plot,
+        verbose=verbose,
+    ).run()
+
+
+def restart(
+    checkpoint_dir,
+    num_generations=None,
+    workers=None,
+    profile=None,
+    profile_file=None,
+    progress=None,
+    metrics_file=None,
+    metrics_format=None,
+    verbose=False,
+):
+    """
+    Resume a run from a checkpoint.
+
+    The run continues with the configuration stored in the checkpoint, and
+    gives exactly the results of the uninterrupted run. Only the number of
+    generations (e.g. to extend the run), the number of workers and the
+    profiling and progress options, which do not change the results, can be
+    overridden. Further checkpoints are written to the same directory, and a
+    JSONL or CSV results file is truncated to the end of the checkpointed
+    generation and continued.
+
+    Parameters:
+    - checkpoint_dir (str): Directory holding the checkpoint.
+    - num_generations (int | None): New total number of generations.
+    - workers (int | None): Number of worker processes.
+    - profile (bool | None): Whether to report per-phase timings of the run.
+    - profile_file (str | None): File to write cProfile statistics to.
+    - progress (bool | None): Whether to print progress lines.
+    - metrics_file (str | None): File to write the progress metrics to.
+    - metrics_format (str | None): Format of the metrics file.
+    - verbose (bool): Whether to print per-generation and summary information.
+
+    Returns:
+    - tuple: k1 and k2 estimates of all generations, including those run
+             before the checkpoint.
+    """
+
+    overrides = {
+        k: v
+        for k, v in dict(
+            num_generations=num_generations,
+            workers=workers,
+            profile=profile,
+            profile_file=profile_file,
+            progress=progress,
+            metrics_file=metrics_file,
+            metrics_format=metrics_format,
+        ).items()
+        if v is not None
+    }
+    simulation = Simulation.from_checkpoint(
+        checkpoint_dir, verbose=verbose, **overrides
+    )
+    results = simulation.run()
+    if not verbose:
+        print_run_length(simulation.cfg, results)
+    return results["k1"], results["k2"]
+
+
+def print_mesh_tally(mesh_tally):
+    """
+    Print the mean and standard error of each mesh tally score, bin by bin.
+    """
+
+    print("Mesh tally (per source neutron per cm):")
+    print(" ".join(["x_low", "x_high"] + [f"{name} +/- se" for name in MESH_SCORES]))
+    means = [mesh_tally.mean(name) for name in MESH_SCORES]
+    std_errs = [mesh_tally.std_err(name) for name in MESH_SCORES]
+    for i, (low, high) in enumerate(zip(mesh_tally.edges[:-1], mesh_tally.edges[1:])):
+        values = [
+            f"{mean[i]:.6f} +/- {std_err[i]:.6f}"
+            for mean, std_err in zip(means, std_errs)
         ]
+        print(f"{low:.6f} {high:.6f} " + " ".join(values))
+
+
+def trial(
+    num_generations,
+    num_particles,
+    num_replicas=NUM_REPLICAS,
+    max_replicas=100,
+    verbose=False,
+    sink=None,
+    cache=None,
+    reporter=None,
+    **options,
+):
+    """
+    Run a trial; a set of n independent but identical runs, averaged over.
+    The other keyword arguments set Config fields, as for `run`.
+
+    With `target_std`, replicas are added one at a time (from a minimum of
+    MIN_ACTIVE_SAMPLES, up to `max_replicas` or `max_histories` histories) until the
+    standard error of the combined final-generation k_eff is below the
+    target; otherwise exactly `num_replicas` runs are made. Per-generation
+    results of every replica go to `sink` (or `results_file`), labelled with
+    the replica number. With a `cache` (a ResultCache), replicas already in
+    it are not run again. Progress is reported to `reporter` (a
+    ProgressReporter), or with `progress` or `metrics_file`, replica by
+    replica.
+    """
+    cfg = configure(
+        num_generations=num_generations, num_particles=num_particles, **options
     )
-    k1m = np.mean(np.array(k1), axis=0)
-    k1s = np.std(np.array(k1), axis=0)
-    k2m = np.mean(np.array(k2), axis=0)
-    k2s = np.std(np.array(k2), axis=0)
+
+    # The target and budget apply to the trial as a whole, not to each run,
+    # and so does the progress report
+    replica_cfg = replace(
+        cfg, target_std=None, max_histories=None, progress=False, metrics_file=None
+    )
+    total = None
+    if cfg.target_std is None:
+        total = num_replicas * cfg.num_generations * cfg.num_particles
+
+    with (
+        results_sink(cfg.results_file, cfg.results_format, sink) as sink,
+        progress_reporter(cfg, total, reporter) as reporter,
+    ):
+        if cfg.workers is not None and cfg.target_std is None:
+            # All the replicas at once, one per worker
+            replicas = schedule_replicas(
+                [(replica_cfg, num_replicas)],
+                cfg.workers,
+                sink,
+                verbose,
+                cache,
+                reporter,
+            )[0]
+            return summarise_trial(replicas, verbose)
+
+        # The number of replicas is not known in advance
+        verbose = verbose or cfg.target_std is not None
+        replicas = []
+        histories = 0
+        for i in itertools.count():
+            if cfg.target_std is None:
+                if i == num_replicas:
+                    break
+            else:
+                if i >= MIN_ACTIVE_SAMPLES:
+                    _, std_err, _ = combined_estimate(final_estimates(replicas))
+                    if std_err < cfg.target_std:
+                        break
+                if i == max_replicas:
+                    break
+                if cfg.max_histories is not None and histories >= cfg.max_histories:
+                    break
+
+            seed = None if cfg.random_seed is None else cfg.random_seed + i
+            replica = cached_replica(
+                replace(replica_cfg, random_seed=seed),
+                {"replica": i},
+                sink,
+                cache,
+                reporter,
+            )
+            replicas.append(replica)
+            histories += replica["histories"]
+
+    return summarise_trial(replicas, verbose)
+
+
+def final_estimates(replicas):
+    """
+    Get the final-generation k1, collision and track-length estimates of each
+    replica of a trial.
+    """
+
+    return [
+        [replica[name][-1] for replica in replicas]
+        for name in ("k1", "k_collision", "k_track_length")
+    ]
+
+
+def summarise_trial(replicas, verbose=False):
+    """
+    Average the per-generation k1 and k2 over the replicas of a trial.
+
+    Parameters:
+    - replicas (list): REPLICA_RESULTS of each replica.
+    - verbose (bool): Whether to print the combined estimate of the trial.
+
+    Returns:
+    - tuple: Per-generation mean and standard deviation of k1, and of k2.
+    """
+
+    if verbose:
+        mean, std_err, _ = combined_estimate(final_estimates(replicas))
+        histories = sum(replica["histories"] for replica in replicas)
+        print(
+            f"Trial: {len(replicas)} replicas, {histories} histories, "
+            f"k = {mean:.6f} +/- {std_err:.6f}"
+        )
+
+    k1 = np.array([replica["k1"] for replica in replicas])
+    k2 = np.array([replica["k2"] for replica in replicas])
+    k1m = np.mean(k1, axis=0)
+    k1s = np.std(k1, axis=0)
+    k2m = np.mean(k2, axis=0)
+    k2s = np.std(k2, axis=0)
     return (k1m, k1s, k2m, k2s)
 
 
-def study_convergence(num_generations, particles_list, random_seed=None):
+def run_replica(cfg, labels, keep_records, reporter=None):
+    """
+    Run one replica of a trial, e.g. in a worker process.
+
+    Parameters:
+    - cfg (Config): Configuration of the replica.
+    - labels (dict): Extra values to add to every results record.
+    - keep_records (bool): Whether to return the per-generation results
+                           records.
+    - reporter (ProgressReporter | None): Reporter to report progress to.
+
+    Returns:
+    - tuple: REPLICA_RESULTS of the replica, and its records (None if not
+             kept).
+    """
+
+    buffer = RecordBuffer() if keep_records else None
+    results = Simulation(cfg, sink=buffer, labels=labels, reporter=reporter).run()
+    summary = {name: results[name] for name in REPLICA_RESULTS}
+    return summary, None if buffer is None else buffer.records
+
+
+def cached_replica(cfg, labels, sink, cache, reporter=None):
+    """
+    Run one replica of a trial in this process, or get its results from the
+    cache.
+
+    Parameters:
+    - cfg (Config): Configuration of the replica.
+    - labels (dict): Extra values to add to every results record.
+    - sink (object | None): Sink for per-generation results, or None.
+    - cache (ResultCache | None): Cache of replica results, or None.
+    - reporter (ProgressReporter | None): Reporter to report progress to.
+
+    Returns:
+    - dict: REPLICA_RESULTS of the replica.
+    """
+
+    if cache is None:
+        results = Simulation(cfg, sink=sink, labels=labels, reporter=reporter).run()
+        return {name: results[name] for name in REPLICA_RESULTS}
+
+    cached = cache.get(cfg, labels)
+    if cached is None:
+        cached = run_replica(cfg, labels, keep_records=True, reporter=reporter)
+        cache.put(cfg, labels, *cached)
+    elif reporter is not None:
+        reporter.update(
+            work=cfg.num_generations * cfg.num_particles,
+            k1=cached[0]["k1"][-1],
+            k2=cached[0]["k2"][-1],
+        )
+    replica, records = cached
+    if sink is not None:
+        for record in records:
+            sink.write(record)
+    return replica
+
+
+def schedule_replicas(
+    trials, workers, sink=None, verbose=False, cache=None, reporter=None
+):
+    """
+    Run the replicas of one or more trials as jobs in one process pool.
+
+    Each replica is one job, run serially in its worker; the jobs are
+    started largest (most histories) first. Replica i of a trial has seed
+    `random_seed + i`, as when the replicas are run one after another, and
+    its results records are written to `sink` in the same order, so the
+    results do not depend on the number of workers. Replicas found in the
+    `cache` are not run again.
+
+    Parameters:
+    - trials (list): (cfg, num_replicas) of each trial.
+    - workers (int): Number of worker processes.
+    - sink (object | None): Sink for per-generation results, or None.
+    - verbose (bool): Whether to print the time taken by each job.
+    - cache (ResultCache | None): Cache of replica results, or None.
+    - reporter (ProgressReporter | None): Reporter to report progress to, as
+                                          each job finishes.
+
+    Returns:
+    - list: For each trial, the REPLICA_RESULTS of each of its replicas.
+    """
+
+    jobs = []
+    for cfg, num_replicas in trials:
+        for i in range(num_replicas):
+            seed = None if cfg.random_seed is None else cfg.random_seed + i
+            # The target and budget apply to a trial as a whole (as in
+            # `trial`), not to each replica
+            replica_cfg = replace(
+                cfg,
+                random_seed=seed,
+                target_std=None,
+                max_histories=None,
+                workers=None,
+                results_file=None,
+                progress=False,
+                metrics_file=None,
+            )
+            keep_records = sink is not None or cache is not None
+            jobs.append((replica_cfg, {"replica": i}, keep_records))
+
+    # Only the replicas missing from the cache are run
+    outputs = [None if cache is None else cache.get(*job[:2]) for job in jobs]
+    missing = [job for job, output in enumerate(outputs) if output is None]
+    costs = [
+        jobs[job][0].num_particles * jobs[job][0].num_generations for job in missing
+    ]
+
+    # Progress is reported job by job, as the jobs finish
+    callback = None
+    if reporter is not None:
+        completed = itertools.count(1)
+        for (job_cfg, _, _), output in zip(jobs, outputs):
+            if output is not None:
+                reporter.update(
+                    work=job_cfg.num_particles * job_cfg.num_generations,
+                    jobs=next(completed),
+                    k1=output[0]["k1"][-1],
+                    k2=output[0]["k2"][-1],
+                )
+
+        def callback(i, output, job_time):
+            reporter.update(
+                output[0]["histories"],
+                work=costs[i],
+                jobs=next(completed),
+                k1=output[0]["k1"][-1],
+                k2=output[0]["k2"][-1],
+            )
+
+    start_time = time.perf_counter()
+    with create_executor(workers) or nullcontext() as executor:
+        run_outputs, run_times = run_jobs(
+            run_replica, [jobs[job] for job in missing], costs, executor, callback
+        )
+    wall_time = time.perf_counter() - start_time
+    times = [None] * len(jobs)
+    for job, output, job_time in zip(missing, run_outputs, run_times):
+        outputs[job] = output
+        times[job] = job_time
+        if cache is not None:
+            cache.put(*jobs[job][:2], *output)
+
+    replicas = [[] for _ in trials]
+    job = 0
+    for t, (_, num_replicas) in enumerate(trials):
+        for i in range(num_replicas):
+            replica, records = outputs[job]
+            if sink is not None:
+                for record in records:
+                    sink.write(record)
+            replicas[t].append(replica)
+            if verbose:
+                print(
+                    f"Job {job}: {jobs[job][0].num_particles} particles, "
+                    f"replica {i}, "
+                    + ("cached" if times[job] is None else f"{times[job]:.3f} s")
+                )
+            job += 1
+    if verbose:
+        print(
+            f"Jobs: {len(missing)} of {len(jobs)} run in {wall_time:.3f} s "
+            f"({sum(run_times):.3f} s of work on {workers} workers)"
+        )
+    return replicas
+
+
+def study_convergence(
+    num_generations, particles_list, verbose=False, cache_dir=None, **options
+):
+    """
+    Study the convergence of k_eff with the number of particles: a trial for
+    each number of particles. With `cache_dir`, replicas are cached there,
+    and only those not already in the cache are run. With `progress` or
+    `metrics_file`, progress is reported over the whole study. The other
+    keyword arguments set Config fields, as for `run`.
+    """
+    cfg = configure(num_generations=num_generations, **options)
+    total = None
+    if cfg.target_std is None:
+        total = NUM_REPLICAS * cfg.num_generations * sum(particles_list)
+
+    cache = None if cache_dir is None else ResultCache(cache_dir, "convergence")
     data = []
-    for i, num_particles in enumerate(particles_list):
-        seed = None if random_seed is None else random_seed + i
-        data.append(
-            [
-                series[-1]
-                for series in trial(
-                    num_generations,
-                    num_particles,
-                    random_seed=seed,
+    with (
+        results_sink(cfg.results_file, cfg.results_format) as sink,
+        progress_reporter(cfg, total) as reporter,
+    ):
+        seeds = [
+            None if cfg.random_seed is None else cfg.random_seed + i
+            for i in range(len(particles_list))
+        ]
+        if cfg.workers is not None and cfg.target_std is None:
+            # The replicas of every particle count in one pool
+            trials = [
+                (
+                    replace(cfg, num_particles=num_particles, random_seed=seed),
+                    NUM_REPLICAS,
                 )
+                for num_particles, seed in zip(particles_list, seeds)
             ]
-        )
+            for replicas in schedule_replicas(
+                trials, cfg.workers, sink, verbose, cache, reporter
+            ):
+                data.append(
+                    [series[-1] for series in summarise_trial(replicas, verbose)]
+                )
+        else:
+            for num_particles, seed in zip(particles_list, seeds):
+                data.append(
+                    [
+                        series[-1]
+                        for series in trial(
+                            num_generations,
+                            num_particles,
+                            verbose=verbose,
+                            sink=sink,
+                            cache=cache,
+                            reporter=reporter,
+                            **dict(options, random_seed=seed),
+                        )
+                    ]
+                )
+    import pandas as pd
+
     df = pd.DataFrame(
         data, index=particles_list, columns=["k1", "k1_std", "k2", "k2_std"]
     )
     plot_particle_convergence(df)
 
 
-def study_generations(num_generations, num_particles, random_seed=None):
+def study_generations(
+    num_generations, num_particles, verbose=False, cache_dir=None, **options
+):
+    """
+    Study the convergence of k_eff with generation: a trial, averaged over
+    per generation. With `cache_dir`, replicas are cached there, and only
+    those not already in the cache are run. The other keyword arguments set
+    Config fields, as for `run`.
+    """
+    cache = None if cache_dir is None else ResultCache(cache_dir, "generations")
     data = trial(
-        num_generations,
-        num_particles,
-        random_seed=random_seed,
+        num_generations, num_particles, verbose=verbose, cache=cache, **options
     )
+    import pandas as pd
+
     df = pd.DataFrame(
         np.transpose(data),
         index=range(num_generations),
@@ -249,13 +1542,125 @@ def study_generations(num_generations, num_particles, random_seed=None):
     plot_generations(df)
 
 
-def study_fission_rate(num_generations, num_particles, random_seed=None):
-    run(
-        num_generations,
-        num_particles,
-        plot=True,
-        random_seed=random_seed,
+def study_fission_rate(num_generations, num_particles, verbose=False, **options):
+    run(num_generations, num_particles, plot=True, verbose=verbose, **options)
+
+
+def search(
+    num_generations,
+    num_particles,
+    param="slab_thickness_cm",
+    target_k=1.0,
+    tolerance=0.002,
+    max_iterations=10,
+    warm_inactive=1,
+    verbose=False,
+    **options,
+):
+    """
+    Criticality search: find the value of a Config parameter that makes the
+    combined k_eff equal to `target_k`.
+
+    Each iterate is a run at one value of the parameter, stopped once its
+    combined k_eff is known to half the `tolerance` (unless `target_std` is
+    given). The values are chosen by `next_iterate`, and the search stops
+    once an iterate's k_eff is within `tolerance` of the target, and known to
+    that precision; an iterate cut short by `num_generations` or
+    `max_histories` before then does not end the search, and a ValueError is
+    raised if `num_generations` leaves fewer than MIN_ACTIVE_SAMPLES active
+    generations, as no iterate could then stop on its target. Every
+    iterate after the first starts from the final source of the one before,
+    rescaled to the new slab thickness, so it needs only `warm_inactive`
+    inactive generations rather than a full source convergence. With
+    `random_seed`, every iterate uses the same seed, which correlates their
+    noise and so steadies the differences the steps are based on.
+    Per-generation results go to `results_file`, labelled with the iterate
+    and the parameter value. The other keyword arguments set Config fields,
+    as for `run`.
+
+    Returns:
+    - dict: The `param`, its estimated critical `value` and the `std_err` of
+            that estimate, the (value, k_eff, std_err) `iterates`, and whether
+            the search `converged` within `max_iterations`.
+    """
+    cfg = configure(
+        num_generations=num_generations, num_particles=num_particles, **options
     )
+    if cfg.target_std is None:
+        cfg = replace(cfg, target_std=tolerance / 2)
+    if cfg.num_generations - cfg.num_inactive < MIN_ACTIVE_SAMPLES:
+        # No iterate could stop on its target, or end the search
+        raise ValueError(
+            f"A search needs at least {MIN_ACTIVE_SAMPLES} active generations "
+            f"per iterate, but has num_generations {cfg.num_generations} and "
+            f"num_inactive {cfg.num_inactive}"
+        )
+
+    value = getattr(cfg, param)
+    bank = None
+    previous_thickness_cm = cfg.slab_thickness_cm
+    iterates = []
+    converged = False
+    with (
+        results_sink(cfg.results_file, cfg.results_format) as sink,
+        progress_reporter(cfg, None) as reporter,
+    ):
+        for i in range(max_iterations):
+            iterate_cfg = with_parameter(cfg, param, value)
+            if bank is not None:
+                # Warm start from the previous iterate's source
+                iterate_cfg = replace(
+                    iterate_cfg, num_inactive=min(cfg.num_inactive, warm_inactive)
+                )
+                bank = rescale_bank(
+                    bank, previous_thickness_cm, iterate_cfg.slab_thickness_cm
+                )
+            results = Simulation(
+                iterate_cfg,
+                bank=bank,
+                sink=sink,
+                labels={"iterate": i, param: value},
+                reporter=reporter,
+            ).run()
+            if results["k_combined"] is None:
+                raise ValueError(f"No active generations at {param} = {value}")
+            k, std_err, _ = results["k_combined"]
+            iterates.append((value, k, std_err))
+            if verbose:
+                print(
+                    f"Search iterate {i}: {param} = {value:.6f}, "
+                    f"k = {k:.6f} +/- {std_err:.6f}"
+                )
+            # NaN errors compare False
+            if abs(k - target_k) <= tolerance and std_err <= cfg.target_std:
+                converged = True
+                break
+
+            bank = results["bank"]
+            previous_thickness_cm = iterate_cfg.slab_thickness_cm
+            value = next_iterate(iterates, target_k)
+
+    value, std_err = estimate_root(iterates, target_k)
+    return {
+        "param": param,
+        "value": value,
+        "std_err": std_err,
+        "iterates": iterates,
+        "converged": converged,
+    }
+
+
+def parse_float_list(ctx, param, value):
+    """
+    Click callback to parse a comma-separated list of numbers, e.g. mesh edges.
+    """
+
+    if value is None:
+        return None
+    try:
+        return tuple(float(edge) for edge in value.split(","))
+    except ValueError:
+        raise click.BadParameter(f"not a comma-separated list of numbers: {value}")
 
 
 @click.command()
@@ -278,38 +1683,346 @@ def study_fission_rate(num_generations, num_particles, random_seed=None):
     default=None,
     help="Random seed for reproducible sampling.",
 )
-@click.option("plot_type", "-t", "--type", help="Type of plot to create.")
-def main(num_generations, particles_list, random_seed, plot_type):
-    if plot_type == "convergence":
-        if len(particles_list) < 2:
-            sys.exit("Not enough -p values")
-        study_convergence(
-            num_generations,
-            particles_list,
-            random_seed=random_seed,
-        )
-    elif plot_type == "generations":
-        if len(particles_list) > 1:
-            sys.exit("Too many -p values")
-        study_generations(
-            num_generations,
-            particles_list[0],
-            random_seed=random_seed,
-        )
-    elif plot_type == "fission_rate":
-        if len(particles_list) > 1:
-            sys.exit("Too many -p values")
-        study_fission_rate(
-            num_generations,
-            particles_list[0],
-            random_seed=random_seed,
-        )
-    else:
-        if len(particles_list) > 1:
-            sys.exit("Too many -p values")
-        run(
-            num_generations,
-            particles_list[0],
-            plot=False,
-            random_seed=random_seed,
-        )
+@click.option(
+    "engine",
+    "--engine",
+    type=click.Choice(["history", "event"]),
+    default=None,
+    help="Transport engine: history-by-history or vectorised event-based.",
+)
+@click.option(
+    "workers",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of worker processes to run each generation across.",
+)
+@click.option(
+    "bank_precision",
+    "--bank-precision",
+    type=click.Choice(["float64", "float32"]),
+    default=None,
+    help="Storage precision of the fission bank.",
+)
+@click.option(
+    "population_control",
+    "--population-control",
+    type=click.Choice(["none", "comb", "resample"]),
+    default=None,
+    help="Keep each generation at the requested number of particles.",
+)
+@click.option(
+    "num_inactive",
+    "--inactive",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Number of inactive generations (the minimum, with --auto-inactive).",
+)
+@click.option(
+    "auto_inactive",
+    "--auto-inactive",
+    is_flag=True,
+    default=None,
+    help="Start active generations once the source entropy has stabilised.",
+)
+@click.option(
+    "target_std",
+    "--target-std",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Stop once the standard error of k_eff is below this target.",
+)
+@click.option(
+    "max_histories",
+    "--max-histories",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Budget of particle histories when running to a target.",
+)
+@click.option(
+    "results_file",
+    "--results",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="File to stream per-generation results to, as they are produced.",
+)
+@click.option(
+    "results_format",
+    "--results-format",
+    type=click.Choice(["jsonl", "csv", "parquet"]),
+    default=None,
+    help="Format of the results file (default: from its extension).",
+)
+@click.option(
+    "checkpoint_dir",
+    "--checkpoint",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory to write checkpoints to.",
+)
+@click.option(
+    "checkpoint_interval",
+    "--checkpoint-interval",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of generations between checkpoints.",
+)
+@click.option(
+    "restart_dir",
+    "--restart",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Resume the run checkpointed in this directory.",
+)
+@click.option(
+    "mesh_bins",
+    "--mesh-bins",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of equal bins for the mesh tally of flux and reaction rates.",
+)
+@click.option(
+    "mesh_edges",
+    "--mesh-edges",
+    callback=parse_float_list,
+    default=None,
+    help="Comma-separated bin edges (cm) for the mesh tally.",
+)
+@click.option(
+    "implicit_capture",
+    "--implicit-capture",
+    is_flag=True,
+    default=None,
+    help="Use implicit capture (survival biasing) with particle weights.",
+)
+@click.option(
+    "weight_cutoff",
+    "--weight-cutoff",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help=(
+        "Play Russian roulette with particles below this weight "
+        "(default 0.25 with --implicit-capture)."
+    ),
+)
+@click.option(
+    "weight_windows",
+    "--weight-windows",
+    callback=parse_float_list,
+    default=None,
+    help="Comma-separated lower weight bounds on equal bins over the slab.",
+)
+@click.option(
+    "weight_window_ratio",
+    "--weight-window-ratio",
+    type=click.FloatRange(min=1, min_open=True),
+    default=None,
+    help="Ratio of the upper to the lower bound of each weight window.",
+)
+@click.option(
+    "regions",
+    "--region",
+    type=(float, float, float, float),
+    multiple=True,
+    metavar="RIGHT TOTAL SCATTER FISSION",
+    help="Add a region: right boundary (cm) and macroscopic cross-sections "
+    "(1/cm), left to right. Repeat for each region.",
+)
+@click.option(
+    "tracking",
+    "--tracking",
+    type=click.Choice(TRACKING_MODES),
+    default=None,
+    help="Move neutrons region by region (surface) or by delta tracking.",
+)
+@click.option(
+    "cmfd_bins",
+    "--cmfd-bins",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of equal coarse-mesh cells for CMFD source acceleration.",
+)
+@click.option(
+    "param",
+    "--param",
+    type=click.Choice(SEARCH_PARAMS),
+    default="slab_thickness_cm",
+    help="Parameter to vary in a criticality search (-t search).",
+)
+@click.option(
+    "target_k",
+    "--target-k",
+    type=click.FloatRange(min=0, min_open=True),
+    default=1.0,
+    help="Target k_eff of a criticality search.",
+)
+@click.option(
+    "search_tolerance",
+    "--search-tolerance",
+    type=click.FloatRange(min=0, min_open=True),
+    default=0.002,
+    help="Stop a criticality search once k_eff is this close to the target.",
+)
+@click.option(
+    "max_iterations",
+    "--max-iterations",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Largest number of runs in a criticality search.",
+)
+@click.option(
+    "no_cache",
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Run every replica of a study, without the result cache.",
+)
+@click.option(
+    "cache_dir",
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory of the study result cache (default ~/.cache/mccc).",
+)
+@click.option(
+    "profile",
+    "--profile",
+    is_flag=True,
+    default=None,
+    help="Report the time of each phase of each generation of a run.",
+)
+@click.option(
+    "profile_file",
+    "--profile-file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Also write cProfile statistics of the transport to this file.",
+)
+@click.option(
+    "progress",
+    "--progress",
+    is_flag=True,
+    default=None,
+    help="Print progress with an ETA every few seconds (to stderr).",
+)
+@click.option(
+    "metrics_file",
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="File to rewrite every few seconds with progress metrics.",
+)
+@click.option(
+    "metrics_format",
+    "--metrics-format",
+    type=click.Choice(["prometheus", "json"]),
+    default=None,
+    help="Format of the metrics file (default: JSON for .json, else Prometheus).",
+)
+@click.option(
+    "verbose",
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Print per-generation tallies, estimates and histories used.",
+)
+@click.option(
+    "plot_type",
+    "-t",
+    "--type",
+    help="Type of plot to create, or 'search' for a criticality search.",
+)
+def main(
+    num_generations,
+    particles_list,
+    restart_dir,
+    param,
+    target_k,
+    search_tolerance,
+    max_iterations,
+    no_cache,
+    cache_dir,
+    verbose,
+    plot_type,
+    **options,
+):
+    if no_cache:
+        cache_dir = None
+    elif cache_dir is None:
+        cache_dir = default_cache_dir()
+
+    if (options["profile"] or options["profile_file"] is not None) and (
+        plot_type is not None
+    ):
+        sys.exit("--profile is for single runs")
+
+    # The remaining options are the Config fields
+    options["regions"] = options["regions"] or None
+    study_options = {k: v for k, v in options.items() if k not in SINGLE_RUN_OPTIONS}
+    try:
+        if restart_dir is not None:
+            restart(
+                restart_dir,
+                num_generations=num_generations,
+                verbose=verbose,
+                **{k: v for k, v in options.items() if k in RESTART_OPTIONS},
+            )
+        elif plot_type == "convergence":
+            if len(particles_list) < 2:
+                sys.exit("Not enough -p values")
+            study_convergence(
+                num_generations,
+                particles_list,
+                verbose=verbose,
+                cache_dir=cache_dir,
+                **study_options,
+            )
+        elif plot_type == "generations":
+            if len(particles_list) > 1:
+                sys.exit("Too many -p values")
+            study_generations(
+                num_generations,
+                particles_list[0],
+                verbose=verbose,
+                cache_dir=cache_dir,
+                **study_options,
+            )
+        elif plot_type == "search":
+            if len(particles_list) > 1:
+                sys.exit("Too many -p values")
+            result = search(
+                num_generations,
+                particles_list[0],
+                param=param,
+                target_k=target_k,
+                tolerance=search_tolerance,
+                max_iterations=max_iterations,
+                verbose=verbose,
+                **study_options,
+            )
+            print(
+                f"{param} = {result['value']:.6f} +/- {result['std_err']:.6f} "
+                f"for k = {target_k} ({len(result['iterates'])} runs"
+                + ("" if result["converged"] else ", not converged")
+                + ")"
+            )
+        elif plot_type == "fission_rate":
+            if len(particles_list) > 1:
+                sys.exit("Too many -p values")
+            study_fission_rate(
+                num_generations, particles_list[0], verbose=verbose, **study_options
+            )
+        else:
+            if len(particles_list) > 1:
+                sys.exit("Too many -p values")
+            run(
+                num_generations,
+                particles_list[0],
+                plot=False,
+                verbose=verbose,
+                **options,
+            )
+    except (SimulationError, ValueError) as error:
+        # An invalid configuration, or a run that cannot go on
+        sys.exit(str(error))
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from mccc.bank import FissionBank
+from mccc.mesh import generation_scores
+from mccc.setup import accumulate_tallies
+from mccc.setup import initialise_tallies
+
+# Number of particles per chunk. Each history draws from its own random number
+# stream, so the chunk size only affects load balance, not the results.
+CHUNK_SIZE = 8192
+
+
+def split_into_chunks(num_particles, chunk_size=CHUNK_SIZE):
+    """
+    Function to split a particle bank into contiguous chunks.
+
+    Parameters:
+    - num_particles (int): Number of particles in the bank.
+    - chunk_size (int): Maximum number of particles per chunk.
+
+    Returns:
+    - list: (start, stop) index pairs, one per chunk.
+    """
+
+    return [
+        (start, min(start + chunk_size, num_particles))
+        for start in range(0, num_particles, chunk_size)
+    ]
+
+
+def copy_to_shared_memory(values):
+    """
+    Function to copy an array into a new shared memory block.
+
+    Parameters:
+    - values (np.ndarray): Values to share.
+
+    Returns:
+    - SharedMemory | None: The shared memory block, or None if `values` is empty.
+    """
+
+    if values.size == 0:
+        return None
+    shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+    return shm
+
+
+def read_from_shared_memory(name, size, dtype, start=0, stop=None, unlink=False):
+    """
+    Function to copy (a slice of) an array out of shared memory.
+
+    Parameters:
+    - name (str | None): Name of the shared memory block (None if empty).
+    - size (int): Number of elements in the block.
+    - dtype (np.dtype): Data type of the elements.
+    - start (int): First index to read.
+    - stop (int | None): One past the last index to read.
+    - unlink (bool): Whether to release the block after reading.
+
+    Returns:
+    - np.ndarray: The requested values.
+    """
+
+    if name is None:
+        return np.empty(0, dtype=dtype)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        values = np.ndarray((size,), dtype=dtype, buffer=shm.buf)
+        result = values[start:stop].copy()
+        del values
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+    return result
+
+
+def simulate_chunk(
+    simulate_generation,
+    cfg,
+    bank_name,
+    bank_size,
+    bank_dtype,
+    start,
+    stop,
+    streams,
+    gen,
+):
+    """
+    Function to simulate one chunk of a generation's particle bank.
+
+    The chunk's sites are read from the shared fission bank, and the fission
+    sites it produces are written to a new shared memory block which the
+    caller must unlink.
+
+    Parameters:
+    - simulate_generation (callable): Transport engine.
+    - cfg (Config): Simulation configuration.
+    - bank_name (str): Name of the shared memory block holding the fission bank.
+    - bank_size (int): Number of particles in the fission bank.
+    - bank_dtype (np.dtype): Data type of the fission bank sites.
+    - start (int): First particle of the chunk.
+    - stop (int): One past the last particle of the chunk.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - gen (int): Generation number, recorded as the parent of new sites.
+
+    Returns:
+    - tuple: Tallies, the name and size of the shared block of fission sites,
+             and the mesh scores (None without a mesh tally or CMFD).
+    """
+
+    sites = read_from_shared_memory(bank_name, bank_size, bank_dtype, start, stop)
+    mesh = generation_scores(cfg)
+
+    tallies, next_bank = simulate_generation(
+        cfg,
+        initialise_tallies(),
+        sites["position"],
+        streams,
+        FissionBank(sites.size, precision=cfg.bank_precision, generation=gen),
+        first_history=start,
+        mesh=mesh,
+    )
+
+    shm = copy_to_shared_memory(next_bank.sites)
+    if shm is None:
+        return tallies, None, 0, mesh
+    name = shm.name
+    shm.close()
+    return tallies, name, len(next_bank), mesh
+
+
+def simulate_generation_parallel(
+    simulate_generation, cfg, tallies, bank, streams, next_bank, executor, mesh=None
+):
+    """
+    Function to simulate one generation split into chunks.
+
+    Chunks are run in `executor` if one is given, or in this process
+    otherwise. Tallies are merged and the fission sites are added to
+    `next_bank` in chunk order, so the result does not depend on the number
+    of workers.
+
+    Parameters:
+    - simulate_generation (callable): Transport engine.
+    - cfg (Config): Simulation configuration.
+    - tallies (dict): Tallies for this generation, updated in place.
+    - bank (FissionBank): Fission bank of this generation.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - next_bank (FissionBank): Bank to add the fission sites to.
+    - executor (ProcessPoolExecutor | None): Pool to run the chunks in.
+    - mesh (MeshScores | None): Mesh scores to add the chunks' scores to.
+
+    Returns:
+    - tuple: Updated tallies and the bank of next-generation start positions.
+    """
+
+    sites = bank.sites
+    shared_bank = copy_to_shared_memory(sites)
+    bank_name = None if shared_bank is None else shared_bank.name
+    tasks = [
+        (
+            simulate_generation,
+            cfg,
+            bank_name,
+            sites.size,
+            sites.dtype,
+            start,
+            stop,
+            streams,
+            next_bank.generation,
+        )
+        for start, stop in split_into_chunks(sites.size)
+    ]
+
+    try:
+        if executor is None:
+            results = [simulate_chunk(*task) for task in tasks]
+        else:
+            results = list(executor.map(simulate_chunk, *zip(*tasks)))
+    finally:
+        if shared_bank is not None:
+            shared_bank.close()
+            shared_bank.unlink()
+
+    for chunk_tallies, sites_name, num_sites, chunk_mesh in results:
+        accumulate_tallies(tallies, chunk_tallies)
+        if mesh is not None:
+            mesh.add(chunk_mesh)
+        next_bank.extend(
+            read_from_shared_memory(
+                sites_name, num_sites, next_bank.sites.dtype, unlink=True
+            )
+        )
+
+    return tallies, next_bank
+
+
+def timed_call(function, args):
+    """
+    Function to call a function, timing it where it runs.
+
+    Parameters:
+    - function (callable): Function to call.
+    - args (tuple): Positional arguments.
+
+    Returns:
+    - tuple: The function's result, and the time it took in seconds.
+    """
+
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+
+def run_jobs(function, jobs, costs, executor=None, callback=None):
+    """
+    Function to run a set of independent jobs, largest first.
+
+    Jobs are started in order of decreasing cost, so that the long jobs are
+    not left until the end, when the other workers would be idle. Results
+    are returned in the order of `jobs`, whatever order they finish in.
+
+    Parameters:
+    - function (callable): Function to call with the arguments of each job.
+    - jobs (list): Tuple of positional arguments of each job.
+    - costs (list): Relative cost of each job, e.g. its number of histories.
+    - executor (ProcessPoolExecutor | None): Pool to run the jobs in, or None
+                                             to run them in this process.
+    - callback (callable | None): Function called with the index, result and
+                                  time of each job as soon as it finishes.
+
+    Returns:
+    - tuple: List of results and list of times in seconds, one per job.
+    """
+
+    order = sorted(range(len(jobs)), key=lambda i: costs[i], reverse=True)
+    outputs = {}
+    if executor is None:
+        for i in order:
+            outputs[i] = timed_call(function, jobs[i])
+            if callback is not None:
+                callback(i, *outputs[i])
+    else:
+        futures = {executor.submit(timed_call, function, jobs[i]): i for i in order}
+        for future in as_completed(futures):
+            i = futures[future]
+            outputs[i] = future.result()
+            if callback is not None:
+                callback(i, *outputs[i])
+    return (
+        [outputs[i][0] for i in range(len(jobs))],
+        [outputs[i][1] for i in range(len(jobs))],
+    )
+
+
+def create_executor(workers):
+    """
+    Function to create the process pool for a parallel run.
+
+    Parameters:
+    - workers (int): Number of worker processes.
+
+    Returns:
+    - ProcessPoolExecutor | None: The pool, or None if a single worker is
+                                  requested (chunks then run in-process).
+    """
+
+    if workers < 1:
+        raise ValueError(f"Number of workers must be positive: {workers}")
+    if workers == 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers)
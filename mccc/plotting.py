@@ -1,45 +1,56 @@
 # -*- coding: utf-8 -*-
-import matplotlib.pyplot as plt
 import numpy as np
 
+# matplotlib is imported only when a plot is made, as it is slow to import.
+# Plots are drawn on their own Figure with the Agg canvas, not through the
+# global pyplot state, so they can be made headless and in any process.
 
-def plot_starting_positions(num_generations, gen, starting_positions=None):
-    """
-    Function to create a histogram and plot starting positions.
 
-    Parameters:
-    - starting_positions (list): List of starting positions (x-values).
+def _new_figure():
+    """
+    Function to create a Figure attached to an Agg canvas, with one Axes.
     """
-    if starting_positions is None:
-        plt.savefig("fission_rate.png")
-        return
 
-    # Calculate the histogram data
-    hist, edges = np.histogram(starting_positions, bins=30)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
 
-    # Calculate the bin centers
-    bin_centers = (edges[:-1] + edges[1:]) / 2
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
 
-    # Normalise
-    hist = hist / len(starting_positions)
 
-    colors = plt.cm.jet(np.linspace(0, 1, num_generations))
+def plot_source_histogram(histogram, path="fission_rate.png"):
+    """
+    Function to plot the source distribution of each generation of a run.
 
-    # Create a line plot for frequencies
-    plt.plot(bin_centers, hist, color=colors[gen], linestyle="-")
+    Parameters:
+    - histogram (SourceHistogram): Binned source of each generation.
+    - path (str | Path): Image file to save the plot to.
+    """
+    import matplotlib
+
+    fig, ax = _new_figure()
+    bin_centers = (histogram.edges[:-1] + histogram.edges[1:]) / 2
+    colors = matplotlib.colormaps["jet"](np.linspace(0, 1, len(histogram.fractions)))
+
+    # One line per generation, coloured from first to last
+    for color, fractions in zip(colors, histogram.fractions):
+        ax.plot(bin_centers, fractions, color=color, linestyle="-")
 
     # Set plot labels and title
-    plt.xlabel("Starting position (cm)")
-    plt.ylabel("Frequency")
-    plt.title("Histogram of starting positions by generation")
-    return
+    ax.set_xlabel("Starting position (cm)")
+    ax.set_ylabel("Frequency")
+    ax.set_title("Histogram of starting positions by generation")
+    fig.savefig(path)
 
 
 def plot_particle_convergence(df):
     """
     Function to plot k1 and k2 as a function of particle number.
     """
+    fig, ax = _new_figure()
     df.plot(
+        ax=ax,
         y=["k1", "k2"],
         logx=True,
         grid=True,
@@ -47,10 +58,10 @@ def plot_particle_convergence(df):
         xlim=(500, 2000000),
         ylim=(0.9, 1.1),
         xlabel="No. of particles",
-        ylabel="$k_{\mathrm{eff}}$",
-        title="Convergence of $k_{\mathrm{eff}}$ with no. of particles.",
+        ylabel=r"$k_{\mathrm{eff}}$",
+        title=r"Convergence of $k_{\mathrm{eff}}$ with no. of particles.",
     )
-    plt.savefig("particle_convergence.png")
+    fig.savefig("particle_convergence.png")
     return
 
 
@@ -58,15 +69,17 @@ def plot_generations(df):
     """
     Function to plot k1 and k2 as a function of generation number.
     """
+    fig, ax = _new_figure()
     df.plot(
+        ax=ax,
         y=["k1", "k2"],
         grid=True,
         yerr=[df["k1_std"], df["k2_std"]],
         xticks=df.index,
         ylim=(0.97, 1.03),
         xlabel="Generation number",
-        ylabel="$k_{\mathrm{eff}}$",
-        title="Convergence of $k_{\mathrm{eff}}$ with generation",
+        ylabel=r"$k_{\mathrm{eff}}$",
+        title=r"Convergence of $k_{\mathrm{eff}}$ with generation",
     )
-    plt.savefig("generations.png")
+    fig.savefig("generations.png")
     return
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from mccc.bank import FissionBank
+from mccc.rng import POPULATION_STREAM
+
+
+def _select(bank, targets):
+    """
+    Function to build a bank from the sites whose cumulative-weight intervals
+    contain each of the target weights.
+
+    Parameters:
+    - bank (FissionBank): Bank to select from.
+    - targets (np.ndarray): Sorted points in [0, total weight).
+
+    Returns:
+    - FissionBank: Bank of the selected sites, with their original weights.
+    """
+
+    cumulative_weights = np.cumsum(bank.weights, dtype=np.float64)
+    indices = np.searchsorted(cumulative_weights, targets, side="right")
+    # Guard against rounding at the top end of the cumulative sum
+    indices = np.minimum(indices, len(bank) - 1)
+
+    selected = FissionBank(
+        indices.size, precision=bank.precision, generation=bank.generation
+    )
+    selected.extend(bank.sites[indices])
+    return selected
+
+
+def comb(bank, num_sites, rand_num):
+    """
+    Function to comb a bank down (or up) to a fixed number of sites.
+
+    A comb of `num_sites` evenly spaced teeth, with a random offset, is laid
+    over the cumulative site weights; each tooth selects the site it lands
+    on. Each site is selected a number of times proportional to its weight
+    on average, and the total weight is preserved exactly.
+
+    Parameters:
+    - bank (FissionBank): Bank to comb.
+    - num_sites (int): Number of sites in the combed bank.
+    - rand_num (float): Uniform random number in (0, 1) for the comb offset.
+
+    Returns:
+    - FissionBank: Bank of `num_sites` sites of equal weight.
+    """
+
+    total_weight = bank.total_weight()
+    spacing = total_weight / num_sites
+    combed = _select(bank, (np.arange(num_sites) + rand_num) * spacing)
+    combed.weights[:] = spacing
+    return combed
+
+
+def resample(bank, num_sites, rand_nums):
+    """
+    Function to resample a bank to a fixed number of sites.
+
+    Sites are drawn independently with probability proportional to their
+    weight. This is noisier than combing but needs no ordering of the bank.
+
+    Parameters:
+    - bank (FissionBank): Bank to resample.
+    - num_sites (int): Number of sites in the resampled bank.
+    - rand_nums (np.ndarray): `num_sites` uniform random numbers in (0, 1).
+
+    Returns:
+    - FissionBank: Bank of `num_sites` sites of equal weight.
+    """
+
+    total_weight = bank.total_weight()
+    resampled = _select(bank, np.sort(rand_nums) * total_weight)
+    resampled.weights[:] = total_weight / num_sites
+    return resampled
+
+
+def control_population(cfg, bank, streams):
+    """
+    Function to apply population control to the next generation's bank.
+
+    The bank is combed or resampled back to `cfg.num_particles` sites, and the
+    weights are then normalised to one. As the total weight of a generation's
+    source is `cfg.num_particles`, the normalisation divides the weights by
+    that generation's k2 estimate, so the population neither grows nor dies
+    away.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - bank (FissionBank): Fission bank for the next generation.
+    - streams (ParticleStreams): Random number streams of the generation
+                                 which produced the bank.
+
+    Returns:
+    - FissionBank: The controlled bank.
+    """
+
+    if cfg.population_control == "none" or len(bank) == 0:
+        return bank
+
+    num_sites = cfg.num_particles
+    if cfg.population_control == "comb":
+        rand_num = streams.uniform_block(0, 0, stream=POPULATION_STREAM)[0]
+        bank = comb(bank, num_sites, rand_num)
+    elif cfg.population_control == "resample":
+        histories = np.arange(num_sites)
+        rand_nums = streams.uniforms(histories, 0, stream=POPULATION_STREAM)[0]
+        bank = resample(bank, num_sites, rand_nums)
+    else:
+        raise ValueError(f"Unknown population control: {cfg.population_control}")
+
+    # k-based normalisation: scale the total weight back to one per site
+    bank.weights[:] *= num_sites / bank.total_weight()
+    return bank
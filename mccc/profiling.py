@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import cProfile
+import sys
+import time
+from contextlib import contextmanager
+
+# Phases of a generation, in the order they run. The time between
+# generations (setup, and the stopping checks) goes to 'other'.
+GENERATION_PHASES = ("source", "transport", "tallies", "cmfd", "population", "output")
+
+# Phases of a run outside its generations
+RUN_PHASES = ("other", "plotting")
+
+
+def peak_rss_bytes():
+    """
+    Function to get the peak resident set size of this process, or of the
+    largest of its finished worker processes if that is larger.
+
+    Returns:
+    - int | None: Peak RSS in bytes, or None where it cannot be measured.
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RunProfile:
+    """
+    Wall time of each phase of each generation of a run.
+
+    Each call of `lap` charges the time since the previous call to a phase,
+    so the instrumentation costs one clock read per phase per generation and
+    nothing per history. With `cprofile_file`, the transport phase is also
+    run under cProfile and its statistics written to that file.
+
+    Parameters:
+    - cprofile_file (str | Path | None): File to write cProfile statistics of
+                                         the transport to, or None.
+    """
+
+    def __init__(self, cprofile_file=None):
+        self.cprofile_file = cprofile_file
+        self.cprofile = None if cprofile_file is None else cProfile.Profile()
+        self.generations = []
+        self.totals = dict.fromkeys(GENERATION_PHASES + RUN_PHASES, 0.0)
+        self.phases = None
+        self.start_time = time.perf_counter()
+        self._last = self.start_time
+
+    def lap(self, phase):
+        """
+        Charge the time since the last lap to a phase.
+        """
+
+        now = time.perf_counter()
+        self.totals[phase] += now - self._last
+        if self.phases is not None and phase in self.phases:
+            self.phases[phase] += now - self._last
+        self._last = now
+
+    def start_generation(self):
+        """
+        Start timing a generation.
+        """
+
+        self.lap("other")
+        self.phases = dict.fromkeys(GENERATION_PHASES, 0.0)
+
+    @contextmanager
+    def transport(self):
+        """
+        Context manager to run the transport under cProfile, if enabled.
+        """
+
+        if self.cprofile is None:
+            yield
+            return
+        self.cprofile.enable()
+        try:
+            yield
+        finally:
+            self.cprofile.disable()
+
+    def end_generation(self, gen, tallies, bank_size):
+        """
+        Record the timings and statistics of a generation.
+
+        Parameters:
+        - gen (int): Generation number.
+        - tallies (dict): Tallies of the generation.
+        - bank_size (int): Number of sites in the next generation's bank.
+        """
+
+        time_s = sum(self.phases.values())
+        self.generations.append(
+            {
+                "generation": gen,
+                **{f"{phase}_s": t for phase, t in self.phases.items()},
+                "time_s": time_s,
+                "histories": tallies["history"],
+                "histories_per_s": tallies["history"] / self.phases["transport"],
+                "collisions_per_history": tallies["collision"] / tallies["history"],
+                "bank_size": bank_size,
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+        )
+        self.phases = None
+
+    def finish(self):
+        """
+        Stop timing the run, and write the cProfile statistics, if enabled.
+        """
+
+        self.lap("other")
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(self.cprofile_file)
+
+    def report(self):
+        """
+        Print the timings of each generation and the run totals.
+        """
+
+        columns = [f"{phase}_s" for phase in GENERATION_PHASES] + ["time_s"]
+        print("Profile (wall time in seconds):")
+        print(
+            " ".join(
+                ["gen"]
+                + [f"{column[:-2]:>10}" for column in columns]
+                + [f"{'hist/s':>10}", f"{'coll/hist':>9}", f"{'bank':>9}"]
+            )
+        )
+        for record in self.generations:
+            print(
+                " ".join(
+                    [f"{record['generation']:>3}"]
+                    + [f"{record[column]:>10.4f}" for column in columns]
+                    + [
+                        f"{record['histories_per_s']:>10.4g}",
+                        f"{record['collisions_per_history']:>9.4f}",
+                        f"{record['bank_size']:>9}",
+                    ]
+                )
+            )
+
+        total_s = sum(self.totals.values())
+        histories = sum(record["histories"] for record in self.generations)
+        print(
+            "Total: "
+            + ", ".join(
+                f"{phase} {t:.4f} ({t / total_s:.1%})"
+                for phase, t in self.totals.items()
+            )
+        )
+        print(
+            f"Histories: {histories} in {total_s:.4f} s "
+            f"({histories / total_s:.4g} histories/s)"
+        )
+        peak = peak_rss_bytes()
+        if peak is not None:
+            print(f"Peak RSS: {peak / 1024**2:.1f} MiB")
+        if self.cprofile is not None:
+            print(
+                f"cProfile statistics of the transport written to "
+                f"{self.cprofile_file} (view with: python -m pstats "
+                f"{self.cprofile_file})"
+            )
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from mccc.profiling import peak_rss_bytes
+
+# Smallest interval between progress lines, in seconds
+PROGRESS_INTERVAL = 5.0
+
+# Smallest interval between rewrites of the metrics file, in seconds
+METRICS_INTERVAL = 10.0
+
+# Formats of the metrics file
+METRICS_FORMATS = ("prometheus", "json")
+
+# Metrics written to the metrics file: Prometheus type and help text. Metrics
+# without a value yet (e.g. k1 before the first generation) are left out.
+METRICS = {
+    "histories": ("gauge", "Particle histories run."),
+    "histories_per_second": ("gauge", "Mean histories run per second."),
+    "progress_ratio": ("gauge", "Fraction of the expected work done."),
+    "elapsed_seconds": ("gauge", "Wall time since the start."),
+    "eta_seconds": ("gauge", "Estimated wall time to the end."),
+    "generation": ("gauge", "Last generation completed."),
+    "jobs": ("gauge", "Replica jobs completed."),
+    "k1": ("gauge", "k1 estimate of the last generation or replica."),
+    "k2": ("gauge", "k2 estimate of the last generation or replica."),
+    "bank_size": ("gauge", "Fission bank size after the last generation."),
+    "peak_rss_bytes": ("gauge", "Peak resident set size of the process."),
+}
+
+
+def format_duration(seconds):
+    """
+    Function to format a duration in seconds as H:MM:SS.
+    """
+
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+
+class ProgressReporter:
+    """
+    Throttled progress lines and metrics file of a run or study.
+
+    Work is counted in source neutrons, and `update` is called after each
+    generation or replica job. A progress line (to stderr) is printed at
+    most every `progress_interval` seconds, and the metrics file is
+    rewritten at most every `metrics_interval` seconds, so an update costs
+    only a clock read between them. The metrics file is written under a
+    temporary name and renamed, so a scraper (e.g. the node exporter's
+    textfile collector) never reads a partial file.
+
+    Parameters:
+    - total (int | None): Expected work in source neutrons, for the ETA, or
+                          None if not known in advance.
+    - show (bool): Whether to print progress lines.
+    - metrics_file (str | Path | None): File to write the metrics to.
+    - metrics_format (str | None): 'prometheus' (text exposition format) or
+                                   'json', or None to choose from the file
+                                   extension (Prometheus unless '.json').
+    - progress_interval (float): Smallest interval between progress lines.
+    - metrics_interval (float): Smallest interval between metrics writes.
+    - clock (callable): Clock returning seconds.
+    """
+
+    def __init__(
+        self,
+        total=None,
+        show=True,
+        metrics_file=None,
+        metrics_format=None,
+        progress_interval=PROGRESS_INTERVAL,
+        metrics_interval=METRICS_INTERVAL,
+        clock=time.monotonic,
+    ):
+        if metrics_file is not None and metrics_format is None:
+            suffix = Path(metrics_file).suffix.lower()
+            metrics_format = "json" if suffix == ".json" else "prometheus"
+        if metrics_format is not None and metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format: {metrics_format}")
+        self.total = total
+        self.show = show
+        self.metrics_file = metrics_file
+        self.metrics_format = metrics_format
+        self.progress_interval = progress_interval
+        self.metrics_interval = metrics_interval
+        self.clock = clock
+        self.histories = 0
+        self.work = 0
+        self.values = {}
+        self.start_time = clock()
+        self._next_print = self.start_time + progress_interval
+        self._next_write = self.start_time + metrics_interval
+
+    def update(self, histories=0, work=None, **values):
+        """
+        Record progress, and report it if the last report is old enough.
+
+        Parameters:
+        - histories (int): Histories run since the last update.
+        - work (int | None): Work done since the last update, in source
+                             neutrons, if not `histories` (e.g. for results
+                             read from a cache).
+        - values: Latest values of other metrics (e.g. k1, k2, bank_size).
+        """
+
+        self.histories += histories
+        self.work += histories if work is None else work
+        self.values.update(values)
+        now = self.clock()
+        if self.show and now >= self._next_print:
+            self._next_print = now + self.progress_interval
+            self.print_progress(now)
+        if self.metrics_file is not None and now >= self._next_write:
+            self._next_write = now + self.metrics_interval
+            self.write_metrics(now)
+
+    def metrics(self, now=None):
+        """
+        Get the current metrics.
+
+        Returns:
+        - dict: Value of each metric known, by name.
+        """
+
+        now = self.clock() if now is None else now
+        elapsed = now - self.start_time
+        metrics = {
+            "histories": self.histories,
+            "histories_per_second": self.histories / elapsed if elapsed > 0 else 0.0,
+            "elapsed_seconds": elapsed,
+        }
+        if self.total:
+            fraction = min(self.work / self.total, 1.0)
+            metrics["progress_ratio"] = fraction
+            if fraction > 0:
+                metrics["eta_seconds"] = elapsed * (1 - fraction) / fraction
+        metrics.update(self.values)
+        peak = peak_rss_bytes()
+        if peak is not None:
+            metrics["peak_rss_bytes"] = peak
+        return {name: metrics[name] for name in METRICS if name in metrics}
+
+    def print_progress(self, now=None):
+        """
+        Print a progress line to stderr.
+        """
+
+        metrics = self.metrics(now)
+        parts = [f"{metrics['histories']} histories"]
+        if "progress_ratio" in metrics:
+            parts[0] = f"{metrics['progress_ratio']:.1%}, " + parts[0]
+        parts.append(f"{metrics['histories_per_second']:.4g} histories/s")
+        if "generation" in metrics:
+            parts.append(f"generation {metrics['generation']}")
+        if "jobs" in metrics:
+            parts.append(f"{metrics['jobs']} jobs")
+        for name in ("k1", "k2"):
+            if name in metrics:
+                parts.append(f"{name} = {metrics[name]:.6f}")
+        if "bank_size" in metrics:
+            parts.append(f"bank {metrics['bank_size']}")
+        if "peak_rss_bytes" in metrics:
+            parts.append(f"RSS {metrics['peak_rss_bytes'] / 1024**2:.1f} MiB")
+        parts.append(f"elapsed {format_duration(metrics['elapsed_seconds'])}")
+        if "eta_seconds" in metrics:
+            parts.append(f"ETA {format_duration(metrics['eta_seconds'])}")
+        print("Progress: " + ", ".join(parts), file=sys.stderr, flush=True)
+
+    def write_metrics(self, now=None):
+        """
+        Rewrite the metrics file.
+        """
+
+        metrics = self.metrics(now)
+        if self.metrics_format == "json":
+            text = json.dumps({"timestamp": time.time(), **metrics}, indent=2) + "\n"
+        else:
+            lines = []
+            for name, value in metrics.items():
+                metric_type, help_text = METRICS[name]
+                lines.append(f"# HELP mccc_{name} {help_text}")
+                lines.append(f"# TYPE mccc_{name} {metric_type}")
+                lines.append(f"mccc_{name} {value}")
+            text = "\n".join(lines) + "\n"
+        with open(f"{self.metrics_file}.tmp", "w") as f:
+            f.write(text)
+        os.replace(f"{self.metrics_file}.tmp", self.metrics_file)
+
+    def close(self):
+        """
+        Report the final progress and metrics.
+        """
+
+        now = self.clock()
+        if self.show:
+            self.print_progress(now)
+        if self.metrics_file is not None:
+            self.write_metrics(now)
+
+
+@contextmanager
+def progress_reporter(cfg, total, reporter=None):
+    """
+    Context manager giving the reporter that progress goes to.
+
+    A reporter passed in is used as it is, and left open for the caller.
+    Otherwise one is created if `cfg.progress` or `cfg.metrics_file` is set,
+    and closed (with a final report) on exit.
+
+    Parameters:
+    - cfg (Config): Configuration of the run or study.
+    - total (int | None): Expected work in source neutrons, or None.
+    - reporter (ProgressReporter | None): Reporter of an enclosing study.
+
+    Yields:
+    - ProgressReporter | None: The reporter, or None if progress is not
+                               being reported.
+    """
+
+    if reporter is not None or not (cfg.progress or cfg.metrics_file):
+        yield reporter
+        return
+    reporter = ProgressReporter(
+        total, cfg.progress, cfg.metrics_file, cfg.metrics_format
+    )
+    try:
+        yield reporter
+    finally:
+        reporter.close()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+
+def to_builtin(value):
+    """
+    Function to convert NumPy scalars to the equivalent Python values.
+    """
+
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+def _open_for_writing(path, offset):
+    """
+    Function to open a text file for writing, either from scratch or, when
+    resuming, after truncating it to the given offset.
+    """
+
+    if offset is None:
+        return open(path, "w", newline="")
+    f = open(path, "r+", newline="")
+    f.truncate(offset)
+    f.seek(offset)
+    return f
+
+
+class JsonlWriter:
+    """
+    Results sink writing one JSON object per line.
+
+    Parameters:
+    - path (str | Path): Output file, overwritten if it exists.
+    - offset (int | None): Position to truncate an existing file to and
+                           resume writing from, as given by `tell`.
+    """
+
+    def __init__(self, path, offset=None):
+        self._file = _open_for_writing(path, offset)
+
+    def write(self, record):
+        """
+        Write one record and flush it to disk.
+
+        Parameters:
+        - record (dict): Values for one generation.
+        """
+
+        self._file.write(json.dumps(record, default=to_builtin) + "\n")
+        self._file.flush()
+
+    def tell(self):
+        """Position in the file after the records written so far."""
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriter:
+    """
+    Results sink writing comma-separated values, with the columns of the
+    first record as the header.
+
+    Parameters:
+    - path (str | Path): Output file, overwritten if it exists.
+    - offset (int | None): Position to truncate an existing file to and
+                           resume writing from, as given by `tell`.
+    """
+
+    def __init__(self, path, offset=None):
+        self._file = _open_for_writing(path, offset)
+        self._writer = None
+        self._write_header = not offset
+
+    def write(self, record):
+        """
+        Write one record and flush it to disk.
+
+        Parameters:
+        - record (dict): Values for one generation.
+        """
+
+        if self._writer is None:
+            self._writer = csv.DictWriter(
+                self._file, fieldnames=list(record), extrasaction="ignore"
+            )
+            if self._write_header:
+                self._writer.writeheader()
+        self._writer.writerow(record)
+        self._file.flush()
+
+    def tell(self):
+        """Position in the file after the records written so far."""
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Results sink writing a Parquet file, one row group per record.
+
+    Needs the optional `pyarrow` package. The file footer is only written on
+    close, so the file cannot be read while the run is in progress, and it
+    cannot be resumed: a restarted run writes a new file.
+
+    Parameters:
+    - path (str | Path): Output file, overwritten if it exists.
+    - offset (int | None): Ignored.
+    """
+
+    def __init__(self, path, offset=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError(
+                "Parquet results need the optional 'pyarrow' package"
+            ) from error
+        self._pyarrow = pyarrow
+        self._path = path
+        self._writer = None
+
+    def write(self, record):
+        """
+        Write one record as a row group.
+
+        Parameters:
+        - record (dict): Values for one generation.
+        """
+
+        record = json.loads(json.dumps(record, default=to_builtin))
+        table = self._pyarrow.Table.from_pylist([record])
+        if self._writer is None:
+            self._writer = self._pyarrow.parquet.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+RESULTS_WRITERS = {
+    "jsonl": JsonlWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+}
+
+
+class RecordBuffer:
+    """
+    Sink keeping per-generation results records in memory, e.g. to pass them
+    back from a worker process to be written in order.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        """
+        Keep one record.
+
+        Parameters:
+        - record (dict): Values for one generation.
+        """
+
+        self.records.append(record)
+
+
+def open_results_writer(path, results_format=None, offset=None):
+    """
+    Function to open a results sink for a file.
+
+    Parameters:
+    - path (str | Path): Output file.
+    - results_format (str | None): 'jsonl', 'csv' or 'parquet', or None to
+                                   choose from the file extension (JSONL if
+                                   the extension is not recognised).
+    - offset (int | None): Position to resume an existing file from.
+
+    Returns:
+    - JsonlWriter | CsvWriter | ParquetWriter: The open sink.
+    """
+
+    if results_format is None:
+        results_format = Path(path).suffix.lstrip(".").lower()
+        if results_format not in RESULTS_WRITERS:
+            results_format = "jsonl"
+    if results_format not in RESULTS_WRITERS:
+        raise ValueError(f"Unknown results format: {results_format}")
+    return RESULTS_WRITERS[results_format](path, offset=offset)
+
+
+@contextmanager
+def results_sink(path, results_format=None, sink=None, offset=None):
+    """
+    Context manager giving the sink that per-generation results go to.
+
+    A sink passed in is used as it is, and left open for the caller. Otherwise
+    a writer is opened for `path` (if given), and closed on exit.
+
+    Parameters:
+    - path (str | Path | None): Output file.
+    - results_format (str | None): Output format, as for `open_results_writer`.
+    - sink (object | None): Any object with a `write(record)` method.
+    - offset (int | None): Position to resume an existing file from.
+
+    Yields:
+    - object | None: The sink, or None if results are not being written.
+    """
+
+    if sink is not None or path is None:
+        yield sink
+        return
+    writer = open_results_writer(path, results_format, offset=offset)
+    try:
+        yield writer
+    finally:
+        writer.close()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+import sys
+
+import numpy as np
+
+# Philox4x32-10 constants (Salmon et al., "Parallel random numbers: as easy as
+# 1, 2, 3", SC11)
+PHILOX_M0 = 0xD2511F53
+PHILOX_M1 = 0xCD9E8D57
+PHILOX_W0 = 0x9E3779B9
+PHILOX_W1 = 0xBB67AE85
+PHILOX_ROUNDS = 10
+
+MASK32 = 0xFFFFFFFF
+
+# Multipliers of the counter words in each round, in the order the batched
+# generator holds them (c0, c2), and the position of the low and high 32-bit
+# halves of a uint64 product viewed as two uint32 words
+PHILOX_MULTIPLIERS = np.array([[PHILOX_M0], [PHILOX_M1]], dtype=np.uint64)
+LOW_WORD, HIGH_WORD = (0, 1) if sys.byteorder == "little" else (1, 0)
+
+# Number of counters the batched generator works on at a time. Its
+# temporaries for a chunk fit in the CPU cache, where its ten rounds run
+# about twice as fast as over whole arrays in main memory.
+PHILOX_CHUNK = 16384
+
+# Sub-streams of a particle history. Each Philox block gives four uniforms, so
+# one block covers one collision: direction, distance, interaction and
+# fission multiplicity. The population stream is used for population control
+# of the bank between generations.
+COLLISION_STREAM = 0
+SOURCE_STREAM = 1
+POPULATION_STREAM = 2
+
+# Particles made by splitting get sub-streams of their own, numbered from the
+# parent's stream. Split stream numbers have the top bit set, so they never
+# clash with the fixed sub-streams above; the draw word of the counter that
+# numbers them holds the same flag, the copy number and the parent's draw.
+SPLIT_FLAG = 1 << 31
+SPLIT_COPY_SHIFT = 24
+
+# Delta tracking draws the random numbers of a flight's tentative collisions
+# from a sub-stream numbered from the flight's stream and block. Delta stream
+# numbers lie in [DELTA_FLAG, SPLIT_FLAG), clear of the fixed and split
+# sub-streams.
+DELTA_FLAG = 1 << 30
+
+# Single-history draws on the fixed sub-streams are served from blocks
+# generated for CACHE_HISTORIES consecutive histories at a time, so the
+# generator runs vectorised rather than once per collision. A block holds the
+# first CACHE_DRAWS draws of each history: about half of the neutrons are
+# lost at each collision, so later draws are generated one at a time rather
+# than for a whole block of histories that mostly never reach them. At most
+# CACHE_SIZE such blocks are kept.
+CACHE_HISTORIES = 1024
+CACHE_DRAWS = 4
+CACHE_SIZE = 16
+
+
+def philox4x32(counter, key):
+    """
+    Function to evaluate the Philox4x32-10 counter-based generator.
+
+    The counter words may be Python ints or uint64 arrays holding 32-bit
+    values; the same code serves single histories and whole batches.
+
+    Parameters:
+    - counter (tuple): Four 32-bit counter words.
+    - key (tuple): Two 32-bit key words (Python ints).
+
+    Returns:
+    - tuple: Four 32-bit random words, of the same type as the counter words.
+    """
+
+    c0, c1, c2, c3 = counter
+    k0, k1 = key
+
+    for _ in range(PHILOX_ROUNDS):
+        product0 = PHILOX_M0 * c0
+        product1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = (
+            (product1 >> 32) ^ c1 ^ k0,
+            product1 & MASK32,
+            (product0 >> 32) ^ c3 ^ k1,
+            product0 & MASK32,
+        )
+        k0 = (k0 + PHILOX_W0) & MASK32
+        k1 = (k1 + PHILOX_W1) & MASK32
+
+    return c0, c1, c2, c3
+
+
+def philox4x32_batch(counter, key, out=None):
+    """
+    Function to evaluate the Philox4x32-10 counter-based generator for many
+    counters at once.
+
+    Gives the same words as `philox4x32`, but each round is one widening
+    uint32 to uint64 multiply of the two multiplied words, whose 32-bit halves
+    are then read in place, and two exclusive ors, all into temporaries
+    allocated once per call and worked through a chunk of PHILOX_CHUNK
+    counters at a time.
+
+    Parameters:
+    - counter (tuple): Four counter words, each a 32-bit integer or an array
+                       of them (all arrays of the same length).
+    - key (tuple): Two 32-bit key words (Python ints).
+    - out (np.ndarray | None): Array of shape (4, n) to write the words to, as
+                               uint32 or (scaled to uniforms in (0, 1)) as
+                               float64; or None for a new uint32 array.
+
+    Returns:
+    - np.ndarray: The random words (or uniforms), of shape (4, n).
+    """
+
+    words = [np.asarray(word) for word in counter]
+    if out is None:
+        size = max((word.size for word in words if word.ndim), default=1)
+        out = np.empty((4, size), dtype=np.uint32)
+    size = out.shape[1]
+    chunk = max(min(size, PHILOX_CHUNK), 1)
+
+    # The state is held as the multiplied words (c0, c2) and the others
+    # (c1, c3). Two sets of products are used in turn, as the low halves of
+    # one round's products are the next round's (c1, c3).
+    state = np.empty((2, 2, chunk), dtype=np.uint32)
+    products = np.empty((2, 2, chunk), dtype=np.uint64)
+    keys = np.empty((PHILOX_ROUNDS, 2, 1), dtype=np.uint32)
+    k0, k1 = key
+    for i in range(PHILOX_ROUNDS):
+        keys[i] = [[k0], [k1]]
+        k0 = (k0 + PHILOX_W0) & MASK32
+        k1 = (k1 + PHILOX_W1) & MASK32
+
+    for start in range(0, size, chunk):
+        stop = min(start + chunk, size)
+        n = stop - start
+        c0, c1, c2, c3 = (word[start:stop] if word.ndim else word for word in words)
+        multiplied, others = state[:, :, :n]
+        multiplied[0] = c0
+        multiplied[1] = c2
+        others[0] = c1
+        others[1] = c3
+        for i in range(PHILOX_ROUNDS):
+            product = products[i % 2, :, :n]
+            np.multiply(multiplied, PHILOX_MULTIPLIERS, out=product)
+            halves = product.view(np.uint32)
+            # c0 = hi(M1 c2) ^ c1 ^ k0, c2 = hi(M0 c0) ^ c3 ^ k1
+            np.bitwise_xor(halves[::-1, HIGH_WORD::2], others, out=multiplied)
+            multiplied ^= keys[i]
+            # c1 = lo(M1 c2), c3 = lo(M0 c0)
+            others = halves[::-1, LOW_WORD::2]
+
+        if out.dtype == np.uint32:
+            out[0::2, start:stop] = multiplied
+            out[1::2, start:stop] = others
+        else:
+            np.multiply(multiplied, 2.0**-32, out=out[0::2, start:stop])
+            np.multiply(others, 2.0**-32, out=out[1::2, start:stop])
+            out[:, start:stop] += 2.0**-33
+    return out
+
+
+class ParticleStreams:
+    """
+    Counter-based random number streams, one per particle history.
+
+    The stream of history `i` is addressed by the Philox counter
+    (draw, stream, i_low, i_high) under a key fixed for the generation, so
+    history `i` always sees the same numbers however histories are ordered,
+    batched or distributed across processes.
+
+    Parameters:
+    - key (sequence): Two 32-bit key words.
+    """
+
+    def __init__(self, key):
+        self.key = tuple(int(word) for word in key)
+        self._blocks = {}
+
+    def __getstate__(self):
+        # The cached blocks are not worth sending to worker processes
+        return {"key": self.key}
+
+    def __setstate__(self, state):
+        self.__init__(state["key"])
+
+    @classmethod
+    def for_generation(cls, seed_sequence, gen):
+        """
+        Create the streams for one generation of a run.
+
+        Parameters:
+        - seed_sequence (np.random.SeedSequence): Root seed sequence of the run.
+        - gen (int): Generation number.
+
+        Returns:
+        - ParticleStreams: Streams keyed on the seed and the generation.
+        """
+
+        child = np.random.SeedSequence(entropy=seed_sequence.entropy, spawn_key=(gen,))
+        return cls(child.generate_state(2, dtype=np.uint32))
+
+    def uniforms(self, histories, draw, stream=COLLISION_STREAM):
+        """
+        Draw one block of four uniform random numbers for each of many histories.
+
+        Parameters:
+        - histories (array-like): Index of each history within the generation.
+        - draw (int | array-like): Block number within the histories' streams,
+                                   for all histories or for each.
+        - stream (int | array-like): Sub-stream (COLLISION_STREAM,
+                                     SOURCE_STREAM or a split stream), for
+                                     all histories or for each.
+
+        Returns:
+        - np.ndarray: Array of shape (4, len(histories)) of uniform random
+                      numbers in the open interval (0, 1).
+        """
+
+        histories = np.asarray(histories, dtype=np.uint64)
+        return philox4x32_batch(
+            (
+                np.asarray(draw, dtype=np.uint32),
+                np.asarray(stream, dtype=np.uint32),
+                histories.astype(np.uint32),
+                (histories >> 32).astype(np.uint32),
+            ),
+            self.key,
+            np.empty((4, histories.size)),
+        )
+
+    def uniform_block(self, history, draw, stream=COLLISION_STREAM):
+        """
+        Draw one block of four uniform random numbers for a single history.
+
+        Gives exactly the same numbers as `uniforms` for that history. The
+        first draws on the collision and source sub-streams come from cached
+        blocks (see CACHE_HISTORIES); the population sub-stream is drawn from
+        once per generation, and split and delta sub-streams belong to a
+        single particle, so their draws, and later draws, are generated one
+        at a time.
+
+        Parameters:
+        - history (int): Index of the history within the generation.
+        - draw (int): Block number within the history's stream.
+        - stream (int): Sub-stream (COLLISION_STREAM, SOURCE_STREAM,
+                        POPULATION_STREAM, or a split or delta stream).
+
+        Returns:
+        - tuple: Four uniform random numbers in the open interval (0, 1).
+        """
+
+        history = int(history)
+        if draw < CACHE_DRAWS and stream in (COLLISION_STREAM, SOURCE_STREAM):
+            key = (stream, history // CACHE_HISTORIES)
+            block = self._blocks.get(key)
+            if block is None:
+                block = self._cache_block(*key)
+            u0, u1, u2, u3 = block
+            i = history % CACHE_HISTORIES * CACHE_DRAWS + draw
+            return u0[i], u1[i], u2[i], u3[i]
+
+        words = philox4x32(
+            (draw, stream, history & MASK32, history >> 32),
+            self.key,
+        )
+        return tuple((word + 0.5) * 2.0**-32 for word in words)
+
+    def _cache_block(self, stream, history_block):
+        """
+        Generate and cache the first draws of a block of histories.
+
+        Returns:
+        - list: Four lists of uniform random numbers, one for each number of
+                a draw, holding each of the first CACHE_DRAWS draws of each
+                history in the block in turn.
+        """
+
+        if len(self._blocks) >= CACHE_SIZE:
+            self._blocks.clear()
+        # Counters of every draw of every history in the block, history by
+        # history, generated together and converted to floats in one go
+        histories = history_block * CACHE_HISTORIES + np.arange(
+            CACHE_HISTORIES, dtype=np.uint64
+        )
+        rand_nums = self.uniforms(
+            np.repeat(histories, CACHE_DRAWS),
+            np.tile(np.arange(CACHE_DRAWS), CACHE_HISTORIES),
+            stream,
+        )
+        block = rand_nums.tolist()
+        self._blocks[(stream, history_block)] = block
+        return block
+
+    def split_streams(self, histories, draws, streams, copies):
+        """
+        Number the sub-streams of particles made by splitting.
+
+        Copy `c` (from 1; copy 0 keeps the parent's stream) of a particle split
+        after block `draw` of sub-stream `stream` gets a stream numbered by
+        hashing those values, so the numbering does not depend on the order in
+        which particles are tracked. Draws must be below 2**24 and copy
+        numbers below 2**7.
+
+        Parameters:
+        - histories (array-like): Index of each parent's history.
+        - draws (array-like): Next block number of each parent's stream.
+        - streams (array-like): Sub-stream of each parent.
+        - copies (array-like): Copy number of each new particle.
+
+        Returns:
+        - np.ndarray: Sub-stream number of each new particle.
+        """
+
+        histories = np.asarray(histories, dtype=np.uint64)
+        words = philox4x32_batch(
+            (
+                SPLIT_FLAG
+                | (np.asarray(copies, dtype=np.uint32) << SPLIT_COPY_SHIFT)
+                | np.asarray(draws, dtype=np.uint32),
+                np.asarray(streams, dtype=np.uint32),
+                histories.astype(np.uint32),
+                (histories >> 32).astype(np.uint32),
+            ),
+            self.key,
+        )
+        return words[0].astype(np.uint64) | SPLIT_FLAG
+
+    def delta_streams(self, histories, draws, streams):
+        """
+        Number the sub-streams of the tentative collisions of flights under
+        delta tracking.
+
+        The flight made with block `draw` of sub-stream `stream` gets a stream
+        numbered by hashing those values, so each flight has its own
+        sequence of tentative collisions however many it needs. Draws must be
+        below 2**24.
+
+        Parameters:
+        - histories (array-like): Index of each flight's history.
+        - draws (int | array-like): Block number of each flight.
+        - streams (int | array-like): Sub-stream of each flight.
+
+        Returns:
+        - np.ndarray: Sub-stream number for each flight's tentative collisions.
+        """
+
+        histories = np.asarray(histories, dtype=np.uint64)
+        words = philox4x32_batch(
+            (
+                DELTA_FLAG | np.asarray(draws, dtype=np.uint32),
+                np.asarray(streams, dtype=np.uint32),
+                histories.astype(np.uint32),
+                (histories >> 32).astype(np.uint32),
+            ),
+            self.key,
+            np.empty((4, histories.size), dtype=np.uint32),
+        )
+        return (words[0].astype(np.uint64) & (DELTA_FLAG - 1)) | DELTA_FLAG
@@ -1,35 +1,60 @@
 # -*- coding: utf-8 -*-
+import functools
 import math
 
 import numpy as np
 
+# Integer codes for the interaction types, as returned by `interaction_codes`
+SCATTER = 0
+FISSION = 1
+CAPTURE = 2
+INTERACTION_TYPES = ("scatter", "fission", "capture")
 
-def sample_direction_cosine():
+# Generator the samplers draw from when they are given neither random numbers
+# nor a generator. Transport never uses it: the engines draw from the
+# per-history streams of mccc.rng.
+DEFAULT_RNG = np.random.default_rng()
+
+
+def sample_direction_cosine(rand_num=None, rng=None):
     """
     Function to sample direction cosine for the neutron in x-direction.
 
+    Parameters:
+    - rand_num (float | np.ndarray | None): Uniform random number(s) in (0, 1) to
+                                            use, or None to draw one.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+
     Returns:
     - float: Sampled direction cosine (mu).
     """
 
-    return np.random.uniform(-1, 1)  # Sample mu between -1 and 1
+    if rand_num is None:
+        return float(sample_direction_cosine_batch(1, rng)[0])
+
+    return 2.0 * rand_num - 1.0
 
 
-def sample_interaction_type(scatter_prob, fission_prob, rand_num=None):
+def sample_interaction_type(scatter_prob, fission_prob, rand_num=None, rng=None):
     """
     Function to sample an interaction type based on cross-sections.
 
     Parameters:
     - scatter_prob (float): Scattering probability
     - fission_prob (float): Fission probability
+    - rand_num (float | None): Uniform random number in (0, 1) to use, or None
+                               to draw one.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
 
     Returns:
     - str: Interaction type ('scatter', 'fission', 'capture').
     """
 
-    # Sample a random number between 0 and 1
     if rand_num is None:
-        rand_num = np.random.uniform(0, 1)
+        code = sample_interaction_type_batch(scatter_prob, fission_prob, 1, rng)[0]
+        return INTERACTION_TYPES[code]
 
     if rand_num < scatter_prob:
         return "scatter"
@@ -39,47 +64,299 @@ def sample_interaction_type(scatter_prob, fission_prob, rand_num=None):
         return "capture"
 
 
-def sample_neutrons_emitted(nu):
+def sample_neutrons_emitted(nu, rand_num=None, rng=None):
     """
     Function to sample the number of neutrons emitted in a fission event.
 
     Parameters:
     - nu (float): Average number of neutrons emitted per fission.
+    - rand_num (float | np.ndarray | None): Uniform random number(s) in (0, 1) to
+                                            invert the Poisson CDF at, or None to
+                                            draw one.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
 
     Returns:
     - int: Number of neutrons emitted in the fission event.
     """
-    return np.random.poisson(nu)
+    if rand_num is None:
+        return int(sample_neutrons_emitted_batch(nu, 1, rng)[0])
+
+    # Invert the Poisson CDF by sequential search
+    if np.ndim(rand_num) == 0:
+        num_emitted = 0
+        term = cdf = math.exp(-nu)
+        searching = rand_num > cdf
+        while searching:
+            num_emitted += 1
+            term *= nu / num_emitted
+            cdf += term
+            # Stop if the CDF can no longer grow (rounding in the far tail)
+            searching = rand_num > cdf and term > 0
+        return num_emitted
+
+    # Same search, for all numbers at once, as a binary search of the CDF
+    cdf = poisson_cdf(nu)
+    num_emitted = np.searchsorted(cdf, rand_num, side="left")
+    return np.minimum(num_emitted, cdf.size - 1)
+
+
+@functools.lru_cache(maxsize=16)
+def poisson_cdf(nu):
+    """
+    Function to tabulate the Poisson CDF, summed in the same order as the
+    sequential search of `sample_neutrons_emitted`, so that a binary search of
+    the table gives the same numbers.
+
+    Parameters:
+    - nu (float): Mean of the distribution.
+
+    Returns:
+    - np.ndarray: CDF at 0, 1, 2, ..., up to where its terms underflow to zero.
+    """
 
+    term = cdf = math.exp(-nu)
+    values = [cdf]
+    while term > 0:
+        term *= nu / len(values)
+        cdf += term
+        values.append(cdf)
+    cdf = np.array(values)
+    cdf.flags.writeable = False
+    return cdf
 
-def sample_position(slab_thickness_cm):
+
+def sample_position(slab_thickness_cm, size=None, rand_num=None, rng=None):
     """
     Function to sample the initial position of a neutron within the slab.
 
     Parameters:
     - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - size (int | None): Number of positions to sample; a single float is returned
+                         if None.
+    - rand_num (float | np.ndarray | None): Uniform random number(s) in (0, 1) to
+                                            use, or None to draw them.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
 
     Returns:
-    - float: Initial position of the neutron within the slab.
+    - float | np.ndarray: Initial position(s) of the neutron(s) within the slab.
     """
-    # Sample a random initial position within the slab
-    return np.random.uniform(0, slab_thickness_cm)
+    if rand_num is not None:
+        return slab_thickness_cm * rand_num
+
+    if size is None:
+        return float(sample_position_batch(slab_thickness_cm, 1, rng)[0])
+    return sample_position_batch(slab_thickness_cm, size, rng)
 
 
-def sample_scattering_distance(mean_free_path):
+def sample_scattering_distance(mean_free_path, rand_num=None, rng=None):
     """
     Function to sample a distance for scattering.
 
     Parameters:
     - mean_free_path (float): inverse of total macroscopic cross-section, in cm.
+    - rand_num (float | np.ndarray | None): Uniform random number(s) in (0, 1) to
+                                            use, or None to draw one.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
 
     Returns:
     - float: Sampled distance for scattering.
     """
 
-    # Calculate the distance using inverse transform sampling.
-    # Resample if `u` is exactly zero to avoid math.log(0).
-    u = np.random.random()
-    while u == 0.0:
-        u = np.random.random()
-    return -mean_free_path * math.log(u)
+    if rand_num is not None:
+        distance = -mean_free_path * np.log(rand_num)
+        # A float, rather than a NumPy scalar, is much quicker to track with
+        return distance if isinstance(distance, np.ndarray) else float(distance)
+
+    return float(sample_scattering_distance_batch(mean_free_path, 1, rng)[0])
+
+
+def sample_optical_depth(rand_num=None, rng=None):
+    """
+    Function to sample the optical depth (the distance in mean free paths) to
+    the next collision.
+
+    Parameters:
+    - rand_num (float | np.ndarray | None): Uniform random number(s) in (0, 1) to
+                                            use, or None to draw one.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+
+    Returns:
+    - float: Sampled optical depth.
+    """
+
+    return sample_scattering_distance(1.0, rand_num, rng)
+
+
+def interaction_codes(scatter_prob, fission_prob, rand_nums):
+    """
+    Function to turn uniform random numbers into interaction codes.
+
+    Gives the same interactions as `sample_interaction_type` for each number.
+
+    Parameters:
+    - scatter_prob (float | np.ndarray): Scattering probability, for all numbers
+                                         or for each
+    - fission_prob (float | np.ndarray): Fission probability, for all numbers or
+                                         for each
+    - rand_nums (np.ndarray): Uniform random numbers in (0, 1).
+
+    Returns:
+    - np.ndarray: Interaction codes (SCATTER, FISSION or CAPTURE).
+    """
+
+    # A boolean array is already the 0/1 bytes of the int8 codes
+    codes = (rand_nums >= scatter_prob).view(np.int8)
+    codes += rand_nums >= scatter_prob + fission_prob
+    return codes
+
+
+def _draw_uniforms(count, rng, out=None):
+    """
+    Function to fill a buffer with uniform random numbers in [0, 1).
+
+    Parameters:
+    - count (int): Number of random numbers.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+    - out (np.ndarray | None): Float64 buffer of at least `count` elements, or
+                               None to allocate one.
+
+    Returns:
+    - np.ndarray: The first `count` elements of the buffer, filled.
+    """
+
+    rng = DEFAULT_RNG if rng is None else rng
+    if out is None:
+        return rng.random(count)
+    return rng.random(count, out=out[:count])
+
+
+def sample_direction_cosine_batch(count, rng=None, out=None):
+    """
+    Function to sample many direction cosines at once.
+
+    Parameters:
+    - count (int): Number of direction cosines.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+    - out (np.ndarray | None): Float64 buffer of at least `count` elements to
+                               fill, or None to allocate one.
+
+    Returns:
+    - np.ndarray: Sampled direction cosines (a view of `out`, if given).
+    """
+
+    mu = _draw_uniforms(count, rng, out)
+    mu *= 2.0
+    mu -= 1.0
+    return mu
+
+
+def sample_scattering_distance_batch(mean_free_path, count, rng=None, out=None):
+    """
+    Function to sample many distances to the next collision at once.
+
+    Zero random numbers are redrawn, all together, so log(0) is never taken.
+
+    Parameters:
+    - mean_free_path (float): inverse of total macroscopic cross-section, in cm.
+    - count (int): Number of distances.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+    - out (np.ndarray | None): Float64 buffer of at least `count` elements to
+                               fill, or None to allocate one.
+
+    Returns:
+    - np.ndarray: Sampled distances (a view of `out`, if given).
+    """
+
+    rng = DEFAULT_RNG if rng is None else rng
+    distances = _draw_uniforms(count, rng, out)
+    zeros = np.flatnonzero(distances == 0.0) if not distances.all() else ()
+    while len(zeros) > 0:
+        distances[zeros] = rng.random(zeros.size)
+        zeros = zeros[distances[zeros] == 0.0]
+
+    np.log(distances, out=distances)
+    distances *= -mean_free_path
+    return distances
+
+
+def sample_interaction_type_batch(
+    scatter_prob, fission_prob, count, rng=None, out=None
+):
+    """
+    Function to sample many interaction types at once.
+
+    Parameters:
+    - scatter_prob (float): Scattering probability
+    - fission_prob (float): Fission probability
+    - count (int): Number of interactions.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+    - out (np.ndarray | None): Integer buffer of at least `count` elements to
+                               fill, or None to allocate one.
+
+    Returns:
+    - np.ndarray: Interaction codes (SCATTER, FISSION or CAPTURE); a view of
+                  `out`, if given.
+    """
+
+    codes = interaction_codes(scatter_prob, fission_prob, _draw_uniforms(count, rng))
+    if out is None:
+        return codes
+    out = out[:count]
+    out[:] = codes
+    return out
+
+
+def sample_neutrons_emitted_batch(nu, count, rng=None, out=None):
+    """
+    Function to sample the number of neutrons emitted by many fission events.
+
+    Uses the same inverse-CDF sampling as `sample_neutrons_emitted`.
+
+    Parameters:
+    - nu (float): Average number of neutrons emitted per fission.
+    - count (int): Number of fission events.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+    - out (np.ndarray | None): Integer buffer of at least `count` elements to
+                               fill, or None to allocate one.
+
+    Returns:
+    - np.ndarray: Number of neutrons emitted in each fission event; a view of
+                  `out`, if given.
+    """
+
+    num_emitted = sample_neutrons_emitted(nu, _draw_uniforms(count, rng))
+    if out is None:
+        return num_emitted
+    out = out[:count]
+    out[:] = num_emitted
+    return out
+
+
+def sample_position_batch(slab_thickness_cm, count, rng=None, out=None):
+    """
+    Function to sample many positions uniformly within the slab.
+
+    Parameters:
+    - slab_thickness_cm (float): Thickness of the 1D slab in centimeters.
+    - count (int): Number of positions.
+    - rng (np.random.Generator | None): Generator to draw from, or None for
+                                        DEFAULT_RNG.
+    - out (np.ndarray | None): Float64 buffer of at least `count` elements to
+                               fill, or None to allocate one.
+
+    Returns:
+    - np.ndarray: Sampled positions (a view of `out`, if given).
+    """
+
+    positions = _draw_uniforms(count, rng, out)
+    positions *= slab_thickness_cm
+    return positions
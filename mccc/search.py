@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+
+from mccc.bank import FissionBank
+
+# Config parameters a criticality search can vary
+SEARCH_PARAMS = ("slab_thickness_cm", "nu", "fission_xs", "scatter_xs", "total_xs")
+
+# Search parameters overridden by the cross-sections of each region
+REGION_PARAMS = ("fission_xs", "scatter_xs", "total_xs")
+
+# Relative step from the starting value to the second iterate
+FIRST_STEP = 0.1
+
+# Number of most recent iterates the line through k(x) is fitted to
+FIT_POINTS = 4
+
+# Largest factor by which an iterate without a bracket may move the parameter
+MAX_STEP_FACTOR = 2.0
+
+
+def with_parameter(cfg, param, value):
+    """
+    Function to set the searched parameter of a configuration.
+
+    The thickness of a layered slab is set by scaling all of its region
+    boundaries. The cross-sections of a layered slab are those of its
+    regions, so they cannot be searched on.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - param (str): Name of the parameter, one of SEARCH_PARAMS.
+    - value (float): New value of the parameter.
+
+    Returns:
+    - Config: The configuration with the new value.
+    """
+
+    if param not in SEARCH_PARAMS:
+        raise ValueError(f"Unknown search parameter: {param}")
+    if param in REGION_PARAMS and cfg.regions is not None:
+        raise ValueError(f"Cannot search {param} of a slab given by regions")
+    if param == "slab_thickness_cm" and cfg.regions is not None:
+        scale = value / cfg.slab_thickness_cm
+        regions = tuple((right * scale, *xs) for right, *xs in cfg.regions)
+        return replace(cfg, regions=regions)
+    return replace(cfg, **{param: value})
+
+
+def rescale_bank(bank, old_thickness_cm, new_thickness_cm):
+    """
+    Function to map a fission bank onto a slab of a different thickness.
+
+    The sites keep their weights and their fractional positions in the slab,
+    so the converged shape of the source carries over to the new geometry.
+
+    Parameters:
+    - bank (FissionBank): Fission bank in the old slab.
+    - old_thickness_cm (float): Thickness of the old slab in centimeters.
+    - new_thickness_cm (float): Thickness of the new slab in centimeters.
+
+    Returns:
+    - FissionBank: A new bank in the new slab.
+    """
+
+    rescaled = FissionBank.from_positions(
+        bank.positions * (new_thickness_cm / old_thickness_cm),
+        precision=bank.precision,
+    )
+    rescaled.weights[:] = bank.weights
+    return rescaled
+
+
+def fit_line(iterates):
+    """
+    Function to fit a straight line k = a + b x through the most recent
+    iterates of a search, weighted by the inverse variance of each k.
+
+    Parameters:
+    - iterates (list): (x, k, std_err) of each iterate so far.
+
+    Returns:
+    - tuple: Intercept a, slope b and their 2x2 covariance matrix (NaN if no
+             iterate has a usable standard error); or None if the iterates do
+             not determine a line.
+    """
+
+    x, k, std_err = np.array(iterates[-FIT_POINTS:], dtype=float).T
+    if np.unique(x).size < 2:
+        return None
+    usable = np.isfinite(std_err) & (std_err > 0)
+    if usable.any():
+        # Iterates without a usable standard error get the largest of the others
+        std_err = np.where(usable, std_err, std_err[usable].max())
+    else:
+        # An unweighted fit, whose errors are unknown
+        std_err = np.ones_like(k)
+
+    design = np.stack([np.ones_like(x), x], axis=1) / std_err[:, np.newaxis]
+    covariance = np.linalg.inv(design.T @ design)
+    intercept, slope = covariance @ design.T @ (k / std_err)
+    if not usable.any():
+        covariance = np.full_like(covariance, np.nan)
+    return float(intercept), float(slope), covariance
+
+
+def next_iterate(iterates, target_k):
+    """
+    Function to choose the next parameter value of a criticality search.
+
+    The step is a secant step through a weighted least-squares line over the
+    most recent iterates rather than through the last two alone, so the
+    statistical noise of each k is averaged over several iterates. Once some
+    iterate is below and another above the target, the root is bracketed,
+    and a step that leaves the bracket is replaced by bisection, as in
+    Brent's method. Without a bracket, a step may change the parameter by
+    at most MAX_STEP_FACTOR.
+
+    Parameters:
+    - iterates (list): (x, k, std_err) of each iterate so far.
+    - target_k (float): Target k_eff.
+
+    Returns:
+    - float: The next parameter value.
+    """
+
+    x_last = iterates[-1][0]
+    if len(iterates) == 1:
+        return x_last * (1 + FIRST_STEP)
+
+    below = [it for it in iterates if it[1] < target_k]
+    above = [it for it in iterates if it[1] >= target_k]
+    if below and above:
+        # The closest iterates on each side of the target
+        low = max(below, key=lambda it: it[1])[0]
+        high = min(above, key=lambda it: it[1])[0]
+        lower, upper = min(low, high), max(low, high)
+    else:
+        lower, upper = x_last / MAX_STEP_FACTOR, x_last * MAX_STEP_FACTOR
+
+    fit = fit_line(iterates)
+    if fit is not None and fit[1] != 0:
+        intercept, slope, _ = fit
+        x_next = (target_k - intercept) / slope
+        if lower < x_next < upper:
+            return float(x_next)
+    if below and above:
+        return 0.5 * (lower + upper)
+    # Extrapolate as far as allowed, in the direction of the fitted slope
+    if fit is None or fit[1] == 0:
+        raise ValueError("k_eff does not change with the search parameter")
+    return upper if (target_k - iterates[-1][1]) * fit[1] > 0 else lower
+
+
+def estimate_root(iterates, target_k):
+    """
+    Function to estimate the parameter value giving the target k_eff, and
+    its standard error, from the line fitted to the most recent iterates.
+
+    Parameters:
+    - iterates (list): (x, k, std_err) of each iterate so far.
+    - target_k (float): Target k_eff.
+
+    Returns:
+    - tuple: Parameter value and its standard error (NaN if no iterate has
+             a usable standard error); the last iterate's value and NaN if no
+             line can be fitted.
+    """
+
+    fit = fit_line(iterates)
+    if fit is None or fit[1] == 0:
+        return float(iterates[-1][0]), float("nan")
+    intercept, slope, covariance = fit
+    root = (target_k - intercept) / slope
+    # Propagate the covariance of the fit to the root, -(a - target) / b
+    gradient = np.array([-1.0 / slope, -(root / slope)])
+    return float(root), float(np.sqrt(gradient @ covariance @ gradient))
@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from dataclasses import field
 from dataclasses import replace
 
+from mccc.geometry import SlabRegions
+
 
 @dataclass
 class Config:
@@ -18,6 +20,71 @@ class Config:
     - left_boundary_condition (str): Boundary condition for the left-hand side of the
                                      slab ('reflective' or 'transmissive').
     - random_seed (int | None): Optional RNG seed for reproducible runs.
+    - engine (str): Transport engine ('event' for the vectorised event-based engine,
+                    'history' for the history-by-history loop).
+    - workers (int | None): Number of worker processes to split each generation
+                            across, or None to run serially.
+    - bank_precision (str): Storage precision of the fission bank ('float64', or
+                            'float32' for half the memory).
+    - population_control (str): Population control between generations ('none',
+                                'comb' or 'resample' back to num_particles).
+    - num_inactive (int): Number of inactive generations, run only to converge the
+                          fission source (the minimum number if auto_inactive).
+    - auto_inactive (bool): End the inactive generations automatically once the
+                            source Shannon entropy has stabilised.
+    - entropy_bins (int): Number of mesh bins over the slab for the entropy.
+    - entropy_window (int): Number of generations over which the entropy must be
+                            stable.
+    - entropy_tolerance (float): Largest spread of the entropy over the window, in
+                                 bits, for the source to count as converged.
+    - target_std (float | None): Stop once the standard error of the combined
+                                 k_eff estimate is below this target, or None to
+                                 run all generations.
+    - max_histories (int | None): Budget of particle histories for a run or trial
+                                  with a target standard error.
+    - results_file (str | None): File to stream per-generation results to.
+    - results_format (str | None): Format of the results file ('jsonl', 'csv' or
+                                   'parquet'), or None to go by its extension.
+    - checkpoint_dir (str | None): Directory to write checkpoints to, to restart
+                                   the run from.
+    - checkpoint_interval (int): Number of generations between checkpoints.
+    - mesh_bins (int | None): Number of equal bins over the slab for the mesh
+                              tally, or None for no mesh tally.
+    - mesh_edges (tuple | None): Bin edges in cm for the mesh tally, used instead
+                                 of mesh_bins if given.
+    - implicit_capture (bool): Use implicit capture (survival biasing): neutrons
+                               are never absorbed, but lose the absorbed
+                               fraction of their weight at each collision.
+    - weight_cutoff (float | None): Play Russian roulette with neutrons whose
+                                    weight falls below this cutoff, or None for
+                                    no cutoff (0.25 with implicit capture).
+    - weight_windows (tuple | None): Lower weight bounds of the weight windows
+                                     on equal bins over the slab, or None for
+                                     no weight windows.
+    - weight_window_ratio (float): Ratio of the upper to the lower bound of
+                                   each weight window.
+    - regions (tuple | None): Layers of a heterogeneous slab from left to right,
+                              each (right boundary in cm, total_xs, scatter_xs,
+                              fission_xs), or None for a single region of the
+                              material above. With regions, slab_thickness_cm
+                              is the last right boundary.
+    - tracking (str): How neutrons are moved to their next collision ('surface'
+                      to track them region by region, or 'delta' for delta
+                      tracking with the majorant cross-section).
+    - cmfd_bins (int | None): Number of equal coarse-mesh cells over the slab
+                              for CMFD acceleration of the fission source, or
+                              None for no CMFD.
+    - profile (bool): Time each phase of each generation, and report the
+                      timings, histories per second, collisions per history,
+                      bank sizes and peak memory at the end of the run.
+    - profile_file (str | None): File to write cProfile statistics of the
+                                 transport to (implies profile).
+    - progress (bool): Print throttled progress lines with an ETA to stderr.
+    - metrics_file (str | None): File to rewrite periodically with the
+                                 progress metrics (histories, histories per
+                                 second, k1, k2, bank size, memory).
+    - metrics_format (str | None): Format of the metrics file ('prometheus'
+                                   or 'json'), or None to go by its extension.
     """
 
     # Independent parameters
@@ -30,11 +97,41 @@ class Config:
     nu: float = 3.24
     left_boundary_condition: str = "reflective"
     random_seed: int | None = None
+    engine: str = "event"
+    workers: int | None = None
+    bank_precision: str = "float64"
+    population_control: str = "none"
+    num_inactive: int = 0
+    auto_inactive: bool = False
+    entropy_bins: int = 20
+    entropy_window: int = 3
+    entropy_tolerance: float = 0.01
+    target_std: float | None = None
+    max_histories: int | None = None
+    results_file: str | None = None
+    results_format: str | None = None
+    checkpoint_dir: str | None = None
+    checkpoint_interval: int = 1
+    mesh_bins: int | None = None
+    mesh_edges: tuple[float, ...] | None = None
+    implicit_capture: bool = False
+    weight_cutoff: float | None = None
+    weight_windows: tuple[float, ...] | None = None
+    weight_window_ratio: float = 5.0
+    regions: tuple[tuple[float, float, float, float], ...] | None = None
+    tracking: str = "surface"
+    cmfd_bins: int | None = None
+    profile: bool = False
+    profile_file: str | None = None
+    progress: bool = False
+    metrics_file: str | None = None
+    metrics_format: str | None = None
 
     # Derived parameters
     mean_free_path: float = field(init=False)
     scatter_prob: float = field(init=False)
     fission_prob: float = field(init=False)
+    slab_regions: SlabRegions = field(init=False, repr=False, compare=False)
 
     # Calculate derived parameters so they're updated automatically if the
     # independent paramer(s) they depend on are changed
@@ -42,6 +139,14 @@ class Config:
         self.mean_free_path = 1 / self.total_xs
         self.scatter_prob = self.scatter_xs / self.total_xs
         self.fission_prob = self.fission_xs / self.total_xs
+        if self.mesh_edges is not None:
+            self.mesh_edges = tuple(self.mesh_edges)
+        if self.weight_windows is not None:
+            self.weight_windows = tuple(self.weight_windows)
+        if self.regions is not None:
+            self.regions = tuple(tuple(float(v) for v in r) for r in self.regions)
+            self.slab_thickness_cm = self.regions[-1][0]
+        self.slab_regions = SlabRegions.from_config(self)
 
 
 def setup_simulation():
@@ -66,10 +171,32 @@ def update_user_input(initial_data, user_input):
     return replace(initial_data, **user_input)
 
 
+def configure(**options):
+    """
+    Function to set up the simulation from the defaults and any user input.
+
+    Parameters:
+    - options: Values of Config fields, by name. Those that are None keep
+               their defaults; a name that is not a Config field raises
+               TypeError.
+
+    Returns:
+    - Config: The configuration of the simulation.
+    """
+
+    user_input = {k: v for k, v in options.items() if v is not None}
+    return update_user_input(setup_simulation(), user_input)
+
+
 def initialise_tallies():
     """
     Function to initialise tallies for the Monte Carlo simulation.
 
+    Besides the event counters, `track_length` is the distance flown inside
+    the slab, and `collision_fission` and `track_fission` are the collision
+    and track-length estimates of the number of fissions: the sum of
+    fission_xs / total_xs over collisions, and of fission_xs along the tracks.
+
     Returns:
     - dict: A dictionary containing initialised tally variables.
     """
@@ -82,6 +209,28 @@ def initialise_tallies():
         "history": 0,
         "capture": 0,
         "secondary": 0,
+        "track_length": 0.0,
+        "collision_fission": 0.0,
+        "track_fission": 0.0,
     }
 
     return tally_data
+
+
+def accumulate_tallies(tallies, other):
+    """
+    Function to add one set of tallies into another, e.g. to merge the tallies
+    of separately simulated chunks of a generation.
+
+    Parameters:
+    - tallies (dict): Tallies to add to, updated in place.
+    - other (dict): Tallies to add.
+
+    Returns:
+    - dict: The updated tallies.
+    """
+
+    for key, value in other.items():
+        tallies[key] += value
+
+    return tallies
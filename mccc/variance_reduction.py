@@ -0,0 +1,577 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+
+from mccc.bank import FissionBank
+from mccc.geometry import delta_track_to_collision
+from mccc.geometry import delta_track_to_collision_batch
+from mccc.geometry import track_to_collision
+from mccc.geometry import track_to_collision_batch
+from mccc.rng import COLLISION_STREAM
+from mccc.sampling import FISSION
+from mccc.sampling import interaction_codes
+from mccc.sampling import INTERACTION_TYPES
+from mccc.sampling import sample_direction_cosine
+from mccc.sampling import sample_interaction_type
+from mccc.sampling import sample_optical_depth
+from mccc.sampling import SCATTER
+
+# Weight given to neutrons which survive roulette at the weight cutoff, as a
+# multiple of the cutoff
+CUTOFF_SURVIVAL_FACTOR = 2.0
+
+# Weight cutoff used with implicit capture when none is given; without one,
+# neutrons would only ever end by leaking
+DEFAULT_WEIGHT_CUTOFF = 0.25
+
+# Most copies a neutron is split into at once (split stream numbering allows
+# up to 127)
+MAX_SPLIT = 16
+
+
+def is_non_analog(cfg):
+    """
+    Function to tell whether a configuration asks for non-analog transport,
+    with particle weights.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+
+    Returns:
+    - bool: True if implicit capture, a weight cutoff or weight windows are used.
+    """
+
+    return (
+        cfg.implicit_capture
+        or cfg.weight_cutoff is not None
+        or cfg.weight_windows is not None
+    )
+
+
+def weight_bounds(cfg, positions):
+    """
+    Function to get the bounds of the weight game at each position.
+
+    With weight windows, the window holding each position gives the lower
+    bound L, the upper bound `weight_window_ratio * L`, and the survival
+    weight half way between them. Otherwise, with a weight cutoff, there is no
+    upper bound and survivors of roulette get `CUTOFF_SURVIVAL_FACTOR` times
+    the cutoff. Weight windows take the place of the cutoff if both are given.
+    Implicit capture without either uses DEFAULT_WEIGHT_CUTOFF.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - positions (np.ndarray): Neutron positions in the slab.
+
+    Returns:
+    - tuple | None: Lower bounds, upper bounds and survival weights, or None
+                    if there is no weight game.
+    """
+
+    if cfg.weight_windows is not None:
+        windows = np.asarray(cfg.weight_windows, dtype=float)
+        if np.any(windows <= 0):
+            raise ValueError(f"Weight windows must be positive: {cfg.weight_windows}")
+        if cfg.weight_window_ratio <= 1:
+            raise ValueError(
+                f"Weight window ratio must exceed one: {cfg.weight_window_ratio}"
+            )
+        bins = np.minimum(
+            (positions * windows.size / cfg.slab_thickness_cm).astype(np.int64),
+            windows.size - 1,
+        )
+        lower = windows[bins]
+        return (
+            lower,
+            cfg.weight_window_ratio * lower,
+            0.5 * (1.0 + cfg.weight_window_ratio) * lower,
+        )
+    weight_cutoff = cfg.weight_cutoff
+    if weight_cutoff is None and cfg.implicit_capture:
+        weight_cutoff = DEFAULT_WEIGHT_CUTOFF
+    if weight_cutoff is not None:
+        lower = np.full(positions.shape, weight_cutoff)
+        return lower, np.full(positions.shape, np.inf), CUTOFF_SURVIVAL_FACTOR * lower
+    return None
+
+
+def play_weight_game(
+    cfg,
+    streams,
+    positions,
+    region_indices,
+    histories,
+    stream_ids,
+    draws,
+    weights,
+    rand_nums,
+):
+    """
+    Function to play Russian roulette and splitting with a batch of neutrons.
+
+    Neutrons below the lower bound survive roulette with probability
+    weight / survival weight, and are given the survival weight; neutrons
+    above the upper bound are split into equal copies (at most `MAX_SPLIT`),
+    each with its own random number stream. Both games preserve the expected
+    weight. The history-based engine plays the game through this function
+    too, one neutron at a time, so both engines play it identically.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - positions (np.ndarray): Neutron positions.
+    - region_indices (np.ndarray): Region of each neutron.
+    - histories (np.ndarray): History index of each neutron.
+    - stream_ids (np.ndarray): Random number sub-stream of each neutron.
+    - draws (np.ndarray): Next block number of each neutron's stream.
+    - weights (np.ndarray): Neutron weights.
+    - rand_nums (np.ndarray): Uniform random number in (0, 1) for each neutron.
+
+    Returns:
+    - tuple: Positions, regions, histories, sub-streams, next block numbers
+             and weights of the neutrons after the game; copies are added at the end,
+             starting at block 0 of their new streams.
+    """
+
+    bounds = weight_bounds(cfg, positions)
+    if bounds is None:
+        return positions, region_indices, histories, stream_ids, draws, weights
+    lower, upper, survival = bounds
+
+    # Russian roulette
+    low = weights < lower
+    kept = ~low | (rand_nums < weights / survival)
+    weights = np.where(low, survival, weights)
+
+    # Splitting
+    copies = np.where(
+        weights > upper, np.minimum(np.ceil(weights / upper), MAX_SPLIT), 1
+    ).astype(np.int64)
+    weights = weights / copies
+
+    positions = positions[kept]
+    region_indices = region_indices[kept]
+    histories = histories[kept]
+    stream_ids = stream_ids[kept]
+    draws = draws[kept]
+    weights = weights[kept]
+    extra = copies[kept] - 1
+
+    parents = np.repeat(np.arange(positions.size), extra)
+    if parents.size == 0:
+        return positions, region_indices, histories, stream_ids, draws, weights
+    copy_numbers = (
+        np.arange(parents.size) - np.repeat(np.cumsum(extra) - extra, extra) + 1
+    )
+    new_streams = streams.split_streams(
+        histories[parents], draws[parents], stream_ids[parents], copy_numbers
+    )
+    return (
+        np.concatenate([positions, positions[parents]]),
+        np.concatenate([region_indices, region_indices[parents]]),
+        np.concatenate([histories, histories[parents]]),
+        np.concatenate([stream_ids, new_streams]),
+        np.concatenate([draws, np.zeros(parents.size, dtype=draws.dtype)]),
+        np.concatenate([weights, weights[parents]]),
+    )
+
+
+def bank_fission_sites(next_bank, histories, stream_ids, draws, positions, counts):
+    """
+    Function to add fission sites to a bank in a fixed order.
+
+    A history can now bank sites at many collisions, of many particles, so
+    the sites are sorted by history, sub-stream and block number; the bank is
+    then the same whatever order the collisions were simulated in.
+
+    Parameters:
+    - next_bank (FissionBank): Bank to add the sites to.
+    - histories (np.ndarray): History index of each collision.
+    - stream_ids (np.ndarray): Sub-stream of each collision.
+    - draws (np.ndarray): Block number of each collision.
+    - positions (np.ndarray): Position of each collision.
+    - counts (np.ndarray): Number of sites banked at each collision.
+    """
+
+    order = np.lexsort((draws, stream_ids, histories))
+    next_bank.append(np.repeat(positions[order], counts[order]))
+
+
+def simulate_weighted_history(cfg, tallies, current_position, streams, history, mesh):
+    """
+    Function to simulate a single weighted neutron history, including all the
+    particles split off from it.
+
+    At each collision, with implicit capture, fission sites are banked for the
+    expected fission weight and the neutron always scatters, keeping the
+    scattered fraction of its weight; otherwise the interaction is sampled as
+    in the analog game, and fission banks `floor(weight * nu + xi)` sites.
+    The weight game is then played at the collision site. Fission sites have
+    unit weight, and tallies score particle weights.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - tallies (dict): Tallies for this generation, updated in place.
+    - current_position (float): Starting position of the neutron.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - history (int): Index of this history within the generation.
+    - mesh (MeshScores | None): Mesh scores to add the tracks and collisions to.
+
+    Returns:
+    - tuple: Updated tallies and the list of (history, sub-stream, block,
+             position, number of sites) of each collision that banked sites.
+    """
+
+    tallies["history"] += 1
+    regions = cfg.slab_regions
+    sites = []
+
+    # Particles waiting to be tracked: position, region, sub-stream and weight
+    stack = [
+        (current_position, int(regions.locate(current_position)), COLLISION_STREAM, 1.0)
+    ]
+    while stack:
+        position, region, stream, weight = stack.pop()
+        for draw in itertools.count():
+            rand_nums = streams.uniform_block(history, draw, stream)
+
+            # Free flight to next reaction/collision
+            direction_cosine = sample_direction_cosine(rand_nums[0])
+            if cfg.tracking == "delta":
+                (
+                    position,
+                    region,
+                    track_length,
+                    fission_track,
+                ) = delta_track_to_collision(
+                    regions,
+                    position,
+                    direction_cosine,
+                    sample_optical_depth(rand_nums[1]),
+                    cfg.left_boundary_condition,
+                    streams,
+                    history,
+                    stream,
+                    draw,
+                    weight,
+                    mesh,
+                )
+            else:
+                position, region, track_length, fission_track = track_to_collision(
+                    regions,
+                    region,
+                    position,
+                    direction_cosine,
+                    sample_optical_depth(rand_nums[1]),
+                    cfg.left_boundary_condition,
+                    weight,
+                    mesh,
+                )
+            tallies["track_length"] += weight * track_length
+            tallies["track_fission"] += weight * fission_track
+
+            # Leakage
+            if position < 0:
+                tallies["leakage"] += weight
+                break
+
+            # Collisions
+            scatter_prob = regions.scatter_prob[region]
+            fission_prob = regions.fission_prob[region]
+            tallies["collision"] += weight
+            tallies["collision_fission"] += weight * fission_prob
+            if cfg.implicit_capture:
+                fission_weight = weight * fission_prob
+                tallies["fission"] += fission_weight
+                tallies["capture"] += weight * (1 - scatter_prob - fission_prob)
+                num_sites = int(np.floor(fission_weight * cfg.nu + rand_nums[3]))
+                if mesh is not None:
+                    mesh.score_implicit_collisions(
+                        np.array([position]),
+                        np.array([weight]),
+                        regions.total_xs[region],
+                        fission_prob,
+                        1 - scatter_prob,
+                    )
+                weight = weight * scatter_prob
+                tallies["scatter"] += weight
+                survived = True
+                rand_num = rand_nums[2]
+            else:
+                interaction_type = sample_interaction_type(
+                    scatter_prob, fission_prob, rand_nums[2]
+                )
+                tallies[interaction_type] += weight
+                if mesh is not None:
+                    mesh.score_collisions(
+                        np.array([position]),
+                        np.array([INTERACTION_TYPES.index(interaction_type)]),
+                        regions.total_xs[region],
+                        np.array([weight]),
+                    )
+                num_sites = 0
+                if interaction_type == "fission":
+                    num_sites = int(np.floor(weight * cfg.nu + rand_nums[3]))
+                survived = interaction_type == "scatter"
+                if survived:
+                    # Given a scatter, the interaction number rescaled to
+                    # (0, 1) is a fresh uniform number for the roulette
+                    rand_num = rand_nums[2] / scatter_prob
+
+            if num_sites > 0:
+                sites.append((history, stream, draw, position, num_sites))
+            tallies["secondary"] += num_sites
+            if not survived:
+                break
+            tallies["secondary"] += weight
+
+            # Russian roulette and splitting at the collision site
+            positions, _, _, stream_ids, _, weights = play_weight_game(
+                cfg,
+                streams,
+                np.array([position]),
+                np.array([region]),
+                np.array([history], dtype=np.uint64),
+                np.array([stream], dtype=np.uint64),
+                np.array([draw + 1], dtype=np.uint64),
+                np.array([weight]),
+                np.array([rand_num]),
+            )
+            if positions.size == 0:
+                break
+            weight = float(weights[0])
+            for i in range(1, positions.size):
+                stack.append(
+                    (float(positions[i]), region, int(stream_ids[i]), float(weights[i]))
+                )
+
+    return tallies, sites
+
+
+def simulate_generation_history_weighted(
+    cfg, tallies, start_positions, streams, next_bank=None, first_history=0, mesh=None
+):
+    """
+    Function to simulate one generation of weighted neutrons history-by-history.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - tallies (dict): Tallies for this generation, updated in place.
+    - start_positions (sequence): Starting positions of this generation's neutrons.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - next_bank (FissionBank | None): Bank to add the fission sites to; a new bank
+                                      is created if None.
+    - first_history (int): Index within the generation of the first history.
+    - mesh (MeshScores | None): Mesh scores to add the tracks and collisions to.
+
+    Returns:
+    - tuple: Updated tallies and the bank of next-generation start positions.
+    """
+
+    if next_bank is None:
+        next_bank = FissionBank(precision=cfg.bank_precision)
+
+    sites = []
+    for history, current_position in enumerate(start_positions, first_history):
+        tallies, history_sites = simulate_weighted_history(
+            cfg, tallies, float(current_position), streams, history, mesh
+        )
+        sites.extend(history_sites)
+
+    if sites:
+        histories, stream_ids, draws, positions, counts = (
+            np.array(values) for values in zip(*sites)
+        )
+        bank_fission_sites(next_bank, histories, stream_ids, draws, positions, counts)
+    return tallies, next_bank
+
+
+def simulate_generation_event_weighted(
+    cfg, tallies, start_positions, streams, next_bank=None, first_history=0, mesh=None
+):
+    """
+    Function to simulate one generation of weighted neutrons with the
+    event-based engine.
+
+    As `simulate_weighted_history`, but with all live neutrons (including
+    split copies) moved together as NumPy arrays. Neutrons are no longer all
+    on the same block of their streams, so each carries its own block number
+    and sub-stream. The fission bank is identical to that of the
+    history-based engine; float tallies agree to rounding.
+
+    Parameters:
+    - cfg (Config): Simulation configuration.
+    - tallies (dict): Tallies for this generation, updated in place.
+    - start_positions (sequence): Starting positions of this generation's neutrons.
+    - streams (ParticleStreams): Random number streams of the generation.
+    - next_bank (FissionBank | None): Bank to add the fission sites to; a new bank
+                                      is created if None.
+    - first_history (int): Index within the generation of the first history.
+    - mesh (MeshScores | None): Mesh scores to add the tracks and collisions to.
+
+    Returns:
+    - tuple: Updated tallies and the bank of next-generation start positions.
+    """
+
+    if next_bank is None:
+        next_bank = FissionBank(precision=cfg.bank_precision)
+
+    positions = np.asarray(start_positions, dtype=float)
+    num_histories = positions.size
+    tallies["history"] += num_histories
+    regions = cfg.slab_regions
+    region_indices = regions.locate(positions)
+
+    histories = np.arange(num_histories, dtype=np.uint64) + np.uint64(first_history)
+    stream_ids = np.full(num_histories, COLLISION_STREAM, dtype=np.uint64)
+    draws = np.zeros(num_histories, dtype=np.uint64)
+    weights = np.ones(num_histories)
+    sites = []
+
+    while positions.size > 0:
+        rand_nums = streams.uniforms(histories, draws, stream_ids)
+
+        # Free flight to next reaction/collision
+        direction_cosines = sample_direction_cosine(rand_nums[0])
+        if cfg.tracking == "delta":
+            (
+                positions,
+                region_indices,
+                track_lengths,
+                fission_tracks,
+            ) = delta_track_to_collision_batch(
+                regions,
+                positions,
+                direction_cosines,
+                sample_optical_depth(rand_nums[1]),
+                cfg.left_boundary_condition,
+                streams,
+                histories,
+                stream_ids,
+                draws,
+                weights,
+                mesh,
+            )
+        else:
+            (
+                positions,
+                region_indices,
+                track_lengths,
+                fission_tracks,
+            ) = track_to_collision_batch(
+                regions,
+                region_indices,
+                positions,
+                direction_cosines,
+                sample_optical_depth(rand_nums[1]),
+                cfg.left_boundary_condition,
+                weights,
+                mesh,
+            )
+        tallies["track_length"] += float(np.sum(weights * track_lengths))
+        tallies["track_fission"] += float(np.sum(weights * fission_tracks))
+
+        # Leakage
+        inside = positions >= 0
+        tallies["leakage"] += float(weights[~inside].sum())
+        positions = positions[inside]
+        region_indices = region_indices[inside]
+        histories = histories[inside]
+        stream_ids = stream_ids[inside]
+        draws = draws[inside]
+        weights = weights[inside]
+        rand_nums = rand_nums[:, inside]
+
+        # Collisions
+        scatter_probs = regions.scatter_prob[region_indices]
+        fission_probs = regions.fission_prob[region_indices]
+        tallies["collision"] += float(weights.sum())
+        tallies["collision_fission"] += float(np.sum(weights * fission_probs))
+        if cfg.implicit_capture:
+            fission_weights = weights * fission_probs
+            tallies["fission"] += float(fission_weights.sum())
+            tallies["capture"] += float(
+                np.sum(weights * (1 - scatter_probs - fission_probs))
+            )
+            num_sites = np.floor(fission_weights * cfg.nu + rand_nums[3]).astype(
+                np.int64
+            )
+            if mesh is not None:
+                mesh.score_implicit_collisions(
+                    positions,
+                    weights,
+                    regions.total_xs[region_indices],
+                    fission_probs,
+                    1 - scatter_probs,
+                )
+            weights = weights * scatter_probs
+            tallies["scatter"] += float(weights.sum())
+            survived = np.ones(positions.size, dtype=bool)
+            roulette_nums = rand_nums[2]
+        else:
+            codes = interaction_codes(scatter_probs, fission_probs, rand_nums[2])
+            for code, interaction_type in enumerate(INTERACTION_TYPES):
+                tallies[interaction_type] += float(weights[codes == code].sum())
+            if mesh is not None:
+                mesh.score_collisions(
+                    positions, codes, regions.total_xs[region_indices], weights
+                )
+            num_sites = np.where(
+                codes == FISSION, np.floor(weights * cfg.nu + rand_nums[3]), 0
+            ).astype(np.int64)
+            survived = codes == SCATTER
+            # Given a scatter, the interaction number rescaled to (0, 1) is a
+            # fresh uniform number for the roulette (only scatters, which need
+            # a non-zero scatter probability, play it)
+            roulette_nums = np.divide(
+                rand_nums[2],
+                scatter_probs,
+                out=np.zeros_like(scatter_probs),
+                where=survived,
+            )
+
+        banked = num_sites > 0
+        sites.append(
+            (
+                histories[banked],
+                stream_ids[banked],
+                draws[banked],
+                positions[banked],
+                num_sites[banked],
+            )
+        )
+        tallies["secondary"] += int(num_sites.sum()) + float(weights[survived].sum())
+        draws = draws + np.uint64(1)
+
+        # Russian roulette and splitting at the collision sites
+        (
+            positions,
+            region_indices,
+            histories,
+            stream_ids,
+            draws,
+            weights,
+        ) = play_weight_game(
+            cfg,
+            streams,
+            positions[survived],
+            region_indices[survived],
+            histories[survived],
+            stream_ids[survived],
+            draws[survived],
+            weights[survived],
+            roulette_nums[survived],
+        )
+
+    if sites:
+        bank_fission_sites(
+            next_bank, *(np.concatenate(values) for values in zip(*sites))
+        )
+    return tallies, next_bank
+
+
+WEIGHTED_ENGINES = {
+    "history": simulate_generation_history_weighted,
+    "event": simulate_generation_event_weighted,
+}
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from mccc.bank import FissionBank
+
+
+def test_append_and_grow():
+    """
+    Test that appending beyond the preallocated capacity grows the bank.
+    """
+    bank = FissionBank(2, generation=3)
+    assert len(bank) == 0
+    assert bank.capacity == 2
+
+    bank.append([0.5, 1.0, 1.5])
+    bank.append(np.array([2.0]), weights=0.5)
+    bank.append([])
+
+    assert len(bank) == 4
+    assert bank.capacity >= 4
+    np.testing.assert_array_equal(bank.positions, [0.5, 1.0, 1.5, 2.0])
+    np.testing.assert_array_equal(bank.weights, [1.0, 1.0, 1.0, 0.5])
+    assert bank.generation == 3
+    assert bank.total_weight() == 3.5
+
+
+def test_from_positions_and_extend():
+    """
+    Test building a bank from positions and extending it with raw sites.
+    """
+    bank = FissionBank.from_positions([1.0, 2.0], generation=-1)
+    other = FissionBank.from_positions([3.0], generation=0)
+
+    bank.extend(other.sites)
+    np.testing.assert_array_equal(bank.positions, [1.0, 2.0, 3.0])
+    assert bank.generation == -1
+
+    bank.clear()
+    assert len(bank) == 0
+    assert bank.capacity >= 3
+
+
+def test_compact_precision():
+    """
+    Test that the float64 bank uses 16 bytes per site and the float32 bank 8.
+    """
+    positions = np.linspace(0.0, 1.0, 1000)
+    full = FissionBank.from_positions(positions)
+    compact = FissionBank.from_positions(positions, precision="float32")
+
+    assert full.nbytes == 16 * positions.size
+    assert compact.positions.dtype == np.float32
+    assert compact.nbytes * 2 == full.nbytes
+    np.testing.assert_allclose(compact.positions, positions, rtol=1e-7)
+
+
+def test_unknown_precision():
+    """
+    Test that an unknown precision is rejected.
+    """
+    with pytest.raises(ValueError, match="Unknown bank precision: float16"):
+        FissionBank(precision="float16")
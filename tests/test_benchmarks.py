@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+BENCHMARKS_DIR = Path(__file__).parents[1] / "benchmarks"
+
+
+@pytest.fixture
+def suite(monkeypatch):
+    """
+    The benchmark suite module, which imports its neighbours by name.
+    """
+    monkeypatch.syspath_prepend(str(BENCHMARKS_DIR))
+    return importlib.import_module("suite")
+
+
+def test_compare(suite):
+    """
+    Test the status of each benchmark against the threshold, including
+    benchmarks missing from the results or from the baseline.
+    """
+    results = {
+        "same": {"seconds": 1.05},
+        "slower": {"seconds": 1.2},
+        "faster": {"seconds": 0.8},
+        "new": {"seconds": 1.0},
+    }
+    baseline = {
+        "same": {"seconds": 1.0},
+        "slower": {"seconds": 1.0},
+        "faster": {"seconds": 1.0},
+        "missing": {"seconds": 1.0},
+    }
+    rows = suite.compare(results, baseline, 0.1)
+    assert [(row[0], row[4]) for row in rows] == [
+        ("same", "ok"),
+        ("slower", "slower"),
+        ("faster", "faster"),
+        ("new", "new"),
+        ("missing", "missing"),
+    ]
+    assert rows[1][1:4] == (1.0, 1.2, pytest.approx(1.2))
+    assert rows[3][1] is None and rows[4][2] is None
+
+    # The same timings pass with a looser threshold
+    assert {row[4] for row in suite.compare(results, baseline, 0.5)} == {
+        "ok",
+        "new",
+        "missing",
+    }
+
+
+def test_exit_status(suite, tmp_path):
+    """
+    Test that the suite fails only when a benchmark is slower than the
+    threshold allows, and that benchmarks or metadata missing from the
+    baseline do not fail it.
+    """
+    runner = CliRunner()
+    options = [
+        "-k",
+        "sample_direction_cosine_batch",
+        "--repeats",
+        "1",
+        "--min-time",
+        "0",
+    ]
+    output = tmp_path / "results.json"
+    result = runner.invoke(suite.main, options + ["-o", str(output)])
+    assert result.exit_code == 0, result.output
+    saved = json.loads(output.read_text())
+    assert list(saved["benchmarks"]) == ["sample_direction_cosine_batch"]
+    assert saved["metadata"]["numpy"]
+
+    def compare_with(benchmarks, threshold=0.1, **contents):
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps({"benchmarks": benchmarks, **contents}))
+        return runner.invoke(
+            suite.main,
+            options + ["--baseline", str(baseline), "--threshold", str(threshold)],
+        )
+
+    seconds = saved["benchmarks"]["sample_direction_cosine_batch"]["seconds"]
+    result = compare_with(
+        {
+            "sample_direction_cosine_batch": {"seconds": 10 * seconds},
+            "sample_direction_cosine_batch[gone]": {"seconds": seconds},
+        },
+        metadata=saved["metadata"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "faster" in result.output and "missing" in result.output
+    assert "Warning" not in result.output
+
+    result = compare_with({"sample_direction_cosine_batch": {"seconds": seconds / 10}})
+    assert result.exit_code == 1
+    assert "Warning: baseline cpu None differs" in result.output
+    assert "1 benchmark(s) more than 10% slower than the baseline" in result.output
+
+    # A larger threshold lets the same slowdown pass
+    result = compare_with(
+        {"sample_direction_cosine_batch": {"seconds": seconds / 10}}, threshold=100
+    )
+    assert result.exit_code == 0, result.output
+
+
+def test_speedup(suite, monkeypatch, tmp_path):
+    """
+    Test that the speed-up of each full run over the original loop is saved,
+    and that the largest run falling below the minimum fails the suite.
+    """
+
+    def define_benchmarks(num_generations, particles_list, random_seed):
+        return [
+            (suite.REFERENCE_NAME, lambda: sum(range(1000)), 1, "source neutrons"),
+            ("run[10]", lambda: None, 1000, "source neutrons"),
+            ("run[20]", lambda: sum(range(1000)), 2, "source neutrons"),
+        ]
+
+    monkeypatch.setattr(suite, "define_benchmarks", define_benchmarks)
+    runner = CliRunner()
+    options = ["-p", "10", "-p", "20", "--repeats", "1", "--min-time", "0"]
+    output = tmp_path / "results.json"
+
+    result = runner.invoke(suite.main, options + ["--min-speedup", "0", "-o", output])
+    assert result.exit_code == 0, result.output
+    saved = json.loads(output.read_text())["benchmarks"]
+    assert saved["run[10]"]["speedup"] > 1000
+    assert saved["run[20]"]["speedup"] == pytest.approx(2, rel=0.5)
+    assert "speedup" not in saved[suite.REFERENCE_NAME]
+
+    # Only the largest run is held to the minimum
+    result = runner.invoke(suite.main, options + ["--min-speedup", "100"])
+    assert result.exit_code == 1
+    assert "run[20] is only" in result.output
+    assert "below 100x" in result.output
+
+
+def test_stored_baseline(suite):
+    """
+    Test that the stored baseline covers every benchmark of the default suite.
+    """
+    with open(BENCHMARKS_DIR / "baseline.json") as f:
+        baseline = json.load(f)
+    names = [name for name, *_ in suite.define_benchmarks(10, (10000, 100000), 12345)]
+    assert sorted(baseline["benchmarks"]) == sorted(names)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+
+import mccc.monte_carlo
+from mccc.cache import ResultCache
+from mccc.monte_carlo import schedule_replicas
+from mccc.monte_carlo import trial
+from mccc.results import RecordBuffer
+from mccc.setup import setup_simulation
+
+RESULTS = {
+    "k1": [1.0, 0.5],
+    "k2": [0.9, 0.8],
+    "k_collision": [1.1, 0.7],
+    "k_track_length": [1.2, 0.6],
+    "histories": 20,
+    "active_tallies": {"fission": 3},
+}
+
+
+def test_cache_key():
+    """
+    Test that the key depends on the configuration, seed, study and labels,
+    but not on how the run is executed or its results written.
+    """
+    cache = ResultCache("unused", "convergence")
+    cfg = replace(setup_simulation(), random_seed=1)
+    key = cache.key(cfg, {"replica": 0})
+    assert key == cache.key(
+        replace(cfg, workers=4, results_file="x.csv"), {"replica": 0}
+    )
+    assert key != cache.key(replace(cfg, random_seed=2), {"replica": 0})
+    assert key != cache.key(replace(cfg, num_particles=10), {"replica": 0})
+    assert key != cache.key(cfg, {"replica": 1})
+    assert key != ResultCache("unused", "generations").key(cfg, {"replica": 0})
+
+
+def test_cache_round_trip(tmp_path):
+    """
+    Test that cached results come back exactly, and unseeded runs are not
+    cached.
+    """
+    cache = ResultCache(tmp_path, "convergence")
+    cfg = replace(setup_simulation(), random_seed=1)
+    records = [{"generation": 0, "k1": 1.0}]
+    assert cache.get(cfg, {}) is None
+    cache.put(cfg, {}, RESULTS, records)
+    assert cache.get(cfg, {}) == (RESULTS, records)
+
+    unseeded = replace(cfg, random_seed=None)
+    cache.put(unseeded, {}, RESULTS, records)
+    assert cache.get(unseeded, {}) is None
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+
+def test_cache_eviction(tmp_path):
+    """
+    Test that the least recently used entries are evicted to keep the cache
+    within its size limit.
+    """
+    cfgs = [replace(setup_simulation(), random_seed=seed) for seed in range(4)]
+    cache = ResultCache(tmp_path, "convergence")
+    cache.put(cfgs[0], {}, RESULTS, [])
+    entry_size = next(tmp_path.glob("*.npz")).stat().st_size
+
+    cache.max_bytes = 3 * entry_size
+    cache.put(cfgs[1], {}, RESULTS, [])
+    cache.put(cfgs[2], {}, RESULTS, [])
+    # Using the oldest entry makes the second the least recently used
+    assert cache.get(cfgs[0], {}) is not None
+    cache.put(cfgs[3], {}, RESULTS, [])
+    assert [cache.get(cfg, {}) is not None for cfg in cfgs] == [
+        True,
+        False,
+        True,
+        True,
+    ]
+
+
+def test_trial_from_cache(tmp_path, monkeypatch, capsys):
+    """
+    Test that a cached trial gives the same results and records without
+    running, and that only missing replicas are run.
+    """
+    cache = ResultCache(tmp_path, "generations")
+    sink = RecordBuffer()
+    results = trial(2, 500, random_seed=12345, num_replicas=3, sink=sink, cache=cache)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("replica run instead of read from the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(mccc.monte_carlo, "simulate", fail)
+        cached_sink = RecordBuffer()
+        cached_results = trial(
+            2, 500, random_seed=12345, num_replicas=3, sink=cached_sink, cache=cache
+        )
+    for series, cached_series in zip(results, cached_results):
+        np.testing.assert_array_equal(series, cached_series)
+    assert cached_sink.records == sink.records
+
+    # Two more replicas in a pool: only those are run
+    cfg = replace(
+        setup_simulation(), num_generations=2, num_particles=500, random_seed=12345
+    )
+    replicas = schedule_replicas([(cfg, 5)], 1, verbose=True, cache=cache)[0]
+    for i, replica in enumerate(replicas[:3]):
+        assert replica["k1"] == [
+            record["k1"] for record in sink.records if record["replica"] == i
+        ]
+    assert "Jobs: 2 of 5 run in " in capsys.readouterr().out
+    assert len(list(tmp_path.glob("*.npz"))) == 5
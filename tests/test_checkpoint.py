@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+
+from mccc.bank import FissionBank
+from mccc.checkpoint import read_checkpoint
+from mccc.checkpoint import write_checkpoint
+from mccc.monte_carlo import restart
+from mccc.monte_carlo import run
+from mccc.setup import setup_simulation
+from mccc.setup import update_user_input
+
+
+def test_checkpoint_round_trip(tmp_path):
+    """
+    Test that a checkpoint restores the configuration, seed, bank and state.
+    """
+    cfg = update_user_input(
+        setup_simulation(), {"random_seed": 12345, "bank_precision": "float32"}
+    )
+    seed_sequence = np.random.SeedSequence(cfg.random_seed)
+    bank = FissionBank.from_positions([0.1, 0.5, 1.2], "float32", generation=3)
+    bank.weights[:] = [0.5, 1.0, 1.5]
+    state = {"generation": 4, "k1": [1.0, 0.9], "histories": np.int64(7)}
+
+    write_checkpoint(tmp_path, cfg, seed_sequence, bank, state)
+    # A later checkpoint replaces the earlier bank file
+    write_checkpoint(tmp_path, cfg, seed_sequence, bank, {**state, "generation": 5})
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "bank_000005.npy",
+        "state.json",
+    ]
+
+    cfg_read, seed_sequence_read, bank_read, state_read = read_checkpoint(tmp_path)
+    assert cfg_read == cfg
+    assert seed_sequence_read.entropy == seed_sequence.entropy
+    assert bank_read.precision == "float32"
+    assert bank_read.generation == 3
+    assert np.array_equal(bank_read.sites, bank.sites)
+    assert state_read == {"generation": 5, "k1": [1.0, 0.9], "histories": 7}
+
+
+def test_restart_reproduces_run(tmp_path):
+    """
+    Test that a run restarted from a checkpoint gives exactly the results,
+    and the results file, of an uninterrupted run.
+    """
+    settings = dict(
+        plot=False,
+        random_seed=12345,
+        population_control="comb",
+        auto_inactive=True,
+        bank_precision="float32",
+        mesh_bins=4,
+        cmfd_bins=4,
+    )
+    k1_ref, k2_ref = run(5, 2000, results_file=str(tmp_path / "ref.jsonl"), **settings)
+
+    # Stop after three generations, with the last checkpoint after two
+    checkpoint_dir = tmp_path / "checkpoint"
+    results_file = tmp_path / "results.jsonl"
+    run(
+        3,
+        2000,
+        results_file=str(results_file),
+        checkpoint_dir=str(checkpoint_dir),
+        checkpoint_interval=2,
+        **settings,
+    )
+    state = json.loads((checkpoint_dir / "state.json").read_text())
+    assert state["state"]["generation"] == 2
+
+    k1, k2 = restart(checkpoint_dir, num_generations=5)
+    assert len(k1) == 5
+    assert k1 == k1_ref
+    assert k2 == k2_ref
+    records = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert [record["generation"] for record in records] == [0, 1, 2, 3, 4]
+    assert [record["k1"] for record in records] == k1_ref
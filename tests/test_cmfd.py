@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mccc.bank import FissionBank
+from mccc.cmfd import CMFDTally
+from mccc.cmfd import reweight_bank
+from mccc.cmfd import solve_cmfd
+from mccc.mesh import cmfd_edges
+from mccc.mesh import CMFDScores
+from mccc.monte_carlo import simulate
+from mccc.monte_carlo import simulate_generation_event
+from mccc.rng import ParticleStreams
+from mccc.setup import initialise_tallies
+from mccc.setup import setup_simulation
+
+# A thick transmissive slab, whose fundamental source is far from uniform
+THICK_SLAB = dict(
+    regions=((20.0, 0.3264, 0.225216, 0.0816),),
+    left_boundary_condition="transmissive",
+)
+
+
+def test_cmfd_edges():
+    """
+    Test the uniform coarse mesh.
+    """
+    cfg = replace(setup_simulation(), slab_thickness_cm=2.0)
+    assert cmfd_edges(cfg) is None
+    np.testing.assert_array_equal(
+        cmfd_edges(replace(cfg, cmfd_bins=2)), [0.0, 1.0, 2.0]
+    )
+
+
+@pytest.mark.parametrize("tracking", ["surface", "delta"])
+@pytest.mark.parametrize("bc", ["transmissive", "reflective"])
+def test_neutron_balance(tracking, bc):
+    """
+    Test that the currents balance the source and absorptions in each cell,
+    with a region boundary inside a cell.
+    """
+    cfg = replace(
+        setup_simulation(),
+        regions=((7.0, 0.3264, 0.225216, 0.0816), (20.0, 0.6, 0.5, 0.05)),
+        left_boundary_condition=bc,
+        tracking=tracking,
+    )
+    edges = np.linspace(0.0, 20.0, 5)
+    positions = np.random.default_rng(1).uniform(0.0, 20.0, 2000)
+    scores = CMFDScores(edges)
+    tallies, _ = simulate_generation_event(
+        cfg, initialise_tallies(), positions, ParticleStreams((1, 2)), mesh=scores
+    )
+    source = np.histogram(positions, bins=edges)[0]
+    np.testing.assert_allclose(
+        np.diff(scores.currents) + scores.absorptions, source, atol=1e-9
+    )
+    leakage = scores.currents[-1] - scores.currents[0]
+    assert leakage == pytest.approx(tallies["leakage"])
+    if bc == "reflective":
+        assert scores.currents[0] == 0.0
+
+
+def test_solve_cmfd_infinite_medium():
+    """
+    Test that CMFD reproduces k_inf and a flat source without leakage.
+    """
+    edges = np.linspace(0.0, 3.0, 4)
+    track_length = np.array([2.0, 2.0, 2.0])
+    k, source = solve_cmfd(
+        edges,
+        track_length,
+        collisions=track_length,
+        absorptions=0.5 * track_length,
+        nu_fissions=0.6 * track_length,
+        currents=np.zeros(4),
+        left_boundary_condition="reflective",
+    )
+    assert k == pytest.approx(1.2)
+    np.testing.assert_allclose(source, [1 / 3, 1 / 3, 1 / 3])
+
+    assert (
+        solve_cmfd(
+            edges,
+            np.array([2.0, 0.0, 2.0]),
+            track_length,
+            track_length,
+            track_length,
+            np.zeros(4),
+            "reflective",
+        )
+        is None
+    )
+
+
+def test_reweight_bank():
+    """
+    Test that reweighting moves weight between cells, but keeps the total.
+    """
+    bank = FissionBank.from_positions([0.5, 0.5, 1.5, 1.5, 1.5, 1.5])
+    reweight_bank(bank, np.array([0.0, 1.0, 2.0, 3.0]), np.array([0.5, 0.5, 0.0]))
+    np.testing.assert_allclose(bank.weights, [1.5, 1.5, 0.75, 0.75, 0.75, 0.75])
+    assert bank.total_weight() == pytest.approx(6.0)
+
+
+def test_cmfd_tally_round_trip():
+    """
+    Test that the accumulated state restores the same CMFD solution.
+    """
+    cfg = replace(setup_simulation(), cmfd_bins=4, **THICK_SLAB)
+    edges = cmfd_edges(cfg)
+    scores = CMFDScores(edges)
+    positions = np.random.default_rng(1).uniform(0.0, 20.0, 2000)
+    simulate_generation_event(
+        cfg, initialise_tallies(), positions, ParticleStreams((1, 2)), mesh=scores
+    )
+    tally = CMFDTally(edges)
+    tally.add_batch(scores, source_weight=2000.0)
+    restored = CMFDTally(edges)
+    restored.update_from_dict(tally.to_dict())
+    assert restored.solve(cfg)[0] == tally.solve(cfg)[0]
+
+
+def test_cmfd_accelerates_source_convergence():
+    """
+    Test that CMFD agrees with the Monte Carlo k_eff, and moves the source
+    from uniform to near its converged shape within a generation.
+    """
+    cfg = replace(
+        setup_simulation(),
+        num_generations=8,
+        num_particles=10000,
+        random_seed=12345,
+        population_control="comb",
+        num_inactive=8,
+        **THICK_SLAB,
+    )
+    reference = simulate(cfg)
+    accelerated = simulate(replace(cfg, cmfd_bins=10))
+
+    converged_entropy = np.mean(reference["entropy"][-3:])
+    assert abs(accelerated["entropy"][1] - converged_entropy) < 0.5 * abs(
+        reference["entropy"][1] - converged_entropy
+    )
+    assert len(accelerated["k_cmfd"]) == cfg.num_generations
+    assert accelerated["k_cmfd"][-1] == pytest.approx(
+        np.mean(reference["k1"][-3:]), rel=0.02
+    )
+    assert reference["k_cmfd"] == []
+
+    with pytest.raises(ValueError, match="CMFD needs population control"):
+        simulate(replace(cfg, cmfd_bins=10, population_control="none"))
+    with pytest.raises(ValueError, match="CMFD needs inactive generations"):
+        simulate(replace(cfg, cmfd_bins=10, num_inactive=0))
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import math
+
+import numpy as np
+import pytest
+
+from mccc.bank import FissionBank
+from mccc.convergence import active_statistics
+from mccc.convergence import combined_estimate
+from mccc.convergence import entropy_converged
+from mccc.convergence import figure_of_merit
+from mccc.convergence import shannon_entropy
+from mccc.convergence import SourceHistogram
+from mccc.monte_carlo import MIN_ACTIVE_SAMPLES
+from mccc.monte_carlo import run
+from mccc.monte_carlo import trial
+
+
+def test_shannon_entropy():
+    """
+    Test the entropy of uniform, concentrated and empty sources.
+    """
+    uniform = FissionBank.from_positions((np.arange(800) + 0.5) / 100)
+    assert shannon_entropy(uniform, 8.0, 8) == pytest.approx(3.0)
+
+    concentrated = FissionBank.from_positions(np.full(100, 4.5))
+    assert shannon_entropy(concentrated, 8.0, 8) == 0.0
+
+    # Weights count, not just sites
+    halves = FissionBank.from_positions([1.0, 5.0, 5.0])
+    halves.weights[:] = [2.0, 1.0, 1.0]
+    assert shannon_entropy(halves, 8.0, 2) == pytest.approx(1.0)
+
+    assert shannon_entropy(FissionBank(), 8.0, 8) == 0.0
+
+
+def test_source_histogram():
+    """
+    Test the binned source of each generation, with sites on the slab edges.
+    """
+    histogram = SourceHistogram(8.0, 4)
+    np.testing.assert_array_equal(histogram.edges, [0.0, 2.0, 4.0, 6.0, 8.0])
+
+    bank = FissionBank.from_positions([0.0, 1.0, 5.0, 8.0])
+    bank.weights[:] = [1.0, 1.0, 1.0, 2.0]
+    np.testing.assert_array_equal(histogram.add(bank), [0.4, 0.0, 0.2, 0.4])
+    np.testing.assert_array_equal(histogram.add(FissionBank()), np.zeros(4))
+    assert len(histogram.fractions) == 2
+
+    restored = SourceHistogram(8.0, 4)
+    restored.update_from_dict(histogram.to_dict())
+    np.testing.assert_array_equal(restored.fractions[0], histogram.fractions[0])
+
+
+def test_entropy_converged():
+    """
+    Test that convergence needs a full window of stable entropies.
+    """
+    assert not entropy_converged([4.0, 4.0], 3, 0.01)
+    assert not entropy_converged([4.3, 4.2, 4.1], 3, 0.01)
+    assert entropy_converged([4.3, 4.105, 4.1, 4.108], 3, 0.01)
+
+
+def test_active_statistics():
+    """
+    Test the mean and standard error over active generations.
+    """
+    mean, std_err = active_statistics([1.0, 2.0, 3.0])
+    assert mean == 2.0
+    assert std_err == pytest.approx(1.0 / math.sqrt(3))
+
+    mean, std_err = active_statistics([1.5])
+    assert mean == 1.5
+    assert math.isnan(std_err)
+
+    assert all(math.isnan(value) for value in active_statistics([]))
+
+
+def test_run_with_inactive_generations(capsys):
+    """
+    Test that inactive generations are reported but do not change the
+    per-generation estimates.
+    """
+    k1_ref, k2_ref = run(4, 2000, plot=False, random_seed=12345)
+    k1, k2 = run(4, 2000, plot=False, random_seed=12345, num_inactive=2, verbose=True)
+    assert k1 == k1_ref
+    assert k2 == k2_ref
+
+    output = capsys.readouterr().out
+    assert "Generation 1: " in output
+    assert "Active generations: 2 to 3" in output
+
+
+def test_run_with_auto_inactive(capsys):
+    """
+    Test that automatic mode waits for a full window before going active.
+    """
+    run(4, 2000, plot=False, random_seed=12345, auto_inactive=True, verbose=True)
+    output = capsys.readouterr().out
+    # Generations 0 and 1 cannot fill the default window of three entropies
+    assert "Generation 1: " in output
+    assert ", active" not in output.split("Generation 2: ")[0]
+
+
+def test_combined_estimate():
+    """
+    Test the minimum-variance combination of estimators.
+    """
+    rng = np.random.default_rng(12345)
+    common = rng.normal(size=2000)
+    precise = 1.0 + 0.1 * rng.normal(size=2000)
+    noisy = 1.0 + rng.normal(size=2000)
+
+    # Independent estimators are weighted by their inverse variances
+    mean, std_err, weights = combined_estimate([precise, noisy])
+    np.testing.assert_allclose(weights, [100 / 101, 1 / 101], atol=0.01)
+    assert std_err < active_statistics(precise)[1]
+    assert mean == pytest.approx(weights @ [precise.mean(), noisy.mean()])
+
+    # Correlated noise is cancelled out
+    _, std_err, weights = combined_estimate([1.0 + common, 1.0 + 2 * common + noisy])
+    assert weights.sum() == pytest.approx(1.0)
+    assert weights[1] < 0
+
+    # Too few generations for the covariance, or for its error
+    mean, std_err, weights = combined_estimate([[1.0, 2.0], [3.0, 4.0]])
+    assert mean == 2.5
+    assert math.isnan(std_err)
+    assert list(weights) == [0.5, 0.5]
+    assert math.isnan(combined_estimate(rng.normal(size=(2, 4)))[1])
+
+
+def test_combined_estimate_small_samples():
+    """
+    Test that the standard error of the combined estimate from a few
+    generations of three correlated estimators matches the spread of the
+    estimate.
+    """
+    rng = np.random.default_rng(12345)
+    covariance = 1e-4 * np.array([[1.0, 0.9, 0.7], [0.9, 1.2, 0.8], [0.7, 0.8, 1.5]])
+    factor = np.linalg.cholesky(covariance)
+    estimates = [
+        combined_estimate(factor @ rng.normal(size=(3, 10)))[:2] for _ in range(2000)
+    ]
+    means, std_errs = np.array(estimates).T
+    assert np.sqrt(np.mean(std_errs**2)) / np.std(means) == pytest.approx(
+        1.0, abs=0.1
+    )
+
+
+def test_run_to_target_std(capsys):
+    """
+    Test that a run stops once the target standard error is reached, and
+    otherwise reproduces the full-length run.
+    """
+    settings = dict(plot=False, random_seed=12345, population_control="comb")
+    k1_ref, k2_ref = run(30, 500, num_inactive=2, **settings)
+    k1, k2 = run(30, 500, num_inactive=2, target_std=0.01, **settings)
+    # Not before the minimum number of active generations
+    assert len(k1) == 2 + MIN_ACTIVE_SAMPLES
+    assert k1 == k1_ref[: len(k1)]
+    assert k2 == k2_ref[: len(k2)]
+    assert f"Histories: {500 * len(k1)} in {len(k1)} generations" in (
+        capsys.readouterr().out
+    )
+
+
+def test_run_history_budget(capsys):
+    """
+    Test that a run stops once its history budget is spent.
+    """
+    k1, _ = run(
+        20,
+        2000,
+        plot=False,
+        random_seed=12345,
+        population_control="comb",
+        max_histories=5000,
+    )
+    assert len(k1) == 3
+    assert "Histories: 6000 in 3 generations" in capsys.readouterr().out
+
+
+def test_trial_to_target_std(capsys):
+    """
+    Test that a trial adds replicas until the target is met, within its budget.
+    """
+    trial(
+        2,
+        500,
+        random_seed=12345,
+        population_control="comb",
+        target_std=1e-6,
+        max_histories=4000,
+    )
+    # Four replicas of two generations of 500 histories spend the budget
+    assert "Trial: 4 replicas, 4000 histories" in capsys.readouterr().out
+
+    # The target is not checked before the minimum number of replicas
+    trial(1, 100, random_seed=12345, target_std=1.0)
+    assert f"Trial: {MIN_ACTIVE_SAMPLES} replicas" in capsys.readouterr().out
+
+
+def test_figure_of_merit():
+    assert figure_of_merit(1.0, 0.01, 2.0) == pytest.approx(5000.0)
+    assert figure_of_merit(2.0, 0.02, 2.0) == pytest.approx(5000.0)
+    assert np.isnan(figure_of_merit(1.0, float("nan"), 2.0))
+    assert figure_of_merit(1.0, 0.0, 2.0) == float("inf")
@@ -1,6 +1,19 @@
 # -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from mccc.geometry import delta_track_to_collision
+from mccc.geometry import delta_track_to_collision_batch
+from mccc.geometry import distance_to_leakage
+from mccc.geometry import distance_to_leakage_batch
 from mccc.geometry import handle_boundary_conditions
+from mccc.geometry import handle_boundary_conditions_batch
+from mccc.geometry import SlabRegions
+from mccc.geometry import track_to_collision
+from mccc.geometry import track_to_collision_batch
 from mccc.geometry import update_neutron_position
+from mccc.geometry import update_neutron_position_batch
+from mccc.rng import ParticleStreams
 
 
 def test_handle_reflective_boundary_conditions():
@@ -193,3 +206,230 @@ def test_update_neutron_position():
         scatter_distance,
     )
     assert new_position == -1
+
+
+def test_update_neutron_position_batch():
+    """
+    Test that the batched position update matches the scalar version.
+    """
+    slab_thickness_cm = 10.0
+    current_positions = np.array([8.0, 8.0, 8.0, 8.0, 8.0])
+    mu = np.array([1.0, 1.0, -1.0, -1.0, -1.0])
+    scatter_distances = np.array([1.0, 3.0, 1.0, 9.0, 20.0])
+
+    for left_boundary_condition in ("reflective", "transmissive"):
+        new_positions = update_neutron_position_batch(
+            current_positions,
+            slab_thickness_cm,
+            mu,
+            left_boundary_condition,
+            scatter_distances,
+        )
+        expected = [
+            update_neutron_position(
+                position,
+                slab_thickness_cm,
+                direction,
+                left_boundary_condition,
+                distance,
+            )
+            for position, direction, distance in zip(
+                current_positions, mu, scatter_distances
+            )
+        ]
+        np.testing.assert_array_equal(new_positions, expected)
+
+
+def test_handle_boundary_conditions_batch_unknown():
+    """
+    Test the batched boundary handling rejects unknown boundary conditions.
+    """
+    with pytest.raises(ValueError, match="Unknown boundary condition: unknown"):
+        handle_boundary_conditions_batch(np.zeros(2), 10.0, "unknown")
+
+
+def test_distance_to_leakage():
+    """
+    Test the distance to leakage for each direction and boundary condition.
+    """
+    assert distance_to_leakage(1.0, 4.0, 0.5, "reflective") == 6.0
+    assert distance_to_leakage(1.0, 4.0, -0.5, "reflective") == 10.0
+    assert distance_to_leakage(1.0, 4.0, -0.5, "transmissive") == 2.0
+    with pytest.raises(ValueError, match="Unknown boundary condition"):
+        distance_to_leakage(1.0, 4.0, -0.5, "unknown")
+
+    positions = np.array([1.0, 1.0, 3.0])
+    mu = np.array([0.5, -0.5, -1.0])
+    for boundary_condition in ("reflective", "transmissive"):
+        np.testing.assert_array_equal(
+            distance_to_leakage_batch(positions, 4.0, mu, boundary_condition),
+            [
+                distance_to_leakage(x, 4.0, m, boundary_condition)
+                for x, m in zip(positions, mu)
+            ],
+        )
+
+
+def test_slab_regions():
+    """
+    Test the region lookup and the validation of the regions.
+    """
+    regions = SlabRegions([0.0, 1.0, 3.0], [1.0, 2.0], [0.5, 1.0], [0.25, 0.5])
+    assert regions.num_regions == 2
+    assert regions.slab_thickness_cm == 3.0
+    np.testing.assert_array_equal(
+        regions.locate(np.array([0.0, 0.5, 1.0, 2.9, 3.0])), [0, 0, 1, 1, 1]
+    )
+    np.testing.assert_array_equal(regions.fission_prob, [0.25, 0.25])
+    np.testing.assert_array_equal(
+        regions.lookup(regions.total_xs, np.array([1, 0, 1])), [2.0, 1.0, 2.0]
+    )
+
+    with pytest.raises(ValueError, match="Region boundaries must increase"):
+        SlabRegions([0.0, 2.0, 1.0], [1.0, 1.0], [0.5, 0.5], [0.25, 0.25])
+    with pytest.raises(ValueError, match="one set of cross-sections per region"):
+        SlabRegions([0.0, 1.0], [1.0, 1.0], [0.5], [0.25])
+    with pytest.raises(ValueError, match="scatter \\+ fission <= total"):
+        SlabRegions([0.0, 1.0], [1.0], [0.8], [0.25])
+
+
+def test_track_to_collision():
+    """
+    Test surface tracking through regions, reflection at x = 0 and leakage.
+    """
+    regions = SlabRegions([0.0, 1.0, 3.0], [1.0, 2.0], [0.5, 1.0], [0.25, 0.5])
+
+    # Collision in the starting region
+    assert track_to_collision(regions, 0, 0.5, 1.0, 0.25, "transmissive") == (
+        0.75,
+        0,
+        0.25,
+        0.0625,
+    )
+    # Across the boundary at x = 1 with 0.5 of the optical depth left
+    assert track_to_collision(regions, 0, 0.5, 1.0, 1.5, "transmissive") == (
+        1.5,
+        1,
+        1.0,
+        0.375,
+    )
+    # Reflected at x = 0, back through region 0 and into region 1
+    assert track_to_collision(regions, 0, 0.5, -1.0, 2.5, "reflective") == (
+        1.5,
+        1,
+        2.0,
+        0.625,
+    )
+    # Leaks through the left and right sides of the slab
+    position, region, track_length, _ = track_to_collision(
+        regions, 0, 0.5, -1.0, 2.5, "transmissive"
+    )
+    assert (position, region, track_length) == (-1.0, -1, 0.5)
+    position, region, track_length, _ = track_to_collision(
+        regions, 1, 2.0, 0.5, 10.0, "reflective"
+    )
+    assert (position, region, track_length) == (-1.0, 2, 2.0)
+
+
+@pytest.mark.parametrize("boundary_condition", ["reflective", "transmissive"])
+def test_track_to_collision_batch(boundary_condition):
+    """
+    Test the batched surface tracking against the scalar version.
+    """
+    regions = SlabRegions(
+        [0.0, 0.5, 1.0, 2.0, 3.5], [1.0, 2.0, 0.75, 4.0], [0.5] * 4, [0.25] * 4
+    )
+    rng = np.random.default_rng(12345)
+    num = 1000
+    positions = rng.uniform(0.0, regions.slab_thickness_cm, num)
+    mu = rng.uniform(-1.0, 1.0, num)
+    optical_depths = rng.exponential(size=num)
+
+    batch = track_to_collision_batch(
+        regions,
+        regions.locate(positions),
+        positions,
+        mu,
+        optical_depths,
+        boundary_condition,
+    )
+    scalar = [
+        track_to_collision(regions, regions.locate(x), x, m, tau, boundary_condition)
+        for x, m, tau in zip(positions, mu, optical_depths)
+    ]
+    leaked = batch[0] < 0
+    for values, expected in zip(batch, zip(*scalar)):
+        np.testing.assert_allclose(values[~leaked], np.array(expected)[~leaked])
+    np.testing.assert_array_equal(np.array([s[0] for s in scalar]) < 0, leaked)
+    assert 0 < leaked.sum() < num
+
+
+@pytest.mark.parametrize("boundary_condition", ["reflective", "transmissive"])
+def test_delta_track_to_collision_batch(boundary_condition):
+    """
+    Test the batched delta tracking against the scalar version.
+    """
+    regions = SlabRegions(
+        [0.0, 0.5, 1.0, 2.0, 3.5], [1.0, 2.0, 0.75, 4.0], [0.5] * 4, [0.25] * 4
+    )
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 0)
+    rng = np.random.default_rng(12345)
+    num = 1000
+    positions = rng.uniform(0.0, regions.slab_thickness_cm, num)
+    mu = rng.uniform(-1.0, 1.0, num)
+    optical_depths = rng.exponential(size=num)
+    histories = np.arange(num, dtype=np.uint64)
+
+    batch = delta_track_to_collision_batch(
+        regions,
+        positions,
+        mu,
+        optical_depths,
+        boundary_condition,
+        streams,
+        histories,
+        0,
+        3,
+    )
+    scalar = [
+        delta_track_to_collision(
+            regions, x, m, tau, boundary_condition, streams, history, 0, 3
+        )
+        for x, m, tau, history in zip(positions, mu, optical_depths, histories)
+    ]
+    for values, expected in zip(batch, zip(*scalar)):
+        np.testing.assert_array_equal(values, expected)
+    leaked = batch[0] < 0
+    assert 0 < leaked.sum() < num
+    np.testing.assert_array_equal(batch[1][leaked], -1)
+    np.testing.assert_array_equal(regions.locate(batch[0][~leaked]), batch[1][~leaked])
+
+
+def test_delta_tracking_single_region():
+    """
+    Test that delta tracking in a single region needs no virtual collisions,
+    and so moves neutrons as surface tracking does.
+    """
+    regions = SlabRegions([0.0, 2.0], [0.5], [0.25], [0.125])
+    rng = np.random.default_rng(12345)
+    num = 1000
+    positions = rng.uniform(0.0, 2.0, num)
+    mu = rng.uniform(-1.0, 1.0, num)
+    optical_depths = rng.exponential(size=num)
+
+    delta = delta_track_to_collision_batch(
+        regions, positions, mu, optical_depths, "reflective", None, np.arange(num), 0, 0
+    )
+    surface = track_to_collision_batch(
+        regions,
+        np.zeros(num, dtype=np.int64),
+        positions,
+        mu,
+        optical_depths,
+        "reflective",
+    )
+    np.testing.assert_allclose(delta[0], surface[0])
+    np.testing.assert_allclose(delta[2], surface[2])
+    # Every tentative collision is real, so the fission estimate is its
+    # collision estimate
+    np.testing.assert_allclose(delta[3][delta[0] >= 0], 0.25)
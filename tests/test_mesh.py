@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mccc.mesh import CMFDScores
+from mccc.mesh import mesh_edges
+from mccc.mesh import MeshScores
+from mccc.mesh import MeshTally
+from mccc.monte_carlo import simulate
+from mccc.sampling import CAPTURE
+from mccc.sampling import FISSION
+from mccc.sampling import SCATTER
+from mccc.setup import setup_simulation
+
+
+def test_mesh_edges():
+    """
+    Test uniform and user-defined mesh edges.
+    """
+    cfg = replace(setup_simulation(), slab_thickness_cm=2.0)
+    assert mesh_edges(cfg) is None
+    np.testing.assert_array_equal(
+        mesh_edges(replace(cfg, mesh_bins=4)), [0.0, 0.5, 1.0, 1.5, 2.0]
+    )
+    np.testing.assert_array_equal(
+        mesh_edges(replace(cfg, mesh_bins=4, mesh_edges=[0.0, 0.1, 2.0])),
+        [0.0, 0.1, 2.0],
+    )
+    with pytest.raises(ValueError, match="Mesh edges must be increasing"):
+        mesh_edges(replace(cfg, mesh_edges=[0.0, 1.0, 1.0]))
+
+
+def test_score_tracks():
+    """
+    Test the track lengths of flights across bins, folded at a reflective
+    boundary and cut off where the neutron leaks.
+    """
+    edges = np.array([0.0, 1.0, 2.0])
+
+    def track_lengths(start, end, mu, reflective=True):
+        mesh = MeshScores(edges)
+        mesh.score_tracks(
+            np.array([start]), np.array([end]), np.array([mu]), 2.0, reflective
+        )
+        return list(mesh.track_length)
+
+    # Across the bin boundary, with track length twice the distance along x
+    assert track_lengths(0.5, 1.5, 0.5) == [1.0, 1.0]
+    # Reflected at x = 0
+    assert track_lengths(0.5, -0.5, -1.0) == [1.0, 0.0]
+    # Leaks from the right
+    assert track_lengths(1.5, 3.0, 1.0) == [0.0, 0.5]
+    # Leaks from the left
+    assert track_lengths(1.5, -0.5, -1.0, reflective=False) == [1.0, 0.5]
+    # Reflected, then leaks from the right
+    assert track_lengths(0.5, -3.0, -1.0) == [1.5, 1.0]
+
+
+def test_score_currents():
+    """
+    Test the net currents through the mesh surfaces, counting flights that
+    stop on a surface but not those that start from one.
+    """
+    edges = np.array([0.0, 1.0, 2.0])
+
+    def currents(start, end, mu, reflective=True):
+        mesh = CMFDScores(edges)
+        mesh.score_tracks(
+            np.array([start]), np.array([end]), np.array([mu]), 2.0, reflective
+        )
+        return list(mesh.currents)
+
+    assert currents(0.5, 1.5, 0.5) == [0.0, 1.0, 0.0]
+    assert currents(1.5, 0.5, -0.5) == [0.0, -1.0, 0.0]
+    # Stopped on, then starting from, the surface at x = 1
+    assert currents(0.5, 1.0, 1.0) == [0.0, 1.0, 0.0]
+    assert currents(1.0, 1.5, 1.0) == [0.0, 0.0, 0.0]
+    assert currents(1.0, 0.5, -1.0) == [0.0, 0.0, 0.0]
+    # Leaks from the left and from the right
+    assert currents(1.5, 0.0, -1.0, reflective=False) == [-1.0, -1.0, 0.0]
+    assert currents(0.5, 2.0, 1.0) == [0.0, 1.0, 1.0]
+    # Reflected at x = 0, with no net current there
+    assert currents(1.5, -0.5, -1.0) == [0.0, -1.0, 0.0]
+    # Reflected, then leaks from the right
+    assert currents(0.5, -2.0, -1.0) == [0.0, 1.0, 1.0]
+
+
+def test_score_collisions():
+    """
+    Test the collision, fission and absorption counts, ignoring collisions
+    off the mesh.
+    """
+    mesh = MeshScores(np.array([0.0, 1.0, 2.0]))
+    mesh.score_collisions(
+        np.array([0.5, 0.5, 1.5, 1.5, 2.5]),
+        np.array([SCATTER, FISSION, CAPTURE, SCATTER, FISSION]),
+        np.array([2.0, 2.0, 4.0, 4.0, 4.0]),
+    )
+    assert list(mesh.collisions) == [2, 2]
+    assert list(mesh.collision_flux) == [1.0, 0.5]
+    assert list(mesh.fissions) == [1, 0]
+    assert list(mesh.absorptions) == [1, 1]
+
+
+def test_score_weighted_collisions():
+    """
+    Test weighted collisions, with sampled and with implicit capture.
+    """
+    positions = np.array([0.5, 0.5, 1.5, 2.5])
+    weights = np.array([0.5, 0.25, 2.0, 1.0])
+    mesh = MeshScores(np.array([0.0, 1.0, 2.0]))
+    mesh.score_collisions(
+        positions, np.array([SCATTER, FISSION, CAPTURE, FISSION]), 0.5, weights
+    )
+    assert list(mesh.collisions) == [0.75, 2.0]
+    assert list(mesh.collision_flux) == [1.5, 4.0]
+    assert list(mesh.fissions) == [0.25, 0.0]
+    assert list(mesh.absorptions) == [0.25, 2.0]
+
+    mesh = MeshScores(np.array([0.0, 1.0, 2.0]))
+    mesh.score_implicit_collisions(positions, weights, 0.5, 0.25, 0.5)
+    assert list(mesh.collisions) == [0.75, 2.0]
+    assert list(mesh.fissions) == [0.1875, 0.5]
+    assert list(mesh.absorptions) == [0.375, 1.0]
+
+
+def test_mesh_tally_statistics():
+    """
+    Test the per-bin batch mean and standard error.
+    """
+    edges = np.array([0.0, 0.5, 1.0])
+    tally = MeshTally(edges)
+    for fissions in ([1.0, 2.0], [3.0, 2.0]):
+        scores = MeshScores(edges)
+        scores.fissions[:] = fissions
+        tally.add_batch(scores, source_weight=4.0)
+
+    # Per source neutron per cm: fissions / (4 * 0.5)
+    np.testing.assert_allclose(tally.mean("fission_rate"), [1.0, 1.0])
+    np.testing.assert_allclose(tally.std_err("fission_rate"), [0.5, 0.0])
+
+    restored = MeshTally(edges)
+    restored.update_from_dict(tally.to_dict())
+    np.testing.assert_array_equal(restored.mean("fission_rate"), [1.0, 1.0])
+
+
+def test_run_mesh_tally():
+    """
+    Test that both flux estimators agree, that the fission rate is Sigma_f
+    times the flux, and that the engines and worker counts agree.
+    """
+    cfg = replace(
+        setup_simulation(),
+        num_generations=3,
+        num_particles=20000,
+        random_seed=12345,
+        mesh_bins=4,
+        population_control="comb",
+    )
+    mesh = simulate(cfg)["mesh"]
+    assert mesh.num_batches == 3
+    np.testing.assert_allclose(
+        mesh.mean("collision_flux"), mesh.mean("track_length_flux"), rtol=0.03
+    )
+    np.testing.assert_allclose(
+        mesh.mean("fission_rate"),
+        cfg.fission_xs * mesh.mean("track_length_flux"),
+        rtol=0.03,
+    )
+
+    cfg = replace(cfg, num_particles=2000)
+    mesh = simulate(cfg)["mesh"]
+    for other_cfg in (replace(cfg, engine="history"), replace(cfg, workers=2)):
+        other_mesh = simulate(other_cfg)["mesh"]
+        for name in ("collision_flux", "track_length_flux", "fission_rate"):
+            np.testing.assert_allclose(other_mesh.mean(name), mesh.mean(name))
@@ -1,6 +1,20 @@
 # -*- coding: utf-8 -*-
+import subprocess
+import sys
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mccc.convergence import active_statistics
 from mccc.monte_carlo import run
+from mccc.monte_carlo import simulate
+from mccc.monte_carlo import simulate_generation_event
+from mccc.monte_carlo import simulate_generation_history
 from mccc.monte_carlo import simulate_single_history
+from mccc.monte_carlo import Simulation
+from mccc.monte_carlo import SimulationError
+from mccc.rng import ParticleStreams
 from mccc.setup import initialise_tallies
 from mccc.setup import setup_simulation
 
@@ -27,3 +41,235 @@ def test_run_reproducible_with_seed():
     k1_b, k2_b = run(2, 1000, plot=False, random_seed=12345)
     assert k1_a == k1_b
     assert k2_a == k2_b
+
+
+def test_simulate_generation_event():
+    tallies = initialise_tallies()
+    cfg = setup_simulation()
+    start_positions = np.full(1000, 0.5 * cfg.slab_thickness_cm)
+
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 0)
+
+    tallies, next_bank = simulate_generation_event(
+        cfg, tallies, start_positions, streams
+    )
+    assert tallies["history"] == 1000
+    assert tallies["capture"] + tallies["leakage"] + tallies["fission"] == 1000
+    assert (
+        tallies["scatter"] + tallies["fission"] + tallies["capture"]
+        == tallies["collision"]
+    )
+    assert len(next_bank) == tallies["secondary"] - tallies["scatter"]
+    assert np.all(next_bank.positions >= 0)
+    assert np.all(next_bank.positions <= cfg.slab_thickness_cm)
+    assert np.all(next_bank.weights == 1.0)
+
+
+def test_run_engines_agree():
+    # Every history draws from its own random number stream, so both engines
+    # give identical results
+    k1_history, k2_history = run(
+        2, 5000, plot=False, random_seed=12345, engine="history"
+    )
+    k1_event, k2_event = run(2, 5000, plot=False, random_seed=12345, engine="event")
+    assert k1_history == k1_event
+    assert k2_history == k2_event
+
+
+def test_simulate_generation_engines_agree():
+    cfg = setup_simulation()
+    start_positions = np.linspace(0.0, cfg.slab_thickness_cm, 500)
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 3)
+
+    tallies_history, bank_history = simulate_generation_history(
+        cfg, initialise_tallies(), start_positions, streams, first_history=100
+    )
+    tallies_event, bank_event = simulate_generation_event(
+        cfg, initialise_tallies(), start_positions, streams, first_history=100
+    )
+    # The float scores are summed in a different order
+    for name in ("track_length", "collision_fission", "track_fission"):
+        assert tallies_history.pop(name) == pytest.approx(tallies_event.pop(name))
+    assert tallies_history == tallies_event
+    np.testing.assert_array_equal(bank_history.sites, bank_event.sites)
+
+
+def test_run_unknown_engine():
+    with pytest.raises(ValueError, match="Unknown engine"):
+        run(1, 1000, plot=False, engine="unknown")
+
+
+def test_run_compact_bank():
+    k1, k2 = run(2, 5000, plot=False, random_seed=12345, bank_precision="float32")
+    k1_ref, k2_ref = run(2, 5000, plot=False, random_seed=12345)
+    assert k1[0] == k1_ref[0]
+    assert k2[0] == k2_ref[0]
+    assert abs(k1[1] - k1_ref[1]) < 0.05
+
+
+def test_track_length_estimator():
+    """
+    Test that the track-length estimator agrees with the others, and that the
+    combined estimate is more precise than k1 alone.
+    """
+    cfg = replace(
+        setup_simulation(),
+        num_generations=20,
+        num_particles=2000,
+        random_seed=12345,
+        population_control="comb",
+    )
+    results = simulate(cfg)
+    for name in ("k1", "k_collision"):
+        assert np.mean(results["k_track_length"]) == pytest.approx(
+            np.mean(results[name]), rel=0.02
+        )
+    _, std_err, weights = results["k_combined"]
+    assert weights.sum() == pytest.approx(1.0)
+    assert std_err < active_statistics(results["k1"])[1]
+
+
+def test_regions_of_one_material():
+    """
+    Test that splitting the slab into regions of the same material does not
+    change the results, as the optical depth is carried across boundaries.
+    """
+    cfg = replace(
+        setup_simulation(), num_generations=3, num_particles=5000, random_seed=12345
+    )
+    material = (cfg.total_xs, cfg.scatter_xs, cfg.fission_xs)
+    thickness = cfg.slab_thickness_cm
+    layered = replace(
+        cfg,
+        regions=(
+            (thickness / 3,) + material,
+            (thickness / 2,) + material,
+            (thickness,) + material,
+        ),
+    )
+    results = simulate(cfg)
+    results_layered = simulate(layered)
+    for name in ("k1", "k_collision", "k_track_length"):
+        assert results_layered[name] == pytest.approx(results[name], rel=1e-9)
+
+
+@pytest.mark.parametrize("tracking", ["surface", "delta"])
+def test_regions_engines_agree(tracking):
+    """
+    Test that both engines give the same fission bank in a heterogeneous slab.
+    """
+    cfg = replace(
+        setup_simulation(),
+        tracking=tracking,
+        regions=(
+            (0.5, 0.6, 0.5, 0.05),
+            (1.5, 0.3264, 0.225216, 0.0816),
+            (2.5, 1.0, 0.9, 0.0),
+        ),
+    )
+    assert cfg.slab_thickness_cm == 2.5
+    start_positions = np.linspace(0.0, cfg.slab_thickness_cm, 500)
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 3)
+
+    tallies_history, bank_history = simulate_generation_history(
+        cfg, initialise_tallies(), start_positions, streams
+    )
+    tallies_event, bank_event = simulate_generation_event(
+        cfg, initialise_tallies(), start_positions, streams
+    )
+    for name in ("track_length", "collision_fission", "track_fission"):
+        assert tallies_history.pop(name) == pytest.approx(tallies_event.pop(name))
+    assert tallies_history == tallies_event
+    np.testing.assert_array_equal(bank_history.sites, bank_event.sites)
+
+
+def test_delta_tracking():
+    """
+    Test that delta tracking gives the k_eff of surface tracking.
+    """
+    cfg = replace(
+        setup_simulation(),
+        num_generations=12,
+        num_particles=10000,
+        num_inactive=2,
+        random_seed=12345,
+        population_control="comb",
+        regions=((0.5, 0.6, 0.5, 0.05), (1.5, 0.3264, 0.225216, 0.0816)),
+    )
+    surface = simulate(cfg)
+    delta = simulate(replace(cfg, tracking="delta"))
+    for name in ("k1", "k_collision", "k_track_length"):
+        mean, std_err = active_statistics(surface[name][2:])
+        mean_delta, std_err_delta = active_statistics(delta[name][2:])
+        assert abs(mean - mean_delta) < 4 * np.hypot(std_err, std_err_delta)
+
+
+def test_run_unknown_tracking():
+    with pytest.raises(ValueError, match="Unknown tracking mode"):
+        simulate(replace(setup_simulation(), tracking="unknown"))
+
+
+def test_simulation_generations():
+    """
+    Test that iterating over a Simulation yields the results of each
+    generation, and that a run stopped early and carried on gives the
+    results of the uninterrupted run.
+    """
+    cfg = replace(
+        setup_simulation(), num_generations=4, num_particles=1000, random_seed=12345
+    )
+    results = simulate(cfg)
+
+    simulation = Simulation(cfg)
+    for generation in simulation:
+        if generation.generation == 1:
+            break
+    assert simulation.generation == 2
+    assert simulation.results()["k1"] == results["k1"][:2]
+
+    generations = list(simulation)
+    assert [generation.generation for generation in generations] == [2, 3]
+    assert [generation.k1 for generation in generations] == results["k1"][2:]
+    assert generations[-1].bank is simulation.bank
+    assert generations[-1].tallies["history"] > 0
+    assert simulation.results()["k2"] == results["k2"]
+    assert list(simulation) == []
+
+
+def test_simulation_errors():
+    """
+    Test that a run that cannot go on raises an exception rather than
+    exiting.
+    """
+    cfg = replace(
+        setup_simulation(), num_generations=2, num_particles=100, random_seed=1
+    )
+    with pytest.raises(SimulationError, match="Zero particles in generation 1"):
+        simulate(replace(cfg, fission_xs=0.0))
+    with pytest.raises(SimulationError, match="Zero collisions in generation 0"):
+        simulate(
+            replace(
+                cfg,
+                total_xs=1e-9,
+                scatter_xs=0.0,
+                fission_xs=5e-10,
+                left_boundary_condition="transmissive",
+            )
+        )
+
+
+def test_run_without_plotting_imports():
+    """
+    Test that a CLI run that does not plot never imports matplotlib or
+    pandas. A fresh interpreter is used, as other tests may import them.
+    """
+    script = (
+        "import sys\n"
+        "from mccc.monte_carlo import main\n"
+        "main(['-g', '2', '-p', '100', '--seed', '1'], standalone_mode=False)\n"
+        "print(sorted({'matplotlib', 'pandas'} & set(sys.modules)))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.splitlines()[-1] == "[]"
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import json
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mccc.monte_carlo import run
+from mccc.monte_carlo import schedule_replicas
+from mccc.monte_carlo import trial
+from mccc.parallel import copy_to_shared_memory
+from mccc.parallel import create_executor
+from mccc.parallel import read_from_shared_memory
+from mccc.parallel import run_jobs
+from mccc.parallel import split_into_chunks
+from mccc.setup import setup_simulation
+
+
+def test_split_into_chunks():
+    """
+    Test that chunks cover the bank exactly once, in order.
+    """
+    assert split_into_chunks(0, 4) == []
+    assert split_into_chunks(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert split_into_chunks(8, 4) == [(0, 4), (4, 8)]
+
+
+def test_shared_memory_round_trip():
+    """
+    Test that values copied to shared memory can be read back and released.
+    """
+    values = np.linspace(0.0, 1.0, 11)
+    shm = copy_to_shared_memory(values)
+    name = shm.name
+    shm.close()
+
+    np.testing.assert_array_equal(
+        read_from_shared_memory(name, values.size, values.dtype, 2, 5), values[2:5]
+    )
+    np.testing.assert_array_equal(
+        read_from_shared_memory(name, values.size, values.dtype, unlink=True), values
+    )
+
+    assert copy_to_shared_memory(np.empty(0)) is None
+    assert read_from_shared_memory(None, 0, values.dtype).size == 0
+
+
+def test_create_executor():
+    """
+    Test that a single worker runs in-process and invalid counts are rejected.
+    """
+    assert create_executor(1) is None
+    with pytest.raises(ValueError, match="Number of workers must be positive"):
+        create_executor(0)
+
+
+@pytest.mark.parametrize("engine", ["event", "history"])
+def test_run_independent_of_worker_count(engine):
+    """
+    Test that k_eff is identical whatever the number of workers, and to a
+    serial run.
+    """
+    results = [
+        run(2, 20000, plot=False, random_seed=12345, engine=engine, workers=workers)
+        for workers in (None, 1, 2, 3)
+    ]
+    assert results[0] == results[1] == results[2] == results[3]
+
+
+def test_run_jobs():
+    """
+    Test that jobs start largest first, and results come back in job order.
+    """
+    started = []
+
+    def job(name):
+        started.append(name)
+        return name.upper()
+
+    results, times = run_jobs(job, [("a",), ("b",), ("c",)], [1, 3, 2])
+    assert started == ["b", "c", "a"]
+    assert results == ["A", "B", "C"]
+    assert len(times) == 3 and min(times) >= 0
+
+    with create_executor(2) as executor:
+        finished = {}
+        results, _ = run_jobs(
+            abs,
+            [(-1,), (2,), (-3,)],
+            [1, 2, 3],
+            executor,
+            lambda i, result, _: finished.update({i: result}),
+        )
+    assert results == [1, 2, 3]
+    assert finished == {0: 1, 1: 2, 2: 3}
+
+
+def test_trial_independent_of_worker_count(tmp_path):
+    """
+    Test that a trial with its replicas in a process pool gives exactly the
+    results, and the results file, of one run serially.
+    """
+    paths = [tmp_path / "serial.jsonl", tmp_path / "pool.jsonl"]
+    results = [
+        trial(
+            2,
+            2000,
+            random_seed=12345,
+            num_replicas=3,
+            results_file=str(path),
+            workers=workers,
+        )
+        for path, workers in zip(paths, (None, 2))
+    ]
+    for serial, pooled in zip(*results):
+        np.testing.assert_array_equal(serial, pooled)
+    records = [
+        [json.loads(line) for line in path.read_text().splitlines()] for path in paths
+    ]
+    assert [record["replica"] for record in records[1]] == [0, 0, 1, 1, 2, 2]
+    for serial, pooled in zip(*records):
+        for name in ("time_s", "elapsed_s"):
+            del serial[name], pooled[name]
+        assert serial == pooled
+
+
+def test_schedule_replicas(capsys):
+    """
+    Test that the replicas of several trials in one pool keep their seeds,
+    and that each job is timed.
+    """
+    cfg = replace(setup_simulation(), num_generations=2, random_seed=7)
+    trials = [
+        (replace(cfg, num_particles=500), 2),
+        # The budget is not applied to each replica
+        (replace(cfg, num_particles=1000, max_histories=1), 3),
+    ]
+    replicas = schedule_replicas(trials, 2, verbose=True)
+    assert [len(r) for r in replicas] == [2, 3]
+    assert all(len(replica["k1"]) == 2 for replica in replicas[1])
+    k1, _, k2, _ = trial(2, 1000, random_seed=7, num_replicas=3)
+    np.testing.assert_array_equal(np.mean([r["k1"] for r in replicas[1]], axis=0), k1)
+    np.testing.assert_array_equal(np.mean([r["k2"] for r in replicas[1]], axis=0), k2)
+
+    output = capsys.readouterr().out
+    assert "Job 4: 1000 particles, replica 2, " in output
+    assert "Jobs: 5 of 5 run in " in output
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+import sys
+
+from mccc.monte_carlo import run
+
+
+def test_fission_rate_plot(tmp_path, monkeypatch):
+    """
+    Test that a plotting run renders the source of every generation once it
+    is over, without pyplot, and gives the results of a run without a plot.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delitem(sys.modules, "matplotlib.pyplot", raising=False)
+    results = run(3, 1000, plot=True, random_seed=12345)
+    assert (tmp_path / "fission_rate.png").stat().st_size > 0
+    assert "matplotlib.pyplot" not in sys.modules
+    assert results == run(3, 1000, plot=False, random_seed=12345)
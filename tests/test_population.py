@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from mccc.bank import FissionBank
+from mccc.monte_carlo import run
+from mccc.population import comb
+from mccc.population import control_population
+from mccc.population import resample
+from mccc.rng import ParticleStreams
+from mccc.setup import setup_simulation
+from mccc.setup import update_user_input
+
+
+def test_comb():
+    """
+    Test that combing preserves the total weight and selects by weight.
+    """
+    bank = FissionBank.from_positions([1.0, 2.0, 3.0, 4.0], generation=2)
+    bank.weights[:] = [0.5, 0.5, 2.0, 1.0]
+
+    combed = comb(bank, 8, 0.5)
+    assert len(combed) == 8
+    assert combed.total_weight() == pytest.approx(bank.total_weight())
+    np.testing.assert_array_equal(
+        combed.positions, [1.0, 2.0, 3.0, 3.0, 3.0, 3.0, 4.0, 4.0]
+    )
+    assert combed.generation == 2
+
+
+def test_resample():
+    """
+    Test that resampling preserves the total weight and never picks
+    zero-weight sites.
+    """
+    bank = FissionBank.from_positions([1.0, 2.0, 3.0])
+    bank.weights[:] = [1.0, 0.0, 1.0]
+
+    resampled = resample(bank, 100, np.random.default_rng(1).random(100))
+    assert len(resampled) == 100
+    assert resampled.total_weight() == pytest.approx(2.0)
+    assert 2.0 not in resampled.positions
+
+
+@pytest.mark.parametrize("population_control", ["comb", "resample"])
+def test_control_population(population_control):
+    """
+    Test that the controlled bank has num_particles sites of unit weight.
+    """
+    cfg = update_user_input(
+        setup_simulation(),
+        {"num_particles": 50, "population_control": population_control},
+    )
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(1), 0)
+    bank = FissionBank.from_positions(np.linspace(0.0, 1.0, 80))
+
+    controlled = control_population(cfg, bank, streams)
+    assert len(controlled) == 50
+    np.testing.assert_allclose(controlled.weights, 1.0)
+
+
+def test_control_population_unknown():
+    """
+    Test that an unknown population control is rejected.
+    """
+    cfg = update_user_input(setup_simulation(), {"population_control": "unknown"})
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(1), 0)
+    bank = FissionBank.from_positions([1.0])
+    with pytest.raises(ValueError, match="Unknown population control: unknown"):
+        control_population(cfg, bank, streams)
+
+
+def test_run_with_population_control():
+    """
+    Test that population control only acts between generations.
+    """
+    k1_ref, k2_ref = run(3, 5000, plot=False, random_seed=12345)
+    for population_control in ("comb", "resample"):
+        k1, k2 = run(
+            3,
+            5000,
+            plot=False,
+            random_seed=12345,
+            population_control=population_control,
+        )
+        assert k1[0] == k1_ref[0]
+        assert k2[0] == k2_ref[0]
+        assert all(abs(k - 1.0) < 0.1 for k in k1 + k2)
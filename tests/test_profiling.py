@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import pstats
+from dataclasses import replace
+
+from mccc.monte_carlo import simulate
+from mccc.profiling import GENERATION_PHASES
+from mccc.profiling import peak_rss_bytes
+from mccc.setup import setup_simulation
+
+
+def test_profile(tmp_path, capsys):
+    """
+    Test that a profiled run records the phases and statistics of every
+    generation, writes the cProfile statistics of the transport, and gives
+    the results of the run without profiling.
+    """
+    cfg = replace(
+        setup_simulation(), num_generations=3, num_particles=1000, random_seed=12345
+    )
+    results = simulate(cfg)
+    assert results["profile"] is None
+
+    profile_file = tmp_path / "transport.prof"
+    profiled = simulate(replace(cfg, profile_file=str(profile_file)))
+    assert profiled["k1"] == results["k1"]
+    assert profiled["k2"] == results["k2"]
+
+    profile = profiled["profile"]
+    assert [record["generation"] for record in profile.generations] == [0, 1, 2]
+    bank_size = 1000
+    for record in profile.generations:
+        assert all(record[f"{phase}_s"] >= 0 for phase in GENERATION_PHASES)
+        assert record["transport_s"] > 0
+        assert record["histories"] == bank_size
+        assert record["histories_per_s"] > 0
+        assert record["collisions_per_history"] >= 1
+        bank_size = record["bank_size"]
+    assert sum(profile.totals.values()) > 0
+
+    functions = {name for _, _, name in pstats.Stats(str(profile_file)).stats}
+    assert "simulate_generation_event" in functions
+    assert "Profile (wall time in seconds):" in capsys.readouterr().out
+
+
+def test_peak_rss_bytes():
+    assert peak_rss_bytes() > 1024**2
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from mccc.monte_carlo import run
+from mccc.monte_carlo import trial
+from mccc.progress import ProgressReporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reporter_throttled(tmp_path, capsys):
+    """
+    Test that progress lines and metrics writes are rate-limited, and that
+    the ETA follows from the work done.
+    """
+    clock = FakeClock()
+    path = tmp_path / "metrics.json"
+    reporter = ProgressReporter(
+        total=1000,
+        metrics_file=path,
+        progress_interval=5,
+        metrics_interval=10,
+        clock=clock,
+    )
+    for _ in range(4):
+        clock.now += 1
+        reporter.update(100, k1=1.0)
+    assert capsys.readouterr().err == ""
+    assert not path.exists()
+
+    clock.now += 1
+    reporter.update(100, bank_size=90)
+    assert capsys.readouterr().err.count("Progress:") == 1
+    assert not path.exists()
+
+    clock.now = 10
+    reporter.update(0, work=500)
+    metrics = json.loads(path.read_text())
+    assert metrics["histories"] == 500
+    assert metrics["histories_per_second"] == pytest.approx(50)
+    assert metrics["progress_ratio"] == 1.0
+    assert metrics["eta_seconds"] == 0.0
+    assert metrics["k1"] == 1.0
+    assert metrics["bank_size"] == 90
+
+    reporter.total = 2000
+    clock.now = 15
+    reporter.close()
+    assert "ETA 0:00:15" in capsys.readouterr().err
+    assert json.loads(path.read_text())["progress_ratio"] == 0.5
+
+
+def test_reporter_unknown_format():
+    with pytest.raises(ValueError):
+        ProgressReporter(metrics_file="metrics.txt", metrics_format="xml")
+
+
+def test_run_metrics_file(tmp_path, capsys):
+    """
+    Test that a run with progress reporting writes its final metrics in the
+    Prometheus text format, and gives the results of a run without.
+    """
+    path = tmp_path / "metrics.prom"
+    results = run(3, 1000, plot=False, random_seed=12345)
+    assert results == run(
+        3, 1000, plot=False, random_seed=12345, progress=True, metrics_file=str(path)
+    )
+    assert "Progress: 100.0%" in capsys.readouterr().err
+
+    lines = path.read_text().splitlines()
+    assert "# TYPE mccc_k1 gauge" in lines
+    values = dict(line.split() for line in lines if not line.startswith("#"))
+    assert float(values["mccc_k1"]) == results[0][-1]
+    assert float(values["mccc_progress_ratio"]) == 1.0
+    assert int(values["mccc_generation"]) == 2
+
+
+def test_trial_metrics_file(tmp_path):
+    """
+    Test that a trial reports progress over all its replicas.
+    """
+    path = tmp_path / "metrics.json"
+    trial(2, 500, random_seed=1, num_replicas=3, metrics_file=str(path))
+    metrics = json.loads(path.read_text())
+    assert metrics["progress_ratio"] == 1.0
+    assert metrics["histories"] > 3 * 500
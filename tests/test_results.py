@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from mccc.monte_carlo import run
+from mccc.monte_carlo import trial
+from mccc.results import CsvWriter
+from mccc.results import JsonlWriter
+from mccc.results import open_results_writer
+
+
+def test_jsonl_writer(tmp_path):
+    """
+    Test that records are written one per line, including NumPy scalars.
+    """
+    path = tmp_path / "results.jsonl"
+    writer = JsonlWriter(path)
+    writer.write({"generation": 0, "k1": np.float64(1.5), "fission": np.int64(3)})
+    # Each record is flushed, so it can be read before the writer is closed
+    assert json.loads(path.read_text()) == {"generation": 0, "k1": 1.5, "fission": 3}
+    writer.write({"generation": 1, "k1": 1.0, "fission": 2})
+    writer.close()
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_csv_writer(tmp_path):
+    """
+    Test that the header comes from the first record.
+    """
+    path = tmp_path / "results.csv"
+    writer = CsvWriter(path)
+    writer.write({"generation": 0, "k1": 1.5})
+    writer.write({"generation": 1, "k1": 1.0})
+    writer.close()
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [{"generation": "0", "k1": "1.5"}, {"generation": "1", "k1": "1.0"}]
+
+
+def test_open_results_writer(tmp_path):
+    """
+    Test the choice of format from the file extension.
+    """
+    for name, writer_type in (
+        ("results.csv", CsvWriter),
+        ("results.jsonl", JsonlWriter),
+        ("results.txt", JsonlWriter),
+    ):
+        writer = open_results_writer(tmp_path / name)
+        assert isinstance(writer, writer_type)
+        writer.close()
+
+    writer = open_results_writer(tmp_path / "results.txt", "csv")
+    assert isinstance(writer, CsvWriter)
+    writer.close()
+
+    with pytest.raises(ValueError, match="Unknown results format: xml"):
+        open_results_writer(tmp_path / "results.xml", "xml")
+
+
+def test_run_streams_results(tmp_path):
+    """
+    Test that a run writes one record per generation, matching its estimates.
+    """
+    path = tmp_path / "results.jsonl"
+    k1, k2 = run(3, 1000, plot=False, random_seed=12345, results_file=str(path))
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["generation"] for record in records] == [0, 1, 2]
+    assert [record["k1"] for record in records] == k1
+    assert [record["k2"] for record in records] == k2
+    assert records[0]["history"] == 1000
+    assert records[1]["history"] == records[0]["bank_size"]
+    assert all(record["time_s"] > 0 for record in records)
+
+
+def test_trial_streams_results(tmp_path):
+    """
+    Test that a trial labels the records of each replica.
+    """
+    path = tmp_path / "results.csv"
+    trial(2, 500, random_seed=12345, results_file=str(path))
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 20
+    assert [row["replica"] for row in rows[:4]] == ["0", "0", "1", "1"]
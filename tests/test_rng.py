@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import numpy as np
+
+from mccc.rng import CACHE_DRAWS
+from mccc.rng import CACHE_HISTORIES
+from mccc.rng import DELTA_FLAG
+from mccc.rng import ParticleStreams
+from mccc.rng import philox4x32
+from mccc.rng import philox4x32_batch
+from mccc.rng import PHILOX_CHUNK
+from mccc.rng import SOURCE_STREAM
+from mccc.rng import SPLIT_FLAG
+
+
+def test_philox4x32_known_answers():
+    """
+    Test against the Random123 known-answer vectors for Philox4x32-10.
+    """
+    assert philox4x32((0, 0, 0, 0), (0, 0)) == (
+        0x6627E8D5,
+        0xE169C58D,
+        0xBC57AC4C,
+        0x9B00DBD8,
+    )
+    assert philox4x32((0xFFFFFFFF,) * 4, (0xFFFFFFFF,) * 2) == (
+        0x408F276D,
+        0x41C83B0E,
+        0xA20BC7C6,
+        0x6D5451FD,
+    )
+    assert philox4x32(
+        (0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344), (0xA4093822, 0x299F31D0)
+    ) == (0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1)
+
+
+def test_philox4x32_batch_matches_reference():
+    """
+    Test that the batched generator gives the words of the reference one,
+    across chunks, with scalar counter words, and scaled to uniforms.
+    """
+    size = 2 * PHILOX_CHUNK + 3
+    rng = np.random.default_rng(5)
+    counter = tuple(
+        rng.integers(0, 2**32, size, dtype=np.uint64) for _ in range(3)
+    ) + (np.uint64(7),)
+    key = (0xA4093822, 0x299F31D0)
+    reference = np.stack(np.broadcast_arrays(*philox4x32(counter, key))).astype(
+        np.uint32
+    )
+
+    words = philox4x32_batch(
+        tuple(np.asarray(word, dtype=np.uint32) for word in counter), key
+    )
+    assert words.dtype == np.uint32
+    np.testing.assert_array_equal(words, reference)
+
+    uniforms = philox4x32_batch(
+        tuple(np.asarray(word, dtype=np.uint32) for word in counter),
+        key,
+        np.empty((4, size)),
+    )
+    np.testing.assert_array_equal(uniforms, (reference + 0.5) * 2.0**-32)
+    assert 0.0 < uniforms.min() and uniforms.max() < 1.0
+
+
+def test_uniforms_match_single_history():
+    """
+    Test that batched and single-history draws give the same numbers.
+    """
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 2)
+    histories = np.array([0, 7, 2**33 + 5])
+
+    batch = streams.uniforms(histories, 3)
+    for i, history in enumerate(histories):
+        assert tuple(batch[:, i]) == streams.uniform_block(history, 3)
+
+    # Across the cached blocks of histories and draws, and after pickling
+    histories = np.array([0, CACHE_HISTORIES - 1, CACHE_HISTORIES, 5000])
+    copy = pickle.loads(pickle.dumps(streams))
+    for draw in range(2 * CACHE_DRAWS + 1):
+        batch = streams.uniforms(histories, draw, SOURCE_STREAM)
+        for i, history in enumerate(histories):
+            assert tuple(batch[:, i]) == streams.uniform_block(
+                history, draw, SOURCE_STREAM
+            )
+            assert tuple(batch[:, i]) == copy.uniform_block(
+                history, draw, SOURCE_STREAM
+            )
+
+
+def test_uniforms_independent_of_order():
+    """
+    Test that each history's numbers do not depend on which other histories
+    are drawn with it.
+    """
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 0)
+    forward = streams.uniforms(np.arange(100), 0)
+    backward = streams.uniforms(np.arange(100)[::-1], 0)
+    np.testing.assert_array_equal(forward, backward[:, ::-1])
+
+
+def test_uniforms_range_and_streams():
+    """
+    Test that draws lie in (0, 1) and differ between generations, blocks and
+    sub-streams.
+    """
+    seed_sequence = np.random.SeedSequence(12345)
+    streams = ParticleStreams.for_generation(seed_sequence, 0)
+    histories = np.arange(10000)
+
+    draws = streams.uniforms(histories, 0)
+    assert draws.shape == (4, 10000)
+    assert np.all((draws > 0) & (draws < 1))
+    assert abs(draws.mean() - 0.5) < 0.01
+
+    assert not np.array_equal(draws, streams.uniforms(histories, 1))
+    assert not np.array_equal(
+        draws, streams.uniforms(histories, 0, stream=SOURCE_STREAM)
+    )
+    assert not np.array_equal(
+        draws,
+        ParticleStreams.for_generation(seed_sequence, 1).uniforms(histories, 0),
+    )
+
+
+def test_split_streams():
+    """
+    Test that split streams do not depend on which others are numbered with
+    them, and differ between copies and parents.
+    """
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 0)
+    histories = np.array([0, 0, 0, 5], dtype=np.uint64)
+    draws = np.array([2, 2, 3, 2], dtype=np.uint64)
+    parents = np.zeros(4, dtype=np.uint64)
+    copies = np.array([1, 2, 1, 1])
+
+    split = streams.split_streams(histories, draws, parents, copies)
+    assert len(set(split.tolist())) == 4
+    assert np.all(split >= SPLIT_FLAG)
+    for i in range(4):
+        assert (
+            split[i]
+            == streams.split_streams(
+                histories[i : i + 1],
+                draws[i : i + 1],
+                parents[i : i + 1],
+                copies[i : i + 1],
+            )[0]
+        )
+
+    # Per-particle blocks and streams give the single-history numbers
+    batch = streams.uniforms(histories, draws, split)
+    for i in range(4):
+        assert tuple(batch[:, i]) == streams.uniform_block(
+            int(histories[i]), int(draws[i]), int(split[i])
+        )
+
+
+def test_delta_streams():
+    """
+    Test that each flight gets its own delta stream, clear of the fixed and
+    split sub-streams.
+    """
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 0)
+    histories = np.array([0, 0, 0, 5], dtype=np.uint64)
+    draws = np.array([2, 3, 2, 2], dtype=np.uint64)
+    parents = np.array([0, 0, SPLIT_FLAG + 7, 0], dtype=np.uint64)
+
+    delta = streams.delta_streams(histories, draws, parents)
+    assert len(set(delta.tolist())) == 4
+    assert np.all((delta >= DELTA_FLAG) & (delta < SPLIT_FLAG))
+    # A scalar block and sub-stream are broadcast over the flights
+    assert streams.delta_streams(histories[:2], 2, 0)[0] == delta[0]
+    assert streams.delta_streams(histories[3:], 2, 0)[0] == delta[3]
@@ -1,10 +1,22 @@
 # -*- coding: utf-8 -*-
-import mccc.sampling as sampling
+import numpy as np
+
+from mccc.sampling import CAPTURE
+from mccc.sampling import FISSION
+from mccc.sampling import interaction_codes
+from mccc.sampling import INTERACTION_TYPES
+from mccc.sampling import poisson_cdf
 from mccc.sampling import sample_direction_cosine
+from mccc.sampling import sample_direction_cosine_batch
 from mccc.sampling import sample_interaction_type
+from mccc.sampling import sample_interaction_type_batch
 from mccc.sampling import sample_neutrons_emitted
+from mccc.sampling import sample_neutrons_emitted_batch
 from mccc.sampling import sample_position
+from mccc.sampling import sample_position_batch
 from mccc.sampling import sample_scattering_distance
+from mccc.sampling import sample_scattering_distance_batch
+from mccc.sampling import SCATTER
 
 
 def test_sample_direction_cosine():
@@ -115,12 +127,173 @@ def test_sample_scattering_distance():
     assert all(distance > 0 for distance in distance_values)
 
 
-def test_sample_scattering_distance_avoids_log_zero(monkeypatch):
+class FixedDraws:
+    """
+    Stand-in for a Generator that hands out fixed batches of draws.
+    """
+
+    def __init__(self, draws):
+        self.draws = iter(draws)
+
+    def random(self, size, out=None):
+        values = np.array(next(self.draws), dtype=float)
+        assert values.size == size
+        if out is None:
+            return values
+        out[:] = values
+        return out
+
+
+def test_sample_scattering_distance_avoids_log_zero():
     """
     Test that a zero random draw is retried so log(0) is never evaluated.
     """
 
-    draws = iter([0.0, 0.25])
-    monkeypatch.setattr(sampling.np.random, "random", lambda: next(draws))
-    distance = sample_scattering_distance(1.0)
-    assert distance > 0
+    distance = sample_scattering_distance(1.0, rng=FixedDraws([[0.0], [0.25]]))
+    assert distance == -np.log(0.25)
+
+
+def test_sampling_with_given_random_numbers():
+    """
+    Test that the samplers transform given random numbers, for scalars and arrays.
+    """
+    rand_nums = np.array([0.25, 0.5, 0.75])
+
+    assert sample_direction_cosine(0.75) == 0.5
+    np.testing.assert_array_equal(sample_direction_cosine(rand_nums), [-0.5, 0.0, 0.5])
+
+    assert sample_position(10.0, rand_num=0.25) == 2.5
+    np.testing.assert_array_equal(sample_position(4.0, rand_num=rand_nums), [1, 2, 3])
+
+    assert sample_scattering_distance(2.0, 0.5) == -2.0 * np.log(0.5)
+    np.testing.assert_array_equal(
+        sample_scattering_distance(2.0, rand_nums), -2.0 * np.log(rand_nums)
+    )
+
+
+def test_sample_neutrons_emitted_inverse_cdf():
+    """
+    Test the Poisson inverse-CDF sampling against the CDF and the mean.
+    """
+    nu = 2.5
+    assert sample_neutrons_emitted(nu, rand_num=np.exp(-nu) - 1e-12) == 0
+    assert sample_neutrons_emitted(nu, rand_num=np.exp(-nu) + 1e-12) == 1
+    assert sample_neutrons_emitted(0.0, rand_num=0.999) == 0
+
+    rand_nums = (np.arange(100000) + 0.5) / 100000
+    values = sample_neutrons_emitted(nu, rand_num=rand_nums)
+    assert values.dtype == np.int64
+    assert abs(values.mean() - nu) < 0.01
+
+    # Scalar and array paths agree
+    assert all(
+        sample_neutrons_emitted(nu, rand_num=u) == value
+        for u, value in zip(rand_nums[::997], values[::997])
+    )
+
+    # ... also on and just above each step of the CDF, and in the far tail
+    cdf = poisson_cdf(nu)
+    edges = np.concatenate([cdf, np.nextafter(cdf, 1.0), [1.0 - 2**-53]])
+    assert list(sample_neutrons_emitted(nu, rand_num=edges)) == [
+        sample_neutrons_emitted(nu, rand_num=u) for u in edges
+    ]
+
+
+def test_interaction_codes():
+    """
+    Test the interaction codes either side of the probability boundaries.
+    """
+    rand_nums = np.array([0.5 - 1e-10, 0.5, 0.7 - 1e-10, 0.7, 1.0 - 1e-10])
+    codes = interaction_codes(0.5, 0.2, rand_nums)
+    assert codes.dtype == np.int8
+    assert list(codes) == [SCATTER, FISSION, FISSION, CAPTURE, CAPTURE]
+    assert [INTERACTION_TYPES[code] for code in codes] == [
+        sample_interaction_type(0.5, 0.2, rand_num=u) for u in rand_nums
+    ]
+
+
+def test_batched_samplers_match_scalar_transforms():
+    """
+    Test that the batched samplers fill the given buffers with the same values
+    as the scalar samplers give for the same random numbers.
+    """
+    count = 1000
+    rand_nums = np.random.default_rng(12345).random(count)
+
+    out = np.empty(count + 10)
+    values = sample_direction_cosine_batch(count, np.random.default_rng(12345), out)
+    assert np.shares_memory(values, out)
+    np.testing.assert_array_equal(values, sample_direction_cosine(rand_nums))
+
+    values = sample_position_batch(4.0, count, np.random.default_rng(12345), out)
+    np.testing.assert_array_equal(values, sample_position(4.0, rand_num=rand_nums))
+
+    values = sample_scattering_distance_batch(
+        2.0, count, np.random.default_rng(12345), out
+    )
+    np.testing.assert_array_equal(values, sample_scattering_distance(2.0, rand_nums))
+
+    int_out = np.empty(count, dtype=np.int64)
+    values = sample_neutrons_emitted_batch(
+        2.5, count, np.random.default_rng(12345), int_out
+    )
+    assert np.shares_memory(values, int_out)
+    np.testing.assert_array_equal(values, sample_neutrons_emitted(2.5, rand_nums))
+
+    code_out = np.empty(count, dtype=np.int8)
+    codes = sample_interaction_type_batch(
+        0.5, 0.2, count, np.random.default_rng(12345), code_out
+    )
+    assert np.shares_memory(codes, code_out)
+    assert [INTERACTION_TYPES[code] for code in codes] == [
+        sample_interaction_type(0.5, 0.2, rand_num=u) for u in rand_nums
+    ]
+
+
+def test_scalar_samplers_wrap_batched_samplers():
+    """
+    Test that a scalar sampler drawing its own random number gives the first
+    value of the batched sampler on the same generator.
+    """
+    for scalar, batch in [
+        (
+            lambda rng: sample_direction_cosine(rng=rng),
+            lambda rng: sample_direction_cosine_batch(1, rng),
+        ),
+        (
+            lambda rng: sample_position(4.0, rng=rng),
+            lambda rng: sample_position_batch(4.0, 1, rng),
+        ),
+        (
+            lambda rng: sample_scattering_distance(2.0, rng=rng),
+            lambda rng: sample_scattering_distance_batch(2.0, 1, rng),
+        ),
+        (
+            lambda rng: sample_neutrons_emitted(2.5, rng=rng),
+            lambda rng: sample_neutrons_emitted_batch(2.5, 1, rng),
+        ),
+        (
+            lambda rng: sample_interaction_type(0.5, 0.2, rng=rng),
+            lambda rng: INTERACTION_TYPES[
+                sample_interaction_type_batch(0.5, 0.2, 1, rng)[0]
+            ],
+        ),
+    ]:
+        value = scalar(np.random.default_rng(1))
+        assert np.isscalar(value)
+        assert value == np.ravel(batch(np.random.default_rng(1)))[0]
+
+    positions = sample_position(4.0, size=5, rng=np.random.default_rng(1))
+    np.testing.assert_array_equal(
+        positions, sample_position_batch(4.0, 5, np.random.default_rng(1))
+    )
+
+
+def test_sample_scattering_distance_batch_redraws_zeros():
+    """
+    Test that zero random draws are redrawn together so log(0) is never
+    evaluated.
+    """
+    rng = FixedDraws([[0.0, 0.5, 0.0], [0.0, 0.25], [0.75]])
+    distances = sample_scattering_distance_batch(1.0, 3, rng)
+    np.testing.assert_allclose(distances, -np.log([0.75, 0.5, 0.25]))
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mccc.bank import FissionBank
+from mccc.convergence import shannon_entropy
+from mccc.monte_carlo import MIN_ACTIVE_SAMPLES
+from mccc.monte_carlo import search
+from mccc.monte_carlo import simulate
+from mccc.search import estimate_root
+from mccc.search import next_iterate
+from mccc.search import rescale_bank
+from mccc.search import with_parameter
+from mccc.setup import setup_simulation
+
+
+def test_with_parameter():
+    """
+    Test setting a parameter, and the thickness of a layered slab.
+    """
+    cfg = setup_simulation()
+    assert with_parameter(cfg, "nu", 2.5).nu == 2.5
+
+    layered = replace(cfg, regions=((1.0, 0.5, 0.2, 0.1), (3.0, 0.4, 0.3, 0.0)))
+    thicker = with_parameter(layered, "slab_thickness_cm", 6.0)
+    assert thicker.regions == ((2.0, 0.5, 0.2, 0.1), (6.0, 0.4, 0.3, 0.0))
+    assert thicker.slab_thickness_cm == 6.0
+
+    with pytest.raises(ValueError, match="Unknown search parameter"):
+        with_parameter(cfg, "num_particles", 10)
+    with pytest.raises(ValueError, match="Cannot search total_xs"):
+        with_parameter(layered, "total_xs", 0.5)
+    assert with_parameter(layered, "nu", 2.5).nu == 2.5
+
+
+def test_rescale_bank():
+    """
+    Test that sites keep their fractional positions and weights.
+    """
+    bank = FissionBank.from_positions([0.5, 1.0, 1.5], "float32")
+    bank.weights[:] = [1.0, 2.0, 0.5]
+    rescaled = rescale_bank(bank, 2.0, 4.0)
+    assert rescaled.precision == "float32"
+    np.testing.assert_array_equal(rescaled.positions, [1.0, 2.0, 3.0])
+    np.testing.assert_array_equal(rescaled.weights, [1.0, 2.0, 0.5])
+
+
+def test_next_iterate():
+    """
+    Test the first step, the secant step, bisection inside a bracket, and
+    the limit on extrapolation.
+    """
+    assert next_iterate([(2.0, 0.9, 0.01)], 1.0) == pytest.approx(2.2)
+
+    # k = 0.5 + 0.2 x, so k = 1 at x = 2.5
+    line = [(1.0, 0.7, 0.01), (2.0, 0.9, 0.01)]
+    assert next_iterate(line, 1.0) == pytest.approx(2.5)
+    assert estimate_root(line, 1.0)[0] == pytest.approx(2.5)
+
+    # A noisy iterate outside the bracket [2, 2.2] gives way to bisection
+    noisy = [(2.0, 0.99, 0.01), (2.2, 1.01, 0.01), (2.1, 0.95, 0.01)]
+    assert next_iterate(noisy, 1.0) == pytest.approx(2.1)
+
+    # Without a bracket, a step at most doubles the parameter
+    assert next_iterate([(1.0, 0.5, 0.01), (1.1, 0.51, 0.01)], 1.0) == 2.2
+
+    with pytest.raises(ValueError, match="does not change"):
+        next_iterate([(1.0, 0.5, 0.01), (1.0, 0.6, 0.01)], 1.0)
+
+
+def test_simulate_from_bank():
+    """
+    Test that a run starts from a given source, and returns its final one.
+    """
+    cfg = replace(
+        setup_simulation(),
+        num_generations=2,
+        num_particles=1000,
+        random_seed=1,
+        population_control="comb",
+    )
+    bank = FissionBank.from_positions(np.full(1000, 0.5))
+    results = simulate(cfg, bank=bank)
+    assert results["entropy"][0] == shannon_entropy(
+        bank, cfg.slab_thickness_cm, cfg.entropy_bins
+    )
+    assert len(results["bank"]) == cfg.num_particles
+
+
+def test_search(capsys):
+    """
+    Test a criticality search over the slab thickness, warm-started after
+    the first iterate.
+    """
+    result = search(
+        30,
+        10000,
+        target_k=1.1,
+        tolerance=0.005,
+        random_seed=12345,
+        population_control="comb",
+        num_inactive=5,
+        verbose=True,
+    )
+    assert result["converged"]
+    value, k, _ = result["iterates"][-1]
+    assert abs(k - 1.1) <= 0.005
+    # The default slab is critical, and k grows with its thickness
+    assert result["value"] > setup_simulation().slab_thickness_cm
+    assert result["value"] == pytest.approx(value, rel=0.05)
+    assert "Search iterate 1: slab_thickness_cm = " in capsys.readouterr().out
+
+
+def test_search_needs_precise_iterates(capsys):
+    """
+    Test that an iterate within the tolerance does not end the search unless
+    its k_eff is known to the target precision, and that iterates are quiet
+    without verbose.
+    """
+    result = search(
+        MIN_ACTIVE_SAMPLES,
+        500,
+        target_k=1.0,
+        tolerance=0.5,
+        max_iterations=2,
+        random_seed=12345,
+        population_control="comb",
+        target_std=1e-6,
+    )
+    assert not result["converged"]
+    assert len(result["iterates"]) == 2
+    assert all(abs(k - 1.0) <= 0.5 for _, k, _ in result["iterates"])
+    assert capsys.readouterr().out == ""
+
+    # Too few active generations for any iterate to reach its target
+    with pytest.raises(ValueError, match="at least 20 active generations"):
+        search(MIN_ACTIVE_SAMPLES + 1, 500, num_inactive=2)
+
+
+def test_estimate_root_without_errors():
+    """
+    Test that iterates without usable standard errors give the root of an
+    unweighted fit, with an unknown error.
+    """
+    nan = float("nan")
+    root, std_err = estimate_root([(1.0, 0.7, nan), (2.0, 0.9, nan)], 1.0)
+    assert root == pytest.approx(2.5)
+    assert np.isnan(std_err)
+
+    # One usable error weights the fit, and gives the root an error
+    root, std_err = estimate_root([(1.0, 0.7, nan), (2.0, 0.9, 0.01)], 1.0)
+    assert root == pytest.approx(2.5)
+    assert np.isfinite(std_err)
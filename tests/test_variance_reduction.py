@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from mccc.monte_carlo import simulate
+from mccc.rng import COLLISION_STREAM
+from mccc.rng import ParticleStreams
+from mccc.rng import SPLIT_FLAG
+from mccc.setup import initialise_tallies
+from mccc.setup import setup_simulation
+from mccc.variance_reduction import DEFAULT_WEIGHT_CUTOFF
+from mccc.variance_reduction import is_non_analog
+from mccc.variance_reduction import play_weight_game
+from mccc.variance_reduction import simulate_generation_event_weighted
+from mccc.variance_reduction import simulate_generation_history_weighted
+from mccc.variance_reduction import weight_bounds
+
+
+def test_is_non_analog():
+    cfg = setup_simulation()
+    assert not is_non_analog(cfg)
+    assert is_non_analog(replace(cfg, implicit_capture=True))
+    assert is_non_analog(replace(cfg, weight_cutoff=0.25))
+    assert is_non_analog(replace(cfg, weight_windows=(0.5,)))
+
+
+def test_weight_bounds():
+    """
+    Test the weight window lookup, and the cutoff used without windows.
+    """
+    cfg = replace(setup_simulation(), slab_thickness_cm=2.0, weight_cutoff=0.25)
+    positions = np.array([0.0, 0.9, 1.5, 2.0])
+    lower, upper, survival = weight_bounds(cfg, positions)
+    np.testing.assert_array_equal(lower, 0.25)
+    np.testing.assert_array_equal(upper, np.inf)
+    np.testing.assert_array_equal(survival, 0.5)
+
+    cfg = replace(cfg, weight_windows=(0.4, 0.2), weight_window_ratio=4.0)
+    lower, upper, survival = weight_bounds(cfg, positions)
+    np.testing.assert_array_equal(lower, [0.4, 0.4, 0.2, 0.2])
+    np.testing.assert_array_equal(upper, [1.6, 1.6, 0.8, 0.8])
+    np.testing.assert_array_equal(survival, [1.0, 1.0, 0.5, 0.5])
+
+    assert weight_bounds(setup_simulation(), positions) is None
+
+    # Implicit capture always has a cutoff
+    lower, upper, survival = weight_bounds(
+        replace(setup_simulation(), implicit_capture=True), positions
+    )
+    np.testing.assert_array_equal(lower, DEFAULT_WEIGHT_CUTOFF)
+    np.testing.assert_array_equal(upper, np.inf)
+    np.testing.assert_array_equal(survival, 2 * DEFAULT_WEIGHT_CUTOFF)
+    with pytest.raises(ValueError, match="Weight windows must be positive"):
+        weight_bounds(replace(cfg, weight_windows=(0.4, 0.0)), positions)
+
+
+def test_play_weight_game():
+    """
+    Test that roulette and splitting preserve the expected weight, and that
+    split copies get distinct new streams.
+    """
+    cfg = replace(setup_simulation(), slab_thickness_cm=1.0, weight_windows=(0.1,))
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 0)
+    num = 100000
+    rng = np.random.default_rng(12345)
+    weights = rng.uniform(0.0, 1.2, num)
+
+    positions, regions, histories, stream_ids, draws, new_weights = play_weight_game(
+        cfg,
+        streams,
+        rng.uniform(0.0, 1.0, num),
+        np.zeros(num, dtype=np.int64),
+        np.arange(num, dtype=np.uint64),
+        np.full(num, COLLISION_STREAM, dtype=np.uint64),
+        np.full(num, 3, dtype=np.uint64),
+        weights,
+        rng.uniform(0.0, 1.0, num),
+    )
+    assert new_weights.sum() == pytest.approx(weights.sum(), rel=0.01)
+    # Every weight now lies inside the window [0.1, 0.5]
+    assert np.all(new_weights >= 0.1)
+    assert np.all(new_weights <= 0.5)
+
+    copies = stream_ids != COLLISION_STREAM
+    assert np.all(stream_ids[copies] >= SPLIT_FLAG)
+    assert np.all(draws[copies] == 0)
+    assert np.all(draws[~copies] == 3)
+    keys = set(zip(histories.tolist(), stream_ids.tolist()))
+    assert len(keys) == positions.size
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"implicit_capture": True},
+        {"implicit_capture": True, "weight_cutoff": 0.1},
+        {"weight_windows": (0.1, 0.05)},
+        {"implicit_capture": True, "weight_windows": (0.05, 0.1, 0.02)},
+    ],
+)
+def test_weighted_engines_agree(options):
+    """
+    Test that both weighted engines give the same fission bank, with or
+    without splitting.
+    """
+    cfg = replace(setup_simulation(), **options)
+    start_positions = np.linspace(0.0, cfg.slab_thickness_cm, 300)
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 1)
+
+    tallies_history, bank_history = simulate_generation_history_weighted(
+        cfg, initialise_tallies(), start_positions, streams, first_history=50
+    )
+    tallies_event, bank_event = simulate_generation_event_weighted(
+        cfg, initialise_tallies(), start_positions, streams, first_history=50
+    )
+    # The weights are summed in a different order
+    assert tallies_history == pytest.approx(tallies_event)
+    np.testing.assert_array_equal(bank_history.sites, bank_event.sites)
+    # Weight balance: every source neutron leaks or is absorbed, up to the
+    # weight won or lost in the games
+    lost = tallies_event["leakage"] + tallies_event["capture"]
+    lost += tallies_event["fission"]
+    assert lost == pytest.approx(tallies_event["history"], rel=0.1)
+
+
+def test_weighted_engines_without_scattering():
+    """
+    Test that a material which does not scatter gives no division by zero in
+    the roulette of either weighted engine.
+    """
+    cfg = replace(setup_simulation(), scatter_xs=0.0, weight_cutoff=0.25)
+    start_positions = np.linspace(0.0, cfg.slab_thickness_cm, 100)
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 0)
+    with np.errstate(all="raise"):
+        for simulate_generation in (
+            simulate_generation_history_weighted,
+            simulate_generation_event_weighted,
+        ):
+            tallies, _ = simulate_generation(
+                cfg, initialise_tallies(), start_positions, streams
+            )
+            assert tallies["scatter"] == 0
+            assert tallies["collision"] == tallies["fission"] + tallies["capture"]
+
+
+def test_implicit_capture_run():
+    """
+    Test that implicit capture and weight windows give the analog k_eff, and
+    that the figure of merit is reported.
+    """
+    cfg = replace(
+        setup_simulation(),
+        num_generations=12,
+        num_particles=10000,
+        num_inactive=2,
+        random_seed=12345,
+        population_control="comb",
+    )
+    analog = simulate(cfg)
+    implicit = simulate(
+        replace(cfg, implicit_capture=True, weight_windows=(0.5, 0.3, 0.2, 0.1))
+    )
+
+    for results in (analog, implicit):
+        assert results["fom"] > 0
+    mean, std_err, _ = analog["k_combined"]
+    mean_vr, std_err_vr, _ = implicit["k_combined"]
+    assert abs(mean - mean_vr) < 4 * np.hypot(std_err, std_err_vr)
+
+
+def test_weighted_run_workers():
+    """
+    Test that a weighted run does not depend on the number of workers.
+    """
+    cfg = replace(
+        setup_simulation(),
+        num_generations=2,
+        num_particles=20000,
+        random_seed=12345,
+        implicit_capture=True,
+        weight_windows=(0.2, 0.1),
+    )
+    serial = simulate(cfg)
+    parallel = simulate(replace(cfg, workers=2))
+    assert serial["k2"] == parallel["k2"]
+    assert serial["k1"] == pytest.approx(parallel["k1"])
+
+
+@pytest.mark.parametrize("tracking", ["surface", "delta"])
+def test_weighted_engines_agree_regions(tracking):
+    """
+    Test that both weighted engines give the same fission bank in a
+    heterogeneous slab.
+    """
+    cfg = replace(
+        setup_simulation(),
+        tracking=tracking,
+        regions=((0.5, 0.6, 0.5, 0.05), (2.0, 0.3264, 0.225216, 0.0816)),
+        implicit_capture=True,
+        weight_windows=(0.1, 0.05),
+    )
+    start_positions = np.linspace(0.0, cfg.slab_thickness_cm, 300)
+    streams = ParticleStreams.for_generation(np.random.SeedSequence(12345), 1)
+
+    tallies_history, bank_history = simulate_generation_history_weighted(
+        cfg, initialise_tallies(), start_positions, streams
+    )
+    tallies_event, bank_event = simulate_generation_event_weighted(
+        cfg, initialise_tallies(), start_positions, streams
+    )
+    assert tallies_history == pytest.approx(tallies_event)
+    np.testing.assert_array_equal(bank_history.sites, bank_event.sites)